@@ -1,23 +1,57 @@
+from array import array
+from collections import OrderedDict, deque
 from datetime import datetime as dt
+import heapq
+import json
+import math
 
 import pandas as pd
 import numpy as np
 
 from adsb_track.const import *
 import adsb_track.const as const
+from adsb_track.spatial import GridIndex
 
 
 class SessionData:
+    """The messages of a recording session, indexed by aircraft.
 
-    def __init__(self, df_ident, df_velocity, df_position):
-        self.df_ident = df_ident
-        self.df_velocity = df_velocity
-        self.df_position = df_position
+    The message dataframes are sorted by ICAO24 code and timestamp once, and
+    the row range of every aircraft is kept, so isolating an aircraft is a
+    slice instead of a scan of every message. Built tracks are kept in a
+    least recently used cache.
+
+    Args:
+        df_ident (pandas.DataFrame): Identification messages
+        df_velocity (pandas.DataFrame): Velocity messages
+        df_position (pandas.DataFrame): Position messages
+        cache_size (int): Number of built tracks kept.
+    """
+
+    def __init__(self, df_ident, df_velocity, df_position, cache_size=128):
+        self.df_ident, self.df_velocity, self.df_position = [
+            x.sort_values([const.ICAO, const.TIMESTAMP], kind='stable')
+            for x in (df_ident, df_velocity, df_position)
+        ]
+        self.offsets = [
+            SessionData._offsets(x)
+            for x in (self.df_ident, self.df_velocity, self.df_position)
+        ]
         self.unique_icao = np.unique(
             np.concatenate([
                 x[const.ICAO].unique()
                 for x in (df_ident, df_velocity, df_position)
             ]))
+        self.cache_size = cache_size
+        self.tracks = OrderedDict()
+
+    @staticmethod
+    def _offsets(df):
+        """Row ranges of each ICAO24 code in a dataframe sorted by code."""
+        icao = df[const.ICAO].to_numpy()
+        codes, starts = np.unique(icao, return_index=True)
+        stops = np.append(starts[1:], len(icao))
+        return dict(zip(codes.tolist(), zip(starts.tolist(), stops.tolist())))
 
     def unique_icao(self):
         """Unique ICAO addresses in the message dataframes.
@@ -33,6 +67,11 @@ class SessionData:
         """
         return self.unique_icao
 
+    def _check_icao(self, icao):
+        if not any(icao in x for x in self.offsets):
+            raise ValueError(f'The ICAO24 code {icao} could not be found in '
+                             'any messages.')
+
     def isolate_icao(self, icao):
         """Isolates the messages of an aircraft from many dataframes.
 
@@ -42,15 +81,24 @@ class SessionData:
         Returns:
             Iterable[pandas.DataFrame]: A deepcopy of a subset of the input
                 message_dataframes where the ICAO24 code matches the icao input
-                parameter.
+                parameter, in time order.
         """
-        if icao not in self.unique_icao:
-            return ValueError(f'The ICAO24 code {icao} could not be found in '
-                              'any messages.')
+        self._check_icao(icao)
         return tuple([
-            x[x[const.ICAO] == icao].copy()
-            for x in (self.df_ident, self.df_velocity, self.df_position)
+            x.iloc[slice(*offsets.get(icao, (0, 0)))].copy()
+            for x, offsets in zip((self.df_ident, self.df_velocity,
+                                   self.df_position), self.offsets)
+        ])
+
+    @staticmethod
+    def _combine(df_ident, df_velocity, df_position):
+        """Concatenates the message types sorted by aircraft and time."""
+        df = pd.concat([
+            x.assign(**{const.MSG_TYPE: y})
+            for x, y in ((df_ident, const.IDENT), (df_velocity, const.VELOCITY),
+                         (df_position, const.POSITION))
         ])
+        return df.sort_values([const.ICAO, const.TIMESTAMP], kind='stable')
 
     def build_track(self, icao):
         """Constructs the track of an aircraft from different types of messages.
@@ -60,47 +108,142 @@ class SessionData:
 
         Returns:
             pandas.DataFrame: A single dataframe constructed with the most
-                recent information of each type.
-        """
-        if icao not in self.unique_icao:
-            return ValueError(f'The ICAO24 code {icao} could not be found in '
-                              'any messages.')
-        df_ident, df_velocity, df_position = self.isolate_icao(icao)
-        df_ident[const.MSG_TYPE] = const.IDENT
-        df_velocity[const.MSG_TYPE] = const.VELOCITY
-        df_position[const.MSG_TYPE] = const.POSITION
-        df = pd.concat([df_ident, df_velocity, df_position])
-        df.sort_values(const.TIMESTAMP, inplace=True)
+                recent information of each type. The dataframe is shared with
+                the track cache, copy it before modifying.
+        """
+        if icao in self.tracks:
+            self.tracks.move_to_end(icao)
+            return self.tracks[icao]
+        self._check_icao(icao)
+        df = SessionData._combine(*self.isolate_icao(icao))
         df.ffill(inplace=True)
+        self.tracks[icao] = df
+        if len(self.tracks) > self.cache_size:
+            self.tracks.popitem(last=False)
         return df
 
+    def build_all_tracks(self):
+        """Constructs the track of every aircraft in one pass.
+
+        Returns:
+            dict: The track of each ICAO24 code, as from :meth:`build_track`.
+        """
+        df = SessionData._combine(self.df_ident, self.df_velocity,
+                                  self.df_position)
+        filled = df.groupby(const.ICAO, sort=False).ffill()
+        filled.insert(list(df.columns).index(const.ICAO), const.ICAO,
+                      df[const.ICAO])
+        return {
+            icao: filled.iloc[start:stop]
+            for icao, (start, stop) in SessionData._offsets(filled).items()
+        }
+
+
+# Naive timestamps are wall-clock time, counted from a naive epoch
+EPOCH = dt(1970, 1, 1)
+
+
+def _float(x):
+    """The value as a float, NaN for missing values."""
+    try:
+        return float(x)
+    except TypeError:
+        return np.nan
+
+
+def _to_datetime(times):
+    """Converts float seconds to timestamps, rounded to the microsecond."""
+    return pd.to_datetime(np.rint(times * 1e6).astype(np.int64), unit='us')
+
+
+class History:
+    """A growable time series of typed columns.
+
+    Timestamps and numeric values are stored in ``array.array`` buffers of
+    doubles, with NaN for missing values, and text in a list.
+
+    Args:
+        typecodes (Iterable[str]): The ``array`` typecode of each value column,
+            or None for a text column.
+    """
+
+    __slots__ = ('times', 'columns')
+
+    def __init__(self, typecodes):
+        self.times = array('d')
+        self.columns = tuple(
+            [] if x is None else array(x) for x in typecodes)
+
+    def append(self, ts, *values):
+        self.times.append(ts)
+        for column, value in zip(self.columns, values):
+            column.append(value)
+
+    def __len__(self):
+        return len(self.times)
+
+    def __iter__(self):
+        return zip(self.times, *self.columns)
+
+    def to_frame(self, names):
+        """Builds a dataframe from the buffers without per row conversion.
+
+        Args:
+            names (Iterable[str]): The timestamp column name followed by the
+                value column names.
+
+        Returns:
+            pandas.DataFrame: The time series.
+        """
+        # Copy out of the buffers, a live view would block further appends
+        data = [_to_datetime(np.frombuffer(self.times))]
+        data.extend(
+            np.frombuffer(x).copy() if isinstance(x, array) else list(x)
+            for x in self.columns)
+        return pd.DataFrame(dict(zip(names, data)))
+
 
 class Aircraft:
     """A representation of an aircraft over time
 
+    Timestamps are kept as float seconds since UNIX epoch and the histories
+    as :class:`History` column buffers.
+
     Args:
         icao (str): The ICAO24 code of the aircraft, used as its unique
             identifier.
     """
 
+    __slots__ = ('icao', 'last_seen', 'ttl', 'seq', 'added_seq', 'encoded',
+                 'callsign_update', 'callsign',
+                 'callsign_history', 'position_update', 'latitude',
+                 'longitude', 'altitude', 'position_history',
+                 'velocity_update', 'heading', 'velocity', 'vertical_speed',
+                 'velocity_history')
+
     def __init__(self, icao):
         self.icao = icao
+        self.last_seen = None
+        self.ttl = None
+        self.seq = None
+        self.added_seq = None
+        self.encoded = None
 
         self.callsign_update = None
         self.callsign = None
-        self.callsign_history = []
+        self.callsign_history = History((None,))
 
         self.position_update = None
         self.latitude = None
         self.longitude = None
         self.altitude = None
-        self.position_history = []
+        self.position_history = History(('d', 'd', 'd'))
 
         self.velocity_update = None
         self.heading = None
         self.velocity = None
         self.vertical_speed = None
-        self.velocity_history = []
+        self.velocity_history = History(('d', 'd', 'd'))
 
     def __str__(self):
 
@@ -123,12 +266,8 @@ class Aircraft:
             pandas.Timestamp: The latest timestamp of either the callsign,
                 position, or velocity.
         """
-        update_canidates = [
-            x for x in (self.callsign_update, self.position_update,
-                        self.velocity_update) if x is not None
-        ]
-        if len(update_canidates) > 0:
-            return max(update_canidates)
+        if self.last_seen is not None:
+            return _to_datetime(np.array([self.last_seen]))[0]
 
     def to_json(self):
         """Exports the aircraft data in JSON format.
@@ -138,7 +277,7 @@ class Aircraft:
         """
         return {
             ICAO: self.icao,
-            LAST_UPDATE: self.last_update().timestamp(),
+            LAST_UPDATE: self.last_seen,
             CALLSIGN: self.callsign,
             LATITUDE: self.latitude,
             LONGITUDE: self.longitude,
@@ -148,17 +287,45 @@ class Aircraft:
             VERTICAL_SPEED: self.vertical_speed,
         }
 
+    def to_bytes(self):
+        """Exports the aircraft data as compact JSON bytes.
+
+        The encoding is kept until the aircraft changes, when an
+        :class:`Airspace` tracks the aircraft.
+
+        Returns:
+            bytes: The UTF-8 JSON of :meth:`to_json`.
+        """
+        if self.encoded is None:
+            self.encoded = json.dumps(self.to_json(),
+                                      separators=(',', ':')).encode()
+        return self.encoded
+
+    @staticmethod
     def process_timestamp(ts):
-        if isinstance(ts, pd._libs.tslibs.timestamps.Timestamp):
-            return ts
-        elif isinstance(ts, float):
-            return pd.to_datetime(ts, unit='s')
+        """Converts a timestamp to float seconds since UNIX epoch.
+
+        Numbers are taken as seconds since UNIX epoch. Naive timestamps are taken as UTC, matching
+        ``pandas.to_datetime(seconds, unit='s')`` for the reverse conversion.
+        """
+        if isinstance(ts, (int, float, np.number)):
+            return float(ts)
+        elif isinstance(ts, pd.Timestamp):
+            return ts.value / 1e9
         elif isinstance(ts, dt):
-            return pd.to_datetime(ts)
+            if ts.tzinfo is not None:
+                return ts.timestamp()
+            return (ts - EPOCH).total_seconds()
+        return pd.Timestamp(ts).value / 1e9
 
+    @staticmethod
     def is_update(ts, comparison):
         return (comparison is None) or (ts > comparison)
 
+    def _seen(self, ts):
+        if self.last_seen is None or ts > self.last_seen:
+            self.last_seen = ts
+
     def get_callsign_history(self):
         """Produces a time series of recorded call sign.
 
@@ -166,8 +333,8 @@ class Aircraft:
             pandas.DataFrame: A dataframe with timestamps and callsigns.
         """
         if self.callsign_history:
-            return pd.DataFrame(self.callsign_history,
-                                columns=[TIMESTAMP, CALLSIGN]).convert_dtypes()
+            return self.callsign_history.to_frame(
+                [TIMESTAMP, CALLSIGN]).convert_dtypes()
 
     def get_position_history(self):
         """Produces a time series of position data.
@@ -177,9 +344,8 @@ class Aircraft:
                 and altitude.
         """
         if self.position_history:
-            return pd.DataFrame(
-                self.position_history,
-                columns=[TIMESTAMP, LATITUDE, LONGITUDE, ALTITUDE])
+            return self.position_history.to_frame(
+                [TIMESTAMP, LATITUDE, LONGITUDE, ALTITUDE])
 
     def get_velocity_history(self):
         """Produces a time series of velocity.
@@ -189,9 +355,8 @@ class Aircraft:
                 speed.
         """
         if self.velocity_history:
-            return pd.DataFrame(
-                self.velocity_history,
-                columns=[TIMESTAMP, ANGLE, VELOCITY, VERTICAL_SPEED])
+            return self.velocity_history.to_frame(
+                [TIMESTAMP, ANGLE, VELOCITY, VERTICAL_SPEED])
 
     def get_track(self):
         """Provides a single dataframe with all of callsign, position, and
@@ -216,12 +381,19 @@ class Aircraft:
                 the callsign record occurred. If the input is a float, that is
                 the seconds since the UNIX epoch.
             callsign (str): The aircraft callsign
+
+        Returns:
+            bool: True if the update is newer than the current state and was
+                applied.
         """
         ts = Aircraft.process_timestamp(ts)
         if Aircraft.is_update(ts, self.callsign_update):
+            self._seen(ts)
             self.callsign_update = ts
             self.callsign = callsign
-            self.callsign_history.append((ts, callsign))
+            self.callsign_history.append(ts, callsign)
+            return True
+        return False
 
     def update_position(self, ts, lat, lon, alt):
         """Updates the aircraft velocity at a given time.
@@ -232,14 +404,22 @@ class Aircraft:
             lat (float): Latitude
             lon (float): Longitude
             alt (int): Altitude
+
+        Returns:
+            bool: True if the update is newer than the current state and was
+                applied.
         """
         ts = Aircraft.process_timestamp(ts)
         if Aircraft.is_update(ts, self.position_update):
+            self._seen(ts)
             self.position_update = ts
             self.latitude = lat
             self.longitude = lon
             self.altitude = alt
-            self.position_history.append((ts, lat, lon, alt))
+            self.position_history.append(ts, _float(lat), _float(lon),
+                                         _float(alt))
+            return True
+        return False
 
     def update_velocity(self, ts, heading, velocity, vertical_speed):
         """Updates the aircraft position at a given time.
@@ -250,22 +430,67 @@ class Aircraft:
             heading (float): Heading
             velocity (int): Velocity
             vertical_speed (int): Vertical speed
+
+        Returns:
+            bool: True if the update is newer than the current state and was
+                applied.
         """
         ts = Aircraft.process_timestamp(ts)
         if Aircraft.is_update(ts, self.velocity_update):
+            self._seen(ts)
             self.velocity_update = ts
             self.heading = heading
             self.velocity = velocity
             self.vertical_speed = vertical_speed
-            self.velocity_history.append(
-                (ts, heading, velocity, vertical_speed))
+            self.velocity_history.append(ts, _float(heading),
+                                         _float(velocity),
+                                         _float(vertical_speed))
+            return True
+        return False
 
 
 class Airspace:
-    """A representation of the entire airspace."""
+    """A representation of the entire airspace.
+
+    Aircraft expire once they have not reported for their time to live. The
+    aircraft are kept in a heap ordered by expiry time, and an entry made
+    stale by a later report is only moved when it reaches the top, so
+    checking for expired aircraft costs nothing per message until one is due.
+    The airspace clock is the latest message time seen.
+
+    Args:
+        ttl (float): Seconds without a report after which an aircraft is
+            removed. None keeps aircraft indefinitely.
+        max_aircraft (int): Maximum number of aircraft held. When a new
+            aircraft would exceed it, the aircraft closest to expiring, or
+            the least recently seen without a time to live, is removed.
+        on_evict (Callable): Called with each removed
+            :class:`Aircraft`, for example to archive its history.
+        cell_size (float): Grid cell size in degrees of the spatial index
+            kept over the aircraft positions.
+        removed_history (int): Number of removals remembered for
+            :meth:`changes`.
+    """
 
-    def __init__(self):
+    def __init__(self,
+                 ttl=None,
+                 max_aircraft=None,
+                 on_evict=None,
+                 cell_size=0.5,
+                 removed_history=10000):
         self.flights = {}
+        self.index = GridIndex(cell_size)
+        self.sequence = 0
+        self._changed = OrderedDict()
+        self._removed = deque(maxlen=removed_history)
+        self._removed_floor = 0
+        self.ttl = ttl
+        self.max_aircraft = max_aircraft
+        self.on_evict = on_evict
+        self.clock = None
+        self.evicted = 0
+        self._expiry = []
+        self._queued = set()
 
     def __len__(self):
         return len(self.flights)
@@ -297,6 +522,66 @@ class Airspace:
         """
         return self.flights.get(icao.upper())
 
+    def aircraft_in_bbox(self,
+                         south,
+                         west,
+                         north,
+                         east,
+                         min_alt=None,
+                         max_alt=None):
+        """Finds the aircraft inside a map viewport.
+
+        Args:
+            south (float): Southern latitude
+            west (float): Western longitude, greater than east for a box that
+                crosses the antimeridian
+            north (float): Northern latitude
+            east (float): Eastern longitude
+            min_alt (int): Optional lowest altitude
+            max_alt (int): Optional highest altitude
+
+        Returns:
+            list of adsb_track.Aircraft: The aircraft inside the box.
+        """
+        return [
+            self.flights[x] for x in self.index.bbox(south, west, north, east,
+                                                     min_alt, max_alt)
+        ]
+
+    def aircraft_within(self, lat, lon, nm, min_alt=None, max_alt=None):
+        """Finds the aircraft within a distance of a point.
+
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            nm (float): Radius in nautical miles
+            min_alt (int): Optional lowest altitude
+            max_alt (int): Optional highest altitude
+
+        Returns:
+            list of tuple: The aircraft and their distance in nautical miles,
+                closest first.
+        """
+        return [(self.flights[x], d)
+                for x, d in self.index.radius(lat, lon, nm, min_alt, max_alt)]
+
+    def nearest_aircraft(self, lat, lon, k=1, min_alt=None, max_alt=None):
+        """Finds the aircraft closest to a point.
+
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            k (int): Number of aircraft
+            min_alt (int): Optional lowest altitude
+            max_alt (int): Optional highest altitude
+
+        Returns:
+            list of tuple: Up to k aircraft and their distance in nautical
+                miles, closest first.
+        """
+        return [(self.flights[x], d)
+                for x, d in self.index.nearest(lat, lon, k, min_alt, max_alt)]
+
     def check_aircraft(self, icao):
         """Finds aircraft in airspace or creates a new one.
 
@@ -306,9 +591,136 @@ class Airspace:
         """
         icao_uppper = icao.upper()
         if icao_uppper not in self.flights:
+            if self.max_aircraft is not None:
+                while (len(self.flights) >= self.max_aircraft and
+                       self._evict_next()):
+                    pass
             self.flights[icao_uppper] = Aircraft(icao_uppper)
         return self.flights[icao_uppper]
 
+    def _expiry_key(self, aircraft):
+        ttl = aircraft.ttl if aircraft.ttl is not None else self.ttl
+        deadline = math.inf if ttl is None else aircraft.last_seen + ttl
+        return deadline, aircraft.last_seen
+
+    def _touch(self, aircraft):
+        """Tracks an updated aircraft and removes the expired ones."""
+        self.sequence += 1
+        aircraft.seq = self.sequence
+        if aircraft.added_seq is None:
+            aircraft.added_seq = self.sequence
+        aircraft.encoded = None
+        self._changed[aircraft.icao] = None
+        self._changed.move_to_end(aircraft.icao)
+
+        if self.clock is None or aircraft.last_seen > self.clock:
+            self.clock = aircraft.last_seen
+        if aircraft.icao not in self._queued:
+            self._queued.add(aircraft.icao)
+            heapq.heappush(self._expiry,
+                           (*self._expiry_key(aircraft), aircraft.icao))
+        if self._expiry and self._expiry[0][0] <= self.clock:
+            self.expire()
+
+    def _pop_next(self, now=math.inf):
+        """Pops the aircraft that expires first, if due by the given time.
+
+        Returns:
+            adsb_track.Aircraft or None: The aircraft, no longer queued.
+        """
+        heap = self._expiry
+        while heap and heap[0][0] <= now:
+            deadline, last_seen, icao = heapq.heappop(heap)
+            aircraft = self.flights.get(icao)
+            if aircraft is None:
+                self._queued.discard(icao)
+                continue
+            key = self._expiry_key(aircraft)
+            if key != (deadline, last_seen):
+                # Reported since queued, requeue at the current expiry
+                heapq.heappush(heap, (*key, icao))
+                continue
+            self._queued.discard(icao)
+            return aircraft
+
+    def _evict_next(self):
+        """Removes the aircraft that expires first.
+
+        Returns:
+            bool: True if an aircraft was removed.
+        """
+        aircraft = self._pop_next()
+        if aircraft is None:
+            # Aircraft never reported are held without being queued
+            aircraft = next((x for x in self.flights.values()
+                             if x.icao not in self._queued), None)
+            if aircraft is None:
+                return False
+        self.remove(aircraft.icao)
+        self.evicted += 1
+        return True
+
+    def expire(self, now=None):
+        """Removes the aircraft that outlived their time to live.
+
+        Args:
+            now (float): Current time, seconds since UNIX epoch. Defaults to
+                the latest message time seen.
+
+        Returns:
+            int: The number of aircraft removed.
+        """
+        now = self.clock if now is None else now
+        if now is None:
+            return 0
+        removed = 0
+        while True:
+            aircraft = self._pop_next(now)
+            if aircraft is None:
+                return removed
+            if self.remove(aircraft.icao) is not None:
+                self.evicted += 1
+                removed += 1
+
+    def set_ttl(self, icao, ttl):
+        """Sets the time to live of a single aircraft.
+
+        Args:
+            icao (str): ICAO24 code
+            ttl (float): Seconds without a report after which the aircraft is
+                removed, None for the airspace default.
+        """
+        aircraft = self.check_aircraft(icao)
+        aircraft.ttl = ttl
+        if aircraft.last_seen is not None:
+            # The queued entry may now expire too late, queue another one
+            self._queued.add(aircraft.icao)
+            heapq.heappush(self._expiry,
+                           (*self._expiry_key(aircraft), aircraft.icao))
+
+    def remove(self, icao):
+        """Removes an aircraft from the airspace.
+
+        Args:
+            icao (str): ICAO24 code
+
+        Returns:
+            adsb_track.Aircraft or None: The removed aircraft, if it was found.
+        """
+        aircraft = self.flights.pop(icao.upper(), None)
+        if aircraft is not None:
+            self._queued.discard(aircraft.icao)
+            self.index.remove(aircraft.icao)
+            if aircraft.icao in self._changed:
+                del self._changed[aircraft.icao]
+                self.sequence += 1
+                if len(self._removed) == self._removed.maxlen:
+                    self._removed_floor = self._removed[0][0]
+                self._removed.append((self.sequence, aircraft.icao))
+            if self.on_evict is not None:
+                self.on_evict(aircraft)
+        return aircraft
+
     def update_callsign(self, icao, ts, callsign):
         """Updates the callsign information of the aircraft.
 
@@ -319,7 +731,9 @@ class Airspace:
                 the seconds since the UNIX epoch.
             callsign (str): The aircraft callsign
         """
-        self.check_aircraft(icao).update_callsign(ts, callsign)
+        aircraft = self.check_aircraft(icao)
+        if aircraft.update_callsign(ts, callsign):
+            self._touch(aircraft)
 
     def update_position(self, icao, ts, lat, lon, alt):
         """Updates the position information of an aircraft.
@@ -332,7 +746,10 @@ class Airspace:
             lon (float): Longitude
             alt (int): Altitude
         """
-        self.check_aircraft(icao).update_position(ts, lat, lon, alt)
+        aircraft = self.check_aircraft(icao)
+        if aircraft.update_position(ts, lat, lon, alt):
+            self.index.update(aircraft.icao, lat, lon, alt)
+            self._touch(aircraft)
 
     def update_velocity(self, icao, ts, heading, velocity, vertical_speed):
         """Updates the velocity information of an aircraft
@@ -345,8 +762,79 @@ class Airspace:
             velocity (int): Velocity
             vertical_speed (int): Vertical speed
         """
-        self.check_aircraft(icao).update_velocity(ts, heading, velocity,
-                                                  vertical_speed)
+        aircraft = self.check_aircraft(icao)
+        if aircraft.update_velocity(ts, heading, velocity, vertical_speed):
+            self._touch(aircraft)
+
+    def changes(self, since=0):
+        """The aircraft added, changed, or removed since a sequence number.
+
+        Every applied update and removal advances the airspace sequence
+        number. A client keeps the ``seq`` of the last response and passes it
+        back to receive only what happened after it, applying the removals
+        before the additions.
+
+        Args:
+            since (int): The sequence number of the previous response, 0 for
+                all aircraft.
+
+        Returns:
+            dict: ``seq``, the current sequence number; ``reset``, True if
+                the client state must be replaced because removals it missed
+                were forgotten, in which case every aircraft is in ``added``;
+                ``added`` and ``changed``, lists of
+                :class:`adsb_track.Aircraft`; and ``removed``, a list of
+                ICAO24 codes.
+        """
+        reset = since < self._removed_floor
+        if reset:
+            since = 0
+        added, changed = [], []
+        for icao in reversed(self._changed):
+            aircraft = self.flights[icao]
+            if aircraft.seq <= since:
+                break
+            if aircraft.added_seq > since:
+                added.append(aircraft)
+            else:
+                changed.append(aircraft)
+        removed = []
+        if since:
+            for seq, icao in reversed(self._removed):
+                if seq <= since:
+                    break
+                removed.append(icao)
+        return {
+            'seq': self.sequence,
+            'reset': reset,
+            'added': added,
+            'changed': changed,
+            'removed': removed,
+        }
+
+    def changes_bytes(self, since=0):
+        """The :meth:`changes` since a sequence number as JSON bytes.
+
+        Aircraft are written with their cached :meth:`Aircraft.to_bytes`
+        encoding, so unchanged aircraft are not serialized again.
+
+        Args:
+            since (int): The sequence number of the previous response.
+
+        Returns:
+            bytes: A UTF-8 JSON object with the keys of :meth:`changes`.
+        """
+        delta = self.changes(since)
+        return b''.join([
+            b'{"seq":%d,"reset":%s,"added":[' %
+            (delta['seq'], b'true' if delta['reset'] else b'false'),
+            b','.join([x.to_bytes() for x in delta['added']]),
+            b'],"changed":[',
+            b','.join([x.to_bytes() for x in delta['changed']]),
+            b'],"removed":',
+            json.dumps(delta['removed']).encode(),
+            b'}',
+        ])
 
     def __str__(self):
         return ('\n' * 2).join([str(x) for x in self.flights.values()])
@@ -0,0 +1,128 @@
+from collections import namedtuple
+import struct
+
+ESC = 0x1A
+_ESC_BYTE = b'\x1a'
+
+MODE_AC = 0x31
+MODE_S_SHORT = 0x32
+MODE_S_LONG = 0x33
+
+# Unescaped length following <esc><type>: 6 byte MLAT timestamp, 1 byte signal
+# level and the message
+BODY_LENGTH = {
+    MODE_AC: 6 + 1 + 2,
+    MODE_S_SHORT: 6 + 1 + 7,
+    MODE_S_LONG: 6 + 1 + 14,
+}
+
+_HEADER = struct.Struct('>HIB')
+
+BeastFrame = namedtuple('BeastFrame', ['msgtype', 'mlat', 'signal', 'msg'])
+BeastFrame.__doc__ = """A frame of the Mode-S Beast binary format.
+
+Attributes:
+    msgtype (int): Frame type, 0x31 Mode-AC, 0x32 short or 0x33 long Mode-S.
+    mlat (int): 48-bit MLAT counter of the receiver.
+    signal (int): Signal level, 0 to 255.
+    msg (bytes): The message without escaping.
+"""
+
+
+class BeastReader:
+    """Incremental parser of a Mode-S Beast binary stream.
+
+    Received data is appended to an internal buffer and scanned with
+    ``bytearray.find`` for the 0x1a escape. Frame bodies without an escaped
+    0x1a are read as a slice of a memoryview of the buffer, the others are
+    unescaped a run at a time. Incomplete frames are kept for the next call.
+    Frame types other than Mode-AC and Mode-S are skipped.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.resyncs = 0
+
+    def _unescape(self, view, start, length):
+        """Reads an escaped frame body.
+
+        Returns:
+            tuple: The body and the position after it. The body is None if
+                the buffer ends first, in which case the position is also
+                None, or if a new frame starts within the body.
+        """
+        buf = self.buffer
+        size = len(buf)
+        end = start + length
+        if end > size:
+            return None, None
+        if buf.find(_ESC_BYTE, start, end) < 0:
+            return view[start:end], end
+
+        body = bytearray()
+        pos = start
+        while length:
+            if pos + length > size:
+                return None, None
+            esc = buf.find(_ESC_BYTE, pos, pos + length)
+            if esc < 0:
+                body += view[pos:pos + length]
+                pos += length
+                break
+            body += view[pos:esc]
+            length -= esc - pos
+            if esc + 1 >= size:
+                return None, None
+            if buf[esc + 1] != ESC:
+                # Lone <esc> is the start of the next frame, this one is short
+                return None, esc
+            body.append(ESC)
+            length -= 1
+            pos = esc + 2
+        return body, pos
+
+    def feed(self, data):
+        """Parses the complete frames after adding received data.
+
+        Args:
+            data (bytes): Data received from the socket.
+
+        Returns:
+            list of BeastFrame: The frames completed by the data.
+        """
+        buf = self.buffer
+        buf += data
+        frames = []
+        pos = 0
+        with memoryview(buf) as view:
+            while True:
+                start = buf.find(_ESC_BYTE, pos)
+                if start < 0:
+                    pos = len(buf)
+                    break
+                if start + 1 >= len(buf):
+                    pos = start
+                    break
+                msgtype = buf[start + 1]
+                length = BODY_LENGTH.get(msgtype)
+                if length is None:
+                    # Escaped 0x1a or an unsupported frame type
+                    pos = start + (2 if msgtype == ESC else 1)
+                    continue
+                body, end = self._unescape(view, start + 2, length)
+                if body is None:
+                    if end is None:
+                        pos = start
+                        break
+                    self.resyncs += 1
+                    pos = end
+                    continue
+                high, low, signal = _HEADER.unpack_from(body)
+                frames.append(
+                    BeastFrame(msgtype, high << 32 | low, signal,
+                               bytes(body[7:])))
+                if isinstance(body, memoryview):
+                    body.release()
+                pos = end
+        del buf[:pos]
+        return frames
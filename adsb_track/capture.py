@@ -0,0 +1,347 @@
+import argparse
+from datetime import datetime as dt
+import json
+import mmap
+import os
+import struct
+import time
+
+from adsb_track.database import Database
+from adsb_track.decode import LONG_MSG_BYTES, MessageDecoder
+
+MAGIC = b'ADSBCAP1'
+SUFFIX = '.adsbcap'
+
+# Record header: record type, source index, payload length, receive time
+HEADER = struct.Struct('<BBHd')
+SOURCE = 0
+MESSAGE = 1
+
+
+class CaptureWriter:
+    """Appends received messages to rotating binary capture files.
+
+    A capture file starts with an 8 byte magic number followed by records.
+    Each record is a 12 byte little endian header of the record type, the
+    source index, the payload length and the receive time in seconds since
+    UNIX epoch, then the payload. Message records hold the binary message,
+    source records a JSON object describing the receiver, written at the
+    start of every file so each file decodes on its own.
+
+    Records are buffered by the file object, flushed and synced to disk at
+    most every ``fsync_interval`` seconds, and a new file is started once
+    the current one reaches ``rotate_bytes``.
+
+    Args:
+        directory (str): Directory the capture files are written to.
+        rotate_bytes (int): Size at which a new file is started.
+        fsync_interval (float): Maximum seconds between syncs to disk.
+    """
+
+    def __init__(self, directory, rotate_bytes=256 * 2**20, fsync_interval=5.0):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.rotate_bytes = rotate_bytes
+        self.fsync_interval = fsync_interval
+        self.sources = []
+        self.file = None
+        self.path = None
+        self.paths = []
+        self.size = 0
+        self.last_sync = time.monotonic()
+        self.messages = 0
+        self.skipped = 0
+        self._open()
+
+    def _open(self):
+        name = dt.now().strftime('capture-%Y%m%d-%H%M%S-%f') + SUFFIX
+        self.path = os.path.join(self.directory, name)
+        self.paths.append(self.path)
+        self.file = open(self.path, 'xb')
+        self.file.write(MAGIC)
+        self.size = len(MAGIC)
+        for index, (ts, payload) in enumerate(self.sources):
+            self._write(SOURCE, index, ts, payload)
+
+    def _write(self, kind, index, ts, payload):
+        self.file.write(HEADER.pack(kind, index, len(payload), ts))
+        self.file.write(payload)
+        self.size += HEADER.size + len(payload)
+
+    def add_source(self, **source):
+        """Declares a receiver, to write its messages with.
+
+        Args:
+            **source: JSON serializable description of the receiver, as
+                returned by :meth:`CaptureReader.sources`.
+
+        Returns:
+            int: The source index.
+        """
+        index = len(self.sources)
+        if index > 255:
+            raise ValueError('A capture holds at most 256 sources')
+        payload = json.dumps(source).encode()
+        ts = time.time()
+        self.sources.append((ts, payload))
+        self._write(SOURCE, index, ts, payload)
+        return index
+
+    def write(self, messages, source=0):
+        """Appends a batch of messages.
+
+        Args:
+            messages (list): ``(msg, ts)`` pairs with hexadecimal or binary
+                messages. Further fields, such as the MLAT counter of Beast
+                messages, are not kept.
+            source (int): The source index of the messages.
+        """
+        for msg, ts, *_ in messages:
+            if isinstance(msg, str):
+                try:
+                    msg = bytes.fromhex(msg)
+                except ValueError:
+                    self.skipped += 1
+                    continue
+            self._write(MESSAGE, source, ts, msg)
+            self.messages += 1
+        if self.size >= self.rotate_bytes:
+            self.rotate()
+        elif time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        """Flushes the buffered records and syncs the file to disk."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.last_sync = time.monotonic()
+
+    def rotate(self):
+        """Closes the current file and starts a new one."""
+        self.sync()
+        self.file.close()
+        self._open()
+
+    def close(self):
+        """Syncs and closes the current file."""
+        self.sync()
+        self.file.close()
+
+
+class CaptureReader:
+    """Memory mapped reader of a capture file.
+
+    Records are read in place from the mapping, the payloads are memoryview
+    slices of it. A truncated record at the end of the file, left by an
+    interrupted capture, is ignored.
+
+    Args:
+        path (str): The capture file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mmap[:len(MAGIC)] != MAGIC:
+            self.mmap.close()
+            raise ValueError(f'{path} is not a capture file')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.mmap.close()
+
+    def records(self):
+        """Scans the records of the file.
+
+        Yields:
+            tuple: The record type, source index, receive time and payload
+                memoryview of each record. The views must be released before
+                the reader is closed.
+        """
+        size = len(self.mmap)
+        pos = len(MAGIC)
+        with memoryview(self.mmap) as view:
+            while pos + HEADER.size <= size:
+                kind, source, length, ts = HEADER.unpack_from(view, pos)
+                start = pos + HEADER.size
+                if start + length > size:
+                    break
+                yield kind, source, ts, view[start:start + length]
+                pos = start + length
+
+    def sources(self):
+        """The receivers declared in the file.
+
+        Returns:
+            dict: The description of each source index.
+        """
+        found = {}
+        for kind, source, _, payload in self.records():
+            if kind == SOURCE:
+                found[source] = json.loads(bytes(payload))
+            payload.release()
+        return found
+
+
+def capture_paths(inputs):
+    """Expands directories into the capture files they hold.
+
+    Args:
+        inputs (Iterable[str]): Capture files or directories.
+
+    Returns:
+        list of str: The capture files, those of a directory sorted by name,
+            which is the order they were written.
+    """
+    paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            paths.extend(
+                sorted(
+                    os.path.join(path, x)
+                    for x in os.listdir(path)
+                    if x.endswith(SUFFIX)))
+        else:
+            paths.append(path)
+    return paths
+
+
+class CaptureDecoder(MessageDecoder):
+    """Decodes the captured messages of one receiver into a database.
+
+    Args:
+        source (dict): The receiver declared in the capture.
+        session_id (int): The recording session of the receiver.
+        writer (adsb_track.database.Database): The database to record to.
+    """
+
+    def __init__(self, source, session_id, writer):
+        self.gs_lat = source['lat']
+        self.gs_lon = source['lon']
+        self.session_id = session_id
+        self.writer = writer
+
+
+def open_session(database, source):
+    """Starts the recording session of a capture source, or resumes it.
+
+    A session already in the database was decoded before, up to its end
+    time, so decoding the same captures again adds nothing and decoding the
+    files rotated since continues the session. A session without an end
+    time, from an interrupted decode, continues after its last recorded
+    message.
+
+    Args:
+        database (adsb_track.database.Database): The database
+        source (dict): The receiver declared in the capture.
+
+    Returns:
+        tuple: The session id, and the receive time in seconds since UNIX
+            epoch up to which messages are already decoded, or None.
+    """
+    found = database.find_session(source['session_hash'])
+    if found is None:
+        return database.record_session_start(
+            source['session_hash'], source['host'], source['port'],
+            dt.fromtimestamp(source['start'])), None
+    session_id, stop = found
+    if stop is None:
+        # Interrupted before it was stopped, resume after its last message
+        stop = database.last_message(session_id)
+        if stop is None:
+            return session_id, None
+    # Times are stored to the microsecond
+    return session_id, stop.timestamp() + 1e-6
+
+
+def decode_capture(paths, db, batch=5000, buffer=1000):
+    """Decodes capture files into a recording database.
+
+    Every source of the captures gets a recording session, created the first
+    time the source is seen and stopped at its last message. The messages of
+    sessions already in the database are only decoded after their end time,
+    see :func:`open_session`.
+
+    Args:
+        paths (Iterable[str]): Capture files, in the order recorded.
+        db (str): The SQLite database file to record to.
+        batch (int): Number of messages decoded at a time per source.
+        buffer (int): Number of messages buffered per database write.
+
+    Returns:
+        dict: The number of long messages decoded per session hash.
+    """
+    database = Database('sqlite', db, buffer=buffer)
+    decoders = {}
+    pending = {}
+    counts = {}
+    last = {}
+    decoded = {}
+
+    def decode(session_hash):
+        decoder = decoders[session_hash]
+        decoder.decode_messages(pending[session_hash])
+        pending[session_hash] = []
+
+    for path in paths:
+        with CaptureReader(path) as reader:
+            sessions = {}
+            for kind, index, ts, payload in reader.records():
+                if kind == SOURCE:
+                    source = json.loads(bytes(payload))
+                    session_hash = source['session_hash']
+                    sessions[index] = session_hash
+                    if session_hash not in decoders:
+                        session_id, decoded[session_hash] = open_session(
+                            database, source)
+                        decoders[session_hash] = CaptureDecoder(
+                            source, session_id, database)
+                        pending[session_hash] = []
+                        counts[session_hash] = 0
+                elif len(payload) == LONG_MSG_BYTES:
+                    session_hash = sessions[index]
+                    if (decoded[session_hash] is not None and
+                            ts < decoded[session_hash]):
+                        payload.release()
+                        continue
+                    pending[session_hash].append((bytes(payload), ts))
+                    counts[session_hash] += 1
+                    last[session_hash] = ts
+                    if len(pending[session_hash]) >= batch:
+                        decode(session_hash)
+                payload.release()
+    for session_hash in decoders:
+        decode(session_hash)
+        if session_hash in last:
+            database.record_session_stop(session_hash,
+                                         dt.fromtimestamp(last[session_hash]))
+    database.close_session()
+    return counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Decode ADS-B capture files into a recording database.')
+    parser.add_argument('database',
+                        help='The SQLite database file to record data.',
+                        metavar='DATABASE')
+    parser.add_argument('captures',
+                        nargs='+',
+                        help='Capture files, or directories of them',
+                        metavar='CAPTURE')
+    parser.add_argument('--buffer',
+                        default=1000,
+                        type=int,
+                        help='Number of messages buffered per database write')
+    args = parser.parse_args()
+
+    paths = capture_paths(args.captures)
+    for session_hash, messages in decode_capture(paths, args.database,
+                                                 buffer=args.buffer).items():
+        print(f'Decoded {messages} messages of session {session_hash}')
@@ -0,0 +1,123 @@
+from adsb_track.const import IDENT, VELOCITY
+
+
+class ChangeFilter:
+    """Records identification and velocity messages only when they change.
+
+    Aircraft repeat their identification every few seconds and their cruise
+    velocity barely changes. The filter sits in front of a writer with the
+    ``record_*`` methods of :class:`adsb_track.database.Database` and keeps
+    the values last written for each aircraft. An identification is written
+    when its callsign, typecode or category differ, and a velocity when its
+    speed, heading or vertical speed move outside a deadband of the written
+    values or a source changes. Either is written anyway when nothing was
+    written for the aircraft within ``heartbeat`` seconds. Positions are
+    always written.
+
+    Other attributes, such as ``flush`` or ``pending_rows``, are those of the
+    writer, so the filter can stand in for the database of a
+    :class:`adsb_track.pipeline.Pipeline`.
+
+    Args:
+        writer: Where messages that changed are recorded.
+        speed (float): Speed deadband in knots.
+        angle (float): Heading deadband in degrees.
+        vertical_speed (float): Vertical speed deadband in feet per minute.
+        heartbeat (float): Longest time in seconds between written messages
+            of one type for an aircraft.
+    """
+
+    def __init__(self,
+                 writer,
+                 speed=2.0,
+                 angle=1.0,
+                 vertical_speed=128.0,
+                 heartbeat=60.0):
+        self.writer = writer
+        self.speed = speed
+        self.angle = angle
+        self.vertical_speed = vertical_speed
+        self.heartbeat = heartbeat
+        # Last written values and time of each aircraft
+        self.idents = {}
+        self.velocities = {}
+        self.pruned = None
+        self.counts = {IDENT: [0, 0], VELOCITY: [0, 0]}
+
+    def __getattr__(self, name):
+        return getattr(self.writer, name)
+
+    def _stale(self, last, ts):
+        return (ts - last).total_seconds() >= self.heartbeat
+
+    def _prune(self, ts):
+        # State older than the heartbeat is written anyway, drop it so the
+        # aircraft that left do not accumulate
+        if self.pruned is None:
+            self.pruned = ts
+        elif self._stale(self.pruned, ts):
+            for state in (self.idents, self.velocities):
+                for icao in [k for k, v in state.items()
+                             if self._stale(v[-1], ts)]:
+                    del state[icao]
+            self.pruned = ts
+
+    def record_ident(self, ts, icao, callsign, tc, cat, *args):
+        counts = self.counts[IDENT]
+        counts[0] += 1
+        last = self.idents.get(icao)
+        if (last is not None and last[:3] == (callsign, tc, cat) and
+                not self._stale(last[3], ts)):
+            return
+        self.idents[icao] = (callsign, tc, cat, ts)
+        counts[1] += 1
+        self._prune(ts)
+        self.writer.record_ident(ts, icao, callsign, tc, cat, *args)
+
+    def _within(self, last, spd, angle, vs):
+        if None in (spd, angle, vs) or None in last[:3]:
+            return last[:3] == (spd, angle, vs)
+        turn = abs(angle - last[1]) % 360
+        return (abs(spd - last[0]) <= self.speed and
+                min(turn, 360 - turn) <= self.angle and
+                abs(vs - last[2]) <= self.vertical_speed)
+
+    def record_velocity(self, ts, icao, spd, angle, vs, spd_type, angle_src,
+                        vs_src, *args):
+        counts = self.counts[VELOCITY]
+        counts[0] += 1
+        last = self.velocities.get(icao)
+        if (last is not None and last[3:6] == (spd_type, angle_src, vs_src)
+                and self._within(last, spd, angle, vs) and
+                not self._stale(last[6], ts)):
+            return
+        self.velocities[icao] = (spd, angle, vs, spd_type, angle_src, vs_src,
+                                 ts)
+        counts[1] += 1
+        self._prune(ts)
+        self.writer.record_velocity(ts, icao, spd, angle, vs, spd_type,
+                                    angle_src, vs_src, *args)
+
+    def record_position(self, *args):
+        self.writer.record_position(*args)
+
+    @property
+    def suppressed(self):
+        """Number of messages not written."""
+        return sum(seen - written for seen, written in self.counts.values())
+
+    def stats(self):
+        """Counters of each message type.
+
+        Returns:
+            dict: The number of messages, rows written, rows suppressed, and
+                the fraction suppressed by message type.
+        """
+        return {
+            kind: {
+                'messages': seen,
+                'written': written,
+                'suppressed': seen - written,
+                'rate': (seen - written) / seen if seen else 0.0,
+            } for kind, (seen, written) in self.counts.items()
+        }
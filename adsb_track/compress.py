@@ -0,0 +1,330 @@
+import argparse
+import math
+import time
+
+import pandas as pd
+from sqlalchemy import select, text
+
+from adsb_track.const import POSITION
+from adsb_track.database import Database
+from adsb_track.database.codec import EPOCH
+
+EARTH_RADIUS_M = 6371008.8
+M_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+
+def _seconds(ts):
+    if isinstance(ts, (int, float)):
+        return ts
+    return (ts - EPOCH).total_seconds()
+
+
+def _unknown(value):
+    return value is None or value != value  # NaN included
+
+
+class TrajectoryCompressor:
+    """Records only the positions needed to redraw each track within a
+    tolerance.
+
+    Most positions lie on straight, level segments that two end points
+    describe. The compressor keeps, for each aircraft, the last position
+    written, the anchor, and the positions received since. A new position
+    extends the segment from the anchor when every position in between is
+    within ``horizontal`` metres and ``vertical`` feet of where the segment
+    puts the aircraft at that time. Otherwise the previous position is
+    written and becomes the anchor. Interpolating linearly in time between
+    the written positions therefore never strays further than the
+    tolerance from a received position.
+
+    A segment is also ended after ``max_interval`` seconds, and the last
+    position of an aircraft not heard for that long is written, so a
+    position is held back at most that long. Positions with an unknown
+    value or a change of altitude source are written as received.
+
+    Like :class:`adsb_track.changes.ChangeFilter`, the compressor offers the
+    ``record_*`` methods of :class:`adsb_track.database.Database` and
+    forwards everything else to its writer.
+
+    Args:
+        writer: Where the kept positions and all other messages are
+            recorded.
+        horizontal (float): Horizontal tolerance in metres.
+        vertical (float): Altitude tolerance in feet.
+        max_interval (float): Longest time in seconds between written
+            positions of an aircraft.
+    """
+
+    def __init__(self, writer, horizontal=30.0, vertical=50.0,
+                 max_interval=60.0):
+        self.writer = writer
+        self.horizontal = horizontal
+        self.vertical = vertical
+        self.max_interval = max_interval
+        # Anchor of each aircraft as (t, lat, lon, alt, alt_src, x scale),
+        # the positions since as (t, x, y, alt) relative to the anchor in
+        # metres, seconds and feet, and the last of them as received
+        self.anchors = {}
+        self.windows = {}
+        self.last = {}
+        self.pruned = None
+        self.seen = 0
+        self.written = 0
+
+    def __getattr__(self, name):
+        return getattr(self.writer, name)
+
+    def _write(self, row):
+        self.written += 1
+        self.writer.record_position(*row)
+
+    def _finish(self, icao):
+        """Writes the held back position of an aircraft and forgets it."""
+        self.anchors.pop(icao, None)
+        self.windows.pop(icao, None)
+        last = self.last.pop(icao, None)
+        if last is not None:
+            self._write(last[4])
+
+    def _anchor(self, icao, t, lat, lon, alt, alt_src):
+        self.anchors[icao] = (t, lat, lon, alt, alt_src,
+                              M_PER_DEGREE * math.cos(math.radians(lat)))
+        self.windows[icao] = []
+        self.last[icao] = None
+
+    def _fits(self, window, t, x, y, alt):
+        """Whether the segment from the anchor to a position keeps every
+        position of the window within the tolerance."""
+        if t <= 0 or t > self.max_interval:
+            return False
+        horizontal = self.horizontal * self.horizontal
+        vertical = self.vertical
+        for tq, xq, yq, altq in window:
+            f = tq / t
+            dx = xq - f * x
+            dy = yq - f * y
+            if dx * dx + dy * dy > horizontal or abs(altq - f * alt) > vertical:
+                return False
+        return True
+
+    def _append(self, icao, anchor, t, lat, lon, alt, row):
+        t0, lat0, lon0, alt0, _, kx = anchor
+        point = (t - t0, ((lon - lon0 + 180) % 360 - 180) * kx,
+                 (lat - lat0) * M_PER_DEGREE, alt - alt0)
+        window = self.windows[icao]
+        if window and not self._fits(window, *point):
+            return False
+        window.append(point)
+        self.last[icao] = (t, lat, lon, alt, row)
+        return True
+
+    def record_position(self, ts, icao, lat, lon, alt, alt_src, *args):
+        self.seen += 1
+        t = _seconds(ts)
+        row = (ts, icao, lat, lon, alt, alt_src, *args)
+        if _unknown(lat) or _unknown(lon) or _unknown(alt):
+            self._finish(icao)
+            self._write(row)
+            return
+        anchor = self.anchors.get(icao)
+        if anchor is None or anchor[4] != alt_src:
+            self._finish(icao)
+            self._write(row)
+            self._anchor(icao, t, lat, lon, alt, alt_src)
+        elif not self._append(icao, anchor, t, lat, lon, alt, row):
+            # The previous position ends the segment and starts the next
+            tq, latq, lonq, altq, rowq = self.last[icao]
+            self._write(rowq)
+            self._anchor(icao, tq, latq, lonq, altq, alt_src)
+            if t <= tq:
+                self._write(row)
+                self._anchor(icao, t, lat, lon, alt, alt_src)
+            else:
+                self._append(icao, self.anchors[icao], t, lat, lon, alt, row)
+        self._prune(t)
+
+    def _prune(self, t):
+        if self.pruned is None or t < self.pruned:
+            self.pruned = t
+        elif t - self.pruned >= self.max_interval:
+            before = t - self.max_interval
+            for icao in [
+                    k for k, v in self.anchors.items()
+                    if (v[0] if self.last[k] is None else self.last[k][0]) <
+                    before
+            ]:
+                self._finish(icao)
+            self.pruned = t
+
+    def record_ident(self, *args):
+        self.writer.record_ident(*args)
+
+    def record_velocity(self, *args):
+        self.writer.record_velocity(*args)
+
+    def close(self):
+        """Writes the positions held back for every aircraft."""
+        for icao in list(self.anchors):
+            self._finish(icao)
+
+    @property
+    def held(self):
+        """Number of positions held back until their segment ends."""
+        return sum(1 for x in self.last.values() if x is not None)
+
+    @property
+    def suppressed(self):
+        """Number of positions not written."""
+        return self.seen - self.written - self.held
+
+    def stats(self):
+        """Counters of the compressor.
+
+        Returns:
+            dict: The number of positions received, written, suppressed and
+                held back, and the fraction suppressed.
+        """
+        suppressed = self.suppressed
+        return {
+            'positions': self.seen,
+            'written': self.written,
+            'suppressed': suppressed,
+            'held': self.held,
+            'rate': suppressed / self.seen if self.seen else 0.0,
+        }
+
+
+class _KeptRows:
+    """Collects the row ids of the positions a compressor keeps."""
+
+    def __init__(self):
+        self.ids = []
+
+    def record_position(self, *args):
+        self.ids.append(args[-1])
+
+
+def compress_positions(db,
+                       horizontal=30.0,
+                       vertical=50.0,
+                       max_interval=60.0,
+                       chunksize=100000,
+                       step=10000,
+                       pause=0.1):
+    """Compresses the positions already recorded in a database.
+
+    The positions of each aircraft are read in time order and passed through
+    a :class:`TrajectoryCompressor`, and the positions it drops are deleted.
+    Rows recorded after the pass starts are left alone. The deletes run a
+    range of ``step`` row ids at a time, each in its own short transaction
+    followed by a ``pause``, so a recorder writing to the database at the
+    same time waits at most for one range.
+
+    Args:
+        db (adsb_track.database.Database): The database
+        horizontal (float): Horizontal tolerance in metres.
+        vertical (float): Altitude tolerance in feet.
+        max_interval (float): Longest time in seconds between kept positions
+            of an aircraft.
+        chunksize (int): Number of rows read at a time.
+        step (int): Row ids per delete transaction.
+        pause (float): Seconds to wait between delete transactions.
+
+    Returns:
+        dict: The number of positions read and deleted.
+    """
+    db.flush()
+    table = db.tables[POSITION]
+    name = table.__tablename__
+    with db.engine.connect() as conn:
+        first_id, last_id = conn.execute(
+            text(f'SELECT MIN(id), MAX(id) FROM {name}')).one()
+    if last_id is None:
+        return {'positions': 0, 'deleted': 0}
+
+    kept = _KeptRows()
+    compressor = TrajectoryCompressor(kept, horizontal, vertical,
+                                      max_interval)
+    query = select(table.id, table.timestamp, table.icao, table.latitude,
+                   table.longitude, table.altitude,
+                   table.altitude_src).where(table.id <= last_id).order_by(
+                       table.icao, table.timestamp, table.id)
+    previous = None
+    for df in pd.read_sql_query(query, db.engine, chunksize=chunksize):
+        if db.compact:
+            seconds = df['timestamp'].to_numpy() / 1e6
+        else:
+            seconds = ((pd.to_datetime(df['timestamp']) -
+                        EPOCH).dt.total_seconds().to_numpy())
+        df = df.astype(object).where(df.notna(), None)
+        for t, (id_, _, icao, lat, lon, alt, alt_src) in zip(
+                seconds.tolist(), df.itertuples(index=False, name=None)):
+            if icao != previous:
+                # Rows come by aircraft, the previous one is complete
+                compressor.close()
+                previous = icao
+            compressor.record_position(t, icao, lat, lon, alt, alt_src, id_)
+    compressor.close()
+
+    deleted = 0
+    with db.engine.connect() as conn:
+        # The temporary table lives outside the database file, filling it
+        # takes no lock a recorder waits on
+        with conn.begin():
+            conn.execute(
+                text('CREATE TEMP TABLE keep (id INTEGER PRIMARY KEY)'))
+            for i in range(0, len(kept.ids), chunksize):
+                conn.execute(text('INSERT INTO keep (id) VALUES (:id)'),
+                             [{'id': x} for x in kept.ids[i:i + chunksize]])
+        for low in range(first_id, last_id + 1, step):
+            with conn.begin():
+                deleted += conn.execute(
+                    text(f'DELETE FROM {name} WHERE id BETWEEN :low AND '
+                         ':high AND id NOT IN (SELECT id FROM keep)'), {
+                             'low': low,
+                             'high': min(low + step - 1, last_id)
+                         }).rowcount
+            time.sleep(pause)
+        with conn.begin():
+            conn.execute(text('DROP TABLE keep'))
+    return {'positions': compressor.seen, 'deleted': deleted}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Delete the recorded positions not needed to redraw each '
+        'track within a tolerance.')
+    parser.add_argument('database',
+                        help='The SQLite database file to compress.',
+                        metavar='DATABASE')
+    parser.add_argument('--horizontal',
+                        default=30.0,
+                        type=float,
+                        help='Horizontal tolerance in metres')
+    parser.add_argument('--vertical',
+                        default=50.0,
+                        type=float,
+                        help='Altitude tolerance in feet')
+    parser.add_argument('--max-interval',
+                        default=60.0,
+                        type=float,
+                        help='Longest time in seconds between kept positions')
+    parser.add_argument('--step',
+                        default=10000,
+                        type=int,
+                        help='Row ids deleted from per transaction')
+    parser.add_argument('--pause',
+                        default=0.1,
+                        type=float,
+                        help='Seconds to wait between transactions')
+    args = parser.parse_args()
+
+    db = Database('sqlite', args.database)
+    counts = compress_positions(db,
+                                args.horizontal,
+                                args.vertical,
+                                args.max_interval,
+                                step=args.step,
+                                pause=args.pause)
+    db.close_session()
+    print(f"Deleted {counts['deleted']} of {counts['positions']} positions")
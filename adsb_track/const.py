@@ -11,6 +11,7 @@ PORT = 'port'
 START = 'start'
 STOP = 'stop'
 DURATION = 'duration'
+SESSION_ID = 'session_id'
 
 IDENT = 'ident'
 CALLSIGN = 'callsign'
@@ -29,4 +30,9 @@ POSITION = 'position'
 LATITUDE = 'latitude'
 LONGITUDE = 'longitude'
 ALTITUDE = 'altitude'
-ALTITUDE_SRC = 'altitude_src'
\ No newline at end of file
+ALTITUDE_SRC = 'altitude_src'
+
+SUMMARY = 'minute_summary'
+MIN_ALTITUDE = 'min_altitude'
+MAX_ALTITUDE = 'max_altitude'
+MESSAGES = 'messages'
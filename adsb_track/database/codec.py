@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta, timezone
+
+from dateutil.tz import tzlocal
+import pandas as pd
+
+from adsb_track.const import *
+
+# Timestamps are stored as microseconds since UNIX epoch, an unambiguous
+# instant, and decode to the naive local time the recorder writes
+EPOCH = datetime(1970, 1, 1)
+UTC_EPOCH = EPOCH.replace(tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+SOURCE_CODES = {'BARO': 0, 'GNSS': 1}
+SPEED_TYPE_CODES = {'GS': 0, 'IAS': 1, 'TAS': 2}
+ANGLE_SRC_CODES = {'TRUE_NORTH': 0, 'MAGNETIC_NORTH': 1}
+
+ENUM_CODES = {
+    SPEED_TYPE: SPEED_TYPE_CODES,
+    ANGLE_SRC: ANGLE_SRC_CODES,
+    VERTICAL_SPEED_SRC: SOURCE_CODES,
+    ALTITUDE_SRC: SOURCE_CODES,
+}
+ENUM_NAMES = {
+    column: {v: k for k, v in codes.items()}
+    for column, codes in ENUM_CODES.items()
+}
+
+
+def local_time(ts):
+    """Normalizes a timestamp to the recorder's clock, naive local time.
+
+    Args:
+        ts (datetime.datetime or pandas.Timestamp or float): The timestamp.
+            Naive datetimes are taken as local time, aware ones are converted
+            to it. A float is seconds since UNIX epoch.
+
+    Returns:
+        datetime.datetime: The naive local time.
+    """
+    if isinstance(ts, (int, float)):
+        return datetime.fromtimestamp(ts)
+    if ts.tzinfo is not None:
+        return pd.Timestamp(ts).tz_convert(tzlocal()).tz_localize(None)
+    return ts
+
+
+def encode_timestamp(ts):
+    """Converts a timestamp to integer microseconds since UNIX epoch.
+
+    Args:
+        ts (datetime.datetime or pandas.Timestamp or float): The timestamp.
+            Naive datetimes are local time, the second occurrence of a time
+            repeated when clocks go back marked by ``fold``, as set by
+            ``datetime.fromtimestamp``. A float is seconds since UNIX epoch.
+
+    Returns:
+        int: Microseconds since 1970-01-01 UTC.
+    """
+    if isinstance(ts, (int, float)):
+        ts = datetime.fromtimestamp(ts, timezone.utc)
+    elif isinstance(ts, pd.Timestamp):
+        ts = ts.to_pydatetime(warn=False)
+    return (ts.astimezone(timezone.utc) - UTC_EPOCH) // MICROSECOND
+
+
+def decode_timestamp(value):
+    """Converts integer microseconds since UNIX epoch to naive local time.
+
+    Args:
+        value (int): The stored timestamp.
+
+    Returns:
+        datetime.datetime: The local time.
+    """
+    return datetime.fromtimestamp(value // 1000000).replace(
+        microsecond=value % 1000000)
+
+
+def encode_icao(icao):
+    """Converts an ICAO24 code to its 24-bit integer."""
+    return int(icao, 16)
+
+
+def decode_icao(icao):
+    """Converts a 24-bit integer to its uppercase ICAO24 code."""
+    return f'{icao:06X}'
+
+
+def _encode_enum(column):
+    codes = ENUM_CODES[column]
+    return lambda x: codes.get(x)
+
+
+def _identity(x):
+    return x
+
+
+ENCODERS = {
+    TIMESTAMP: encode_timestamp,
+    ICAO: encode_icao,
+    **{x: _encode_enum(x) for x in ENUM_CODES},
+}
+
+
+def encode_rows(columns, rows):
+    """Encodes buffered message rows for the compact schema.
+
+    Args:
+        columns (Iterable[str]): The column of each value in the rows.
+        rows (Iterable[tuple]): Rows in the recorded representation.
+
+    Returns:
+        list of tuple: The rows with compact values.
+    """
+    encoders = [ENCODERS.get(x, _identity) for x in columns]
+    return [tuple(f(x) for f, x in zip(encoders, row)) for row in rows]
+
+
+def decode_frame(df):
+    """Converts the compact columns of a message dataframe in place.
+
+    Args:
+        df (pandas.DataFrame): Messages read from compact tables.
+
+    Returns:
+        pandas.DataFrame: The dataframe with the columns as recorded.
+    """
+    if TIMESTAMP in df:
+        df[TIMESTAMP] = pd.to_datetime(
+            df[TIMESTAMP], unit='us',
+            utc=True).dt.tz_convert(tzlocal()).dt.tz_localize(None)
+    if ICAO in df:
+        # Few distinct aircraft per frame, format each code once
+        df[ICAO] = df[ICAO].map(
+            {x: decode_icao(x) for x in df[ICAO].unique().tolist()})
+    for column, names in ENUM_NAMES.items():
+        if column in df:
+            df[column] = df[column].map(names)
+    return df
@@ -0,0 +1,306 @@
+from datetime import datetime as dt
+import heapq
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError as e:
+    raise ImportError('The DuckDB backend needs the duckdb package, install '
+                      'adsb-track[duckdb]') from e
+
+import adsb_track.const as const
+from adsb_track.const import *
+from adsb_track.database import codec
+from adsb_track.database.interface import Database
+from adsb_track.metrics import NULL_METRICS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS session (
+    id INTEGER PRIMARY KEY,
+    session_hash VARCHAR NOT NULL,
+    host VARCHAR NOT NULL,
+    port INTEGER NOT NULL,
+    start TIMESTAMP NOT NULL,
+    stop TIMESTAMP
+);
+CREATE SEQUENCE IF NOT EXISTS ident_id;
+CREATE TABLE IF NOT EXISTS ident (
+    id BIGINT DEFAULT nextval('ident_id'),
+    timestamp TIMESTAMP NOT NULL,
+    icao VARCHAR NOT NULL,
+    callsign VARCHAR NOT NULL,
+    typecode SMALLINT NOT NULL,
+    category SMALLINT NOT NULL,
+    session_id INTEGER
+);
+CREATE SEQUENCE IF NOT EXISTS velocity_id;
+CREATE TABLE IF NOT EXISTS velocity (
+    id BIGINT DEFAULT nextval('velocity_id'),
+    timestamp TIMESTAMP NOT NULL,
+    icao VARCHAR NOT NULL,
+    speed SMALLINT,
+    angle DOUBLE,
+    vertical_speed SMALLINT,
+    speed_type VARCHAR,
+    angle_src VARCHAR,
+    vertical_speed_src VARCHAR,
+    session_id INTEGER
+);
+CREATE SEQUENCE IF NOT EXISTS position_id;
+CREATE TABLE IF NOT EXISTS position (
+    id BIGINT DEFAULT nextval('position_id'),
+    timestamp TIMESTAMP NOT NULL,
+    icao VARCHAR NOT NULL,
+    latitude DOUBLE,
+    longitude DOUBLE,
+    altitude INTEGER,
+    altitude_src VARCHAR,
+    session_id INTEGER
+);
+"""
+
+# Rows per DuckDB vector, the unit of chunked fetches
+VECTOR_SIZE = 2048
+
+
+class DuckDBDatabase(Database):
+    """Storage of recording sessions and messages in a DuckDB file.
+
+    DuckDB stores each column separately and compressed, and scans them in
+    vectors, which suits aggregates over many messages and long time ranges.
+    Buffered rows are appended per message type as one dataframe, and query
+    results are returned as dataframes built from the columns, without
+    converting row by row.
+
+    The message tables have no indexes, queries scan the min and max
+    statistics of each row group instead, which works well for the time
+    order messages are recorded in. One process at a time can open the file
+    for recording. The maintenance and compression jobs are SQLite only.
+
+    Created with ``Database('duckdb', path)``, the other arguments are those
+    of :class:`adsb_track.database.Database`. ``compact`` is ignored, the
+    columns are always compressed.
+    """
+
+    def __init__(self,
+                 dialect,
+                 url,
+                 buffer=25,
+                 flush_interval=5.0,
+                 compact=None,
+                 metrics=NULL_METRICS,
+                 read_only=False):
+        self.connection = duckdb.connect(url, read_only=read_only)
+        if not read_only:
+            self.connection.execute(SCHEMA)
+        self.compact = False
+        # The connection is shared by the recording and replaying threads
+        self.lock = threading.Lock()
+
+        self.buffer = buffer
+        self.flush_interval = flush_interval
+        self.pending = {x: [] for x in self.COLUMNS}
+        self.pending_rows = 0
+        self.last_flush = time.monotonic()
+
+        self.flush_count = 0
+        self.flush_rows = 0
+        self.flush_seconds = 0.0
+        self.flush_max_seconds = 0.0
+        self.metrics = metrics
+
+    def _cursor(self):
+        # A cursor is a connection to the same database for another thread
+        with self.lock:
+            return self.connection.cursor()
+
+    def query(self, sql, parameters=None):
+        """Runs a SQL query, for analytics beyond the replay methods.
+
+        Args:
+            sql (str): The query, with ``?`` or ``$name`` placeholders.
+            parameters (list or dict): Values of the placeholders.
+
+        Returns:
+            pandas.DataFrame: The result.
+        """
+        with self._cursor() as cursor:
+            return cursor.execute(sql, parameters).df()
+
+    def query_arrow(self, sql, parameters=None):
+        """Runs a SQL query, returning an Arrow table. Needs pyarrow.
+
+        Args:
+            sql (str): The query, with ``?`` or ``$name`` placeholders.
+            parameters (list or dict): Values of the placeholders.
+
+        Returns:
+            pyarrow.Table: The result.
+        """
+        with self._cursor() as cursor:
+            result = cursor.execute(sql, parameters)
+            # Renamed in DuckDB 1.4
+            if hasattr(result, 'to_arrow_table'):
+                return result.to_arrow_table()
+            return result.fetch_arrow_table()
+
+    def record_session_start(self, session_hash, host, port, start):
+        with self.lock:
+            return self.connection.execute(
+                'INSERT INTO session (id, session_hash, host, port, start) '
+                'SELECT coalesce(max(id), 0) + 1, ?, ?, ?, ? FROM session '
+                'RETURNING id',
+                [session_hash, host, port, start]).fetchone()[0]
+
+    def record_sessions(self, sessions):
+        columns = ('id', SESSION_HASH, HOST, PORT, START, STOP)
+        sessions = [tuple(x[c] for c in columns) for x in sessions]
+        if sessions:
+            with self.lock:
+                self.connection.executemany(
+                    f'INSERT INTO session ({", ".join(columns)}) '
+                    'VALUES (?, ?, ?, ?, ?, ?)', sessions)
+
+    def record_session_stop(self, session_hash, stop):
+        with self.lock:
+            self.connection.execute(
+                'UPDATE session SET stop = ? WHERE session_hash = ?',
+                [stop, session_hash])
+
+    def find_session(self, session_hash):
+        with self._cursor() as cursor:
+            return cursor.execute(
+                'SELECT id, stop FROM session WHERE session_hash = ?',
+                [session_hash]).fetchone()
+
+    def _write_pending(self):
+        with self.lock:
+            for kind, columns in self.COLUMNS.items():
+                rows = self.pending[kind]
+                if rows:
+                    df = pd.DataFrame.from_records(rows, columns=columns)
+                    self.connection.register('pending', df)
+                    self.connection.execute(
+                        f'INSERT INTO {kind} ({", ".join(columns)}) '
+                        'SELECT * FROM pending')
+                    self.connection.unregister('pending')
+                    self.pending[kind] = []
+
+    def _encode_time(self, ts):
+        # Stored as naive local time, like the original SQLite schema
+        return codec.local_time(ts)
+
+    def _read_frame(self, sql, parameters):
+        return self.query(sql, parameters).set_index('id')
+
+    def replay_messages(self, start, stop):
+        start, stop = self._encode_time(start), self._encode_time(stop)
+        return tuple([
+            self._read_frame(
+                f'SELECT * FROM {kind} WHERE timestamp BETWEEN ? AND ? '
+                'ORDER BY timestamp', [start, stop]) for kind in self.COLUMNS
+        ])
+
+    def replay_arrow(self, start, stop):
+        """Replays the messages in a given time duration as Arrow tables.
+
+        Needs pyarrow.
+
+        Args:
+            start (datetime.datetime): Start time
+            stop (datetime.datetime): Stop time
+
+        Returns:
+            tuple of pyarrow.Table: The identification, velocity, and
+                position messages.
+        """
+        start, stop = self._encode_time(start), self._encode_time(stop)
+        return tuple([
+            self.query_arrow(
+                f'SELECT * FROM {kind} WHERE timestamp BETWEEN ? AND ? '
+                'ORDER BY timestamp', [start, stop]) for kind in self.COLUMNS
+        ])
+
+    def _iter_table(self, kind, start, stop, chunksize):
+        with self._cursor() as cursor:
+            cursor.execute(
+                f'SELECT * FROM {kind} WHERE timestamp BETWEEN ? AND ? '
+                'ORDER BY timestamp, id', [start, stop])
+            vectors = max(1, chunksize // VECTOR_SIZE)
+            while True:
+                df = cursor.fetch_df_chunk(vectors)
+                if not len(df):
+                    return
+                df = df.set_index('id')
+                for row in df.itertuples(index=False,
+                                         name=kind.capitalize()):
+                    yield kind, row
+
+    def iter_messages(self, start, stop, chunksize=10000):
+        start, stop = self._encode_time(start), self._encode_time(stop)
+        streams = [
+            self._iter_table(kind, start, stop, chunksize)
+            for kind in self.COLUMNS
+        ]
+        return heapq.merge(*streams, key=lambda x: x[1].timestamp)
+
+    def replay_aircraft(self, icao, start=None, stop=None):
+        where = 'icao = ?'
+        parameters = [icao.upper()]
+        if start is not None:
+            where += ' AND timestamp >= ?'
+            parameters.append(self._encode_time(start))
+        if stop is not None:
+            where += ' AND timestamp <= ?'
+            parameters.append(self._encode_time(stop))
+        return tuple([
+            self._read_frame(
+                f'SELECT * FROM {kind} WHERE {where} ORDER BY timestamp',
+                parameters) for kind in self.COLUMNS
+        ])
+
+    def list_sessions(self):
+        df = self._read_frame('SELECT * FROM session ORDER BY id', None)
+        string_col = [const.SESSION_HASH, const.HOST]
+        df.loc[:, string_col] = df.loc[:, string_col].convert_dtypes()
+        df[const.DURATION] = df[const.STOP] - df[const.START]
+        return df
+
+    def session_window(self, session_hash):
+        session_hash = session_hash.lower()
+        if session_hash:
+            upper = session_hash[:-1] + chr(ord(session_hash[-1]) + 1)
+        else:
+            upper = chr(0x10ffff)
+        with self._cursor() as cursor:
+            matches = cursor.execute(
+                'SELECT session_hash, start, stop FROM session '
+                'WHERE session_hash >= ? AND session_hash < ?',
+                [session_hash, upper]).fetchall()
+        if not matches:
+            raise ValueError('No matching sessions hashes found')
+        if len(matches) > 1:
+            raise ValueError('Ambiguous SHA-1 hash prefix. Found sessions: '
+                             f'{[x[0] for x in matches]}')
+        _, start, stop = matches[0]
+        return start, stop if stop is not None else dt.now()
+
+    def last_message(self, session_id=None):
+        where, parameters = '', None
+        if session_id is not None:
+            where, parameters = ' WHERE session_id = ?', [session_id]
+        with self._cursor() as cursor:
+            latest = [
+                cursor.execute(f'SELECT max(timestamp) FROM {kind}{where}',
+                               parameters).fetchone()[0]
+                for kind in self.COLUMNS
+            ]
+        latest = [x for x in latest if x is not None]
+        return max(latest) if latest else None
+
+    def close_session(self):
+        self.flush()
+        self.connection.close()
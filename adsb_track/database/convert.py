@@ -0,0 +1,84 @@
+import argparse
+
+import pandas as pd
+from sqlalchemy import select
+
+from adsb_track.database.interface import Database
+from adsb_track.database.schema import RecordingSession
+from adsb_track.database import codec
+
+
+def _records(df):
+    """Rows of a dataframe as tuples of Python values, with None for nulls."""
+    return df.astype(object).where(df.notna(), None).itertuples(index=False,
+                                                                name=None)
+
+
+def convert(source,
+            destination,
+            compact=True,
+            chunksize=100000,
+            dialect='sqlite'):
+    """Copies a recording database into a new one with the chosen schema.
+
+    Args:
+        source (str): Path of the SQLite database to read.
+        destination (str): Path of the database to write.
+        compact (bool): Write the compact schema if True, the original schema
+            otherwise. Ignored for DuckDB.
+        chunksize (int): Number of rows copied per batch.
+        dialect (str): The dialect of the destination, ``'sqlite'`` or
+            ``'duckdb'``.
+
+    Returns:
+        dict: The number of rows copied per table.
+    """
+    src = Database('sqlite', source)
+    dst = Database(dialect, destination, buffer=chunksize, compact=compact)
+
+    sessions = pd.read_sql_table(RecordingSession.__tablename__, src.engine)
+    dst.record_sessions(
+        dict(zip(sessions.columns, x)) for x in _records(sessions))
+
+    copied = {}
+    for kind, columns in Database.COLUMNS.items():
+        table = src.tables[kind]
+        copied[kind] = 0
+        for df in pd.read_sql_query(select(table).order_by(table.id),
+                                    src.engine,
+                                    chunksize=chunksize):
+            if src.compact:
+                codec.decode_frame(df)
+            dst.record_rows(kind, _records(df[list(columns)]))
+            copied[kind] += len(df)
+        dst.flush()
+    src.close_session()
+    dst.close_session()
+    return copied
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Copy an ADS-B recording database to another schema.')
+    parser.add_argument('source',
+                        help='The SQLite database file to read.',
+                        metavar='SOURCE')
+    parser.add_argument('destination',
+                        help='The new database file.',
+                        metavar='DESTINATION')
+    parser.add_argument('--original',
+                        action='store_true',
+                        help='Write the original schema instead of compact')
+    parser.add_argument('--duckdb',
+                        action='store_true',
+                        help='Write a DuckDB database instead of SQLite')
+    parser.add_argument('--chunksize',
+                        default=100000,
+                        type=int,
+                        help='Rows copied per batch')
+    args = parser.parse_args()
+
+    for kind, rows in convert(args.source, args.destination,
+                              not args.original, args.chunksize,
+                              'duckdb' if args.duckdb else 'sqlite').items():
+        print(f'Copied {rows} {kind} rows')
@@ -0,0 +1,80 @@
+from urllib.parse import quote
+
+from sqlalchemy import URL, create_engine, event
+
+# Pragmas of every connection recording to a database. Incremental vacuum,
+# see adsb_track.database.maintain, only takes effect on a new database. In
+# WAL mode readers see the last commit without blocking the writer, and a
+# commit only syncs the log at checkpoints, which is safe against
+# application crashes.
+WRITE_PRAGMAS = {
+    'auto_vacuum': 'INCREMENTAL',
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 10000,  # ms
+    'cache_size': -65536,  # KiB
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
+# Pragmas of the read-only connections of replay and analysis
+READ_PRAGMAS = {
+    'busy_timeout': 10000,
+    'cache_size': -65536,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+    'query_only': 'ON',
+}
+
+
+def _set_pragmas(engine, pragmas):
+
+    @event.listens_for(engine, 'connect')
+    def connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
+    return engine
+
+
+def sqlite_engine(path, pragmas=None):
+    """Creates the engine recording to a SQLite database.
+
+    Args:
+        path (str): The database file.
+        pragmas (dict): Pragma values set on each connection,
+            :data:`WRITE_PRAGMAS` by default.
+
+    Returns:
+        sqlalchemy.engine.Engine: The engine.
+    """
+    return _set_pragmas(create_engine(URL.create('sqlite', database=path)),
+                        WRITE_PRAGMAS if pragmas is None else pragmas)
+
+
+def sqlite_reader(path, pragmas=None):
+    """Creates a read-only engine of a SQLite database.
+
+    The file is opened read-only, and the engine keeps its own pool of
+    connections, so queries never hold a write lock or wait on the
+    recorder's transactions in WAL mode.
+
+    Args:
+        path (str): The database file, which must exist.
+        pragmas (dict): Pragma values set on each connection,
+            :data:`READ_PRAGMAS` by default.
+
+    Returns:
+        sqlalchemy.engine.Engine: The engine.
+    """
+    # A URI filename, in which ?, # and % have a meaning unless escaped
+    url = URL.create('sqlite',
+                     database=f'file:{quote(path)}',
+                     query={
+                         'mode': 'ro',
+                         'uri': 'true'
+                     })
+    return _set_pragmas(create_engine(url),
+                        READ_PRAGMAS if pragmas is None else pragmas)
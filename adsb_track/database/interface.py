@@ -1,16 +1,77 @@
+from datetime import datetime as dt
+import heapq
+import time
+
 from numpy import positive
 import adsb_track.const as const
 
 import pandas as pd
-from sqlalchemy import create_engine, select, between
+from sqlalchemy import select, between, insert, func
 from sqlalchemy.orm import Session
 
 from adsb_track.const import *
 from adsb_track.database.schema import (Base, RecordingSession, Ident, Velocity,
-                                        Position)
+                                        Position, MinuteSummary, CompactBase,
+                                        CompactIdent, CompactVelocity,
+                                        CompactPosition, CompactMinuteSummary)
+from adsb_track.database.migrate import (add_columns, create_indexes,
+                                         detect_compact)
+from adsb_track.database import codec
+from adsb_track.database.engine import sqlite_engine, sqlite_reader
+from adsb_track.metrics import NULL_METRICS
+
+
+# Column order of the buffered row tuples, matching the record_* arguments
+IDENT_COLUMNS = (TIMESTAMP, ICAO, CALLSIGN, TYPECODE, CATEGORY, SESSION_ID)
+VELOCITY_COLUMNS = (TIMESTAMP, ICAO, SPEED, ANGLE, VERTICAL_SPEED, SPEED_TYPE,
+                    ANGLE_SRC, VERTICAL_SPEED_SRC, SESSION_ID)
+POSITION_COLUMNS = (TIMESTAMP, ICAO, LATITUDE, LONGITUDE, ALTITUDE,
+                    ALTITUDE_SRC, SESSION_ID)
 
 
 class Database:
+    """Storage of recording sessions and decoded ADS-B messages.
+
+    Message rows are buffered in memory as plain tuples and written with a
+    bulk insert, committed once per batch. A batch is written once ``buffer``
+    rows are pending or ``flush_interval`` seconds have passed since the last
+    write, whichever comes first.
+
+    SQLite databases are recorded in WAL mode, see
+    :mod:`adsb_track.database.engine`, and the replay methods read through a
+    separate pool of read-only connections, so replaying while recording
+    neither blocks the recorder nor waits for it.
+
+    Args:
+        dialect (str): The database dialect, ``'sqlite'``, or ``'duckdb'`` for
+            :class:`adsb_track.database.columnar.DuckDBDatabase`.
+        url (str): The database location, for SQLite the file path.
+        buffer (int): Number of pending message rows that triggers a write.
+        flush_interval (float): Maximum seconds between writes while messages
+            are being recorded.
+        compact (bool): Use the compact schema, which stores ICAO24 codes as
+            integers, timestamps as integer microseconds, and the source and
+            type fields as codes. Values are converted when recording and
+            replaying. By default an existing database keeps its schema and a
+            new one uses the original schema.
+        metrics (adsb_track.metrics.Metrics): Records the batch write
+            latency and the rows written.
+        read_only (bool): Open an existing database only to replay it. The
+            database is neither created nor migrated and every connection is
+            read-only, so opening it never waits on a recorder.
+    """
+
+    COLUMNS = {
+        IDENT: IDENT_COLUMNS,
+        VELOCITY: VELOCITY_COLUMNS,
+        POSITION: POSITION_COLUMNS,
+    }
+    TABLES = {IDENT: Ident, VELOCITY: Velocity, POSITION: Position}
+    COMPACT_TABLES = {
+        IDENT: CompactIdent,
+        VELOCITY: CompactVelocity,
+        POSITION: CompactPosition,
+    }
 
     def record_session_start(self, session_hash, host, port, start):
         """Records the session socket and start time
@@ -20,12 +81,29 @@ class Database:
             host (str): Session host
             port (int): Session port
             start (datetime.datetime): Session start time
+
+        Returns:
+            int: The session id, to tag the messages of the session with.
         """
-        self.session.add(
-            RecordingSession(session_hash=session_hash,
-                             host=host,
-                             port=port,
-                             start=start))
+        session = RecordingSession(session_hash=session_hash,
+                                   host=host,
+                                   port=port,
+                                   start=start)
+        self.session.add(session)
+        self.session.commit()
+        return session.id
+
+    def record_sessions(self, sessions):
+        """Copies recording sessions from another database, keeping their ids.
+
+        Args:
+            sessions (Iterable[dict]): Sessions by column name, including the
+                id.
+        """
+        sessions = list(sessions)
+        if sessions:
+            self.session.execute(insert(RecordingSession.__table__), sessions)
+            self.session.commit()
 
     def record_session_stop(self, session_hash, stop):
         """Records the session end time
@@ -38,7 +116,22 @@ class Database:
             select(RecordingSession).filter_by(
                 session_hash=session_hash)).scalar_one().stop = stop
 
-    def record_ident(self, ts, icao, callsign, tc, cat):
+    def find_session(self, session_hash):
+        """Looks up a recorded session by its full hash.
+
+        Args:
+            session_hash (str): Session SHA-1 hash
+
+        Returns:
+            tuple: The session id and end time, None if not stopped, or None
+                if the session is not recorded.
+        """
+        found = self.session.execute(
+            select(RecordingSession.id, RecordingSession.stop).filter_by(
+                session_hash=session_hash)).first()
+        return None if found is None else tuple(found)
+
+    def record_ident(self, ts, icao, callsign, tc, cat, session=None):
         """Records an identification message
 
         Args:
@@ -47,17 +140,21 @@ class Database:
             callsign (str): Aircraft callsign
             tc (int): Aircraft typecode
             cat (int): Aircraft category
+            session (int): Optional id of the recording session
         """
-        self.session.add(
-            Ident(timestamp=ts,
-                  icao=icao,
-                  callsign=callsign,
-                  typecode=tc,
-                  category=cat))
+        self._buffer_row(IDENT, (ts, icao, callsign, tc, cat, session))
 
     # Order meant to match pyModeS return
-    def record_velocity(self, ts, icao, spd, angle, vs, spd_type, angle_src,
-                        vs_src):
+    def record_velocity(self,
+                        ts,
+                        icao,
+                        spd,
+                        angle,
+                        vs,
+                        spd_type,
+                        angle_src,
+                        vs_src,
+                        session=None):
         """Records a velocity message
 
         Args:
@@ -69,18 +166,12 @@ class Database:
             spd_type (str): Type of speed recorded
             angle_src (str): Source of heading measurement
             vs_src (str): Source of vertical speed measurement
+            session (int): Optional id of the recording session
         """
-        self.session.add(
-            Velocity(timestamp=ts,
-                     icao=icao,
-                     speed=spd,
-                     speed_type=spd_type,
-                     vertical_speed=vs,
-                     vertical_speed_src=vs_src,
-                     angle=angle,
-                     angle_src=angle_src))
-
-    def record_position(self, ts, icao, lat, lon, alt, alt_src):
+        self._buffer_row(VELOCITY, (ts, icao, spd, angle, vs, spd_type,
+                                    angle_src, vs_src, session))
+
+    def record_position(self, ts, icao, lat, lon, alt, alt_src, session=None):
         """Records a position message
         
         Args:
@@ -90,14 +181,77 @@ class Database:
             lon (float): Aircraft longitude
             alt (int): Aircraft altitude
             alt_src (str): Source of altitude measurement
+            session (int): Optional id of the recording session
         """
-        self.session.add(
-            Position(timestamp=ts,
-                     icao=icao,
-                     latitude=lat,
-                     longitude=lon,
-                     altitude=alt,
-                     altitude_src=alt_src))
+        self._buffer_row(POSITION,
+                         (ts, icao, lat, lon, alt, alt_src, session))
+
+    def record_rows(self, kind, rows):
+        """Records many messages of one type at once.
+
+        Args:
+            kind (str): The message type, one of ``'ident'``, ``'velocity'``
+                or ``'position'``.
+            rows (Iterable[tuple]): Messages with values in the order of the
+                matching ``record_*`` arguments.
+        """
+        pending = self.pending[kind]
+        before = len(pending)
+        pending.extend(rows)
+        self.pending_rows += len(pending) - before
+        if (self.pending_rows >= self.buffer or
+                time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def _buffer_row(self, kind, row):
+        self.pending[kind].append(row)
+        self.pending_rows += 1
+        if (self.pending_rows >= self.buffer or
+                time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Writes and commits all buffered message rows in one batch."""
+        start = time.perf_counter()
+        self._write_pending()
+        self.last_flush = time.monotonic()
+
+        latency = time.perf_counter() - start
+        self.flush_count += 1
+        self.flush_rows += self.pending_rows
+        self.flush_seconds += latency
+        self.flush_max_seconds = max(self.flush_max_seconds, latency)
+        if self.metrics.enabled:
+            self.metrics.flush_seconds.observe(latency)
+            self.metrics.rows_written.inc(self.pending_rows)
+        self.pending_rows = 0
+
+    def _write_pending(self):
+        for kind, columns in self.COLUMNS.items():
+            rows = self.pending[kind]
+            if rows:
+                if self.compact:
+                    rows = codec.encode_rows(columns, rows)
+                self.session.execute(insert(self.tables[kind].__table__),
+                                     [dict(zip(columns, x)) for x in rows])
+                self.pending[kind] = []
+        self.session.commit()
+
+    def flush_stats(self):
+        """Statistics of the batched message writes.
+
+        Returns:
+            dict: The number of batches and rows written, and the mean and
+                maximum batch write latency in seconds.
+        """
+        return {
+            'batches': self.flush_count,
+            'rows': self.flush_rows,
+            'pending': self.pending_rows,
+            'mean_latency': (self.flush_seconds / self.flush_count
+                             if self.flush_count else None),
+            'max_latency': self.flush_max_seconds,
+        }
 
     def replay_messages(self, start, stop):
         """Replays the message in a given time duration
@@ -109,14 +263,105 @@ class Database:
         Returns:
             pandas.DataFrame: The messages captured in the time duration
         """
+        start, stop = self._encode_time(start), self._encode_time(stop)
         return tuple([
-            pd.read_sql_query(
-                select(x).where(between(x.timestamp, start, stop)),
-                self.engine,
-                index_col='id',
-            ) for x in (Ident, Velocity, Position)
+            self._read_messages(
+                select(x).where(between(x.timestamp, start, stop)))
+            for x in self.tables.values()
         ])
 
+    def iter_messages(self, start, stop, chunksize=10000):
+        """Streams the messages in a given time duration in time order.
+
+        Each table is read in chunks of at most ``chunksize`` rows and the
+        three streams are merged by timestamp, so memory use does not depend
+        on the length of the duration.
+
+        Args:
+            start (datetime.datetime): Start time
+            stop (datetime.datetime): Stop time
+            chunksize (int): Number of rows read from a table at a time.
+
+        Yields:
+            tuple: The message type, ``'ident'``, ``'velocity'`` or
+                ``'position'``, and the message as a namedtuple with the
+                columns of its table.
+        """
+        start, stop = self._encode_time(start), self._encode_time(stop)
+        streams = [
+            self._iter_table(kind, x, start, stop, chunksize)
+            for kind, x in self.tables.items()
+        ]
+        return heapq.merge(*streams, key=lambda x: x[1].timestamp)
+
+    def _iter_table(self, kind, table, start, stop, chunksize):
+        query = select(table).where(between(table.timestamp, start,
+                                            stop)).order_by(
+                                                table.timestamp, table.id)
+        for df in pd.read_sql_query(query,
+                                    self.reader,
+                                    index_col='id',
+                                    chunksize=chunksize):
+            if self.compact:
+                codec.decode_frame(df)
+            for row in df.itertuples(index=False, name=kind.capitalize()):
+                yield kind, row
+
+    def _encode_time(self, ts):
+        if self.compact:
+            return codec.encode_timestamp(ts)
+        return codec.local_time(ts)
+
+    def _read_messages(self, query):
+        df = pd.read_sql_query(query, self.reader, index_col='id')
+        return codec.decode_frame(df) if self.compact else df
+
+    def replay_aircraft(self, icao, start=None, stop=None):
+        """Replays the messages of a single aircraft.
+
+        Args:
+            icao (str): Aircraft ICAO24 code, in either case
+            start (datetime.datetime): Optional start time
+            stop (datetime.datetime): Optional stop time
+
+        Returns:
+            tuple of pandas.DataFrame: The identification, velocity, and
+                position messages of the aircraft.
+        """
+        if self.compact:
+            icao = codec.encode_icao(icao)
+        else:
+            # Codes are recorded uppercase, see adsb_track.decode.split_batch
+            icao = icao.upper()
+        frames = []
+        for x in self.tables.values():
+            query = select(x).where(x.icao == icao)
+            if start is not None:
+                query = query.where(x.timestamp >= self._encode_time(start))
+            if stop is not None:
+                query = query.where(x.timestamp <= self._encode_time(stop))
+            frames.append(self._read_messages(query.order_by(x.timestamp)))
+        return tuple(frames)
+
+    def replay_summaries(self, start, stop):
+        """Replays the per minute summaries of messages rolled up by
+        :mod:`adsb_track.database.maintain`.
+
+        Args:
+            start (datetime.datetime): Start time
+            stop (datetime.datetime): Stop time
+
+        Returns:
+            pandas.DataFrame: One row per aircraft and minute, with the mean
+                position, altitude range, mean speed, last callsign and
+                number of messages.
+        """
+        table = self.summary_table
+        return self._read_messages(
+            select(table).where(
+                between(table.timestamp, self._encode_time(start),
+                        self._encode_time(stop))).order_by(table.timestamp))
+
     def list_sessions(self):
         """Lists the recording sessions of the receiver
         
@@ -125,13 +370,50 @@ class Database:
         """
 
         df = pd.read_sql_table(RecordingSession.__tablename__,
-                               self.engine,
+                               self.reader,
                                index_col='id')
         string_col = [const.SESSION_HASH, const.HOST]
         df.loc[:, string_col] = df.loc[:, string_col].convert_dtypes()
         df[const.DURATION] = df[const.STOP] - df[const.START]
         return df
 
+    def session_window(self, session_hash):
+        """Finds the start and stop time of a session.
+
+        Args:
+            session_hash (str): Session SHA-1 hash or a unique prefix of it
+
+        Returns:
+            tuple of datetime.datetime: The session start and stop time. A
+                session that is still recording stops now.
+        """
+        # A range on the lowercase hex digest can use the session_hash index,
+        # unlike a LIKE pattern
+        session_hash = session_hash.lower()
+        hash_sql_prefix = RecordingSession.session_hash >= session_hash
+        if session_hash:
+            hash_sql_prefix &= RecordingSession.session_hash < (
+                session_hash[:-1] + chr(ord(session_hash[-1]) + 1))
+
+        with self.reader.connect() as conn:
+            all_sessions = [
+                x[0] for x in conn.execute(
+                    select(RecordingSession.session_hash).where(
+                        hash_sql_prefix))
+            ]
+            timestamps = conn.execute(
+                select(RecordingSession.start,
+                       RecordingSession.stop).where(hash_sql_prefix)).first()
+
+        if not all_sessions:  # No matches found
+            raise ValueError('No matching sessions hashes found')
+        if len(all_sessions) > 1:
+            raise ValueError(
+                f'Ambiguous SHA-1 hash prefix. Found sessions: {all_sessions}')
+
+        stop = timestamps.stop if timestamps.stop is not None else dt.now()
+        return timestamps.start, stop
+
     def replay_session(self, session_hash):
         """Replays the messages of a specified session.
         
@@ -141,36 +423,101 @@ class Database:
         Returns:
             pandas.DataFrame: the messages in the given session.
         """
+        return self.replay_messages(*self.session_window(session_hash))
 
-        hash_sql_prefix = RecordingSession.session_hash.ilike(
-            f'{session_hash}%')
+    def iter_session(self, session_hash, chunksize=10000):
+        """Streams the messages of a specified session in time order.
 
-        all_sessions = [
-            x[0] for x in self.session.execute(
-                select(RecordingSession.session_hash).where(hash_sql_prefix))
-        ]
+        Args:
+            session_hash (str): Session SHA-1 hash
+            chunksize (int): Number of rows read from a table at a time.
 
-        if not all_sessions:  # No matches found
-            raise ValueError('No matching sessions hashes found')
-        if len(all_sessions) > 1:
-            raise ValueError(
-                f'Ambiguous SHA-1 hash prefix. Found sessions: {all_sessions}')
+        Yields:
+            tuple: The message type and the message, see
+                :meth:`iter_messages`.
+        """
+        return self.iter_messages(*self.session_window(session_hash),
+                                  chunksize=chunksize)
+
+    def last_message(self, session_id=None):
+        """The time of the most recent message.
 
-        timestamps = [
-            x for x in self.session.execute(
-                select(RecordingSession.start, RecordingSession.stop).where(
-                    hash_sql_prefix))
-        ][0]
+        Args:
+            session_id (int): Only the messages of this recording session, or
+                None for any message.
 
-        return self.replay_messages(timestamps.start, timestamps.stop)
+        Returns:
+            datetime.datetime: The latest timestamp of any message, or None
+                for an empty database.
+        """
+        queries = []
+        for table in self.tables.values():
+            query = select(func.max(table.timestamp))
+            if session_id is not None:
+                query = query.where(table.session_id == session_id)
+            queries.append(query)
+        with self.reader.connect() as conn:
+            latest = [conn.execute(x).scalar() for x in queries]
+        latest = [x for x in latest if x is not None]
+        if not latest:
+            return None
+        if self.compact:
+            return codec.decode_timestamp(max(latest))
+        return max(latest)
 
     def close_session(self):
-        self.session.commit()
+        self.flush()
         self.session.close()
 
-    def __init__(self, dialect, url):
-        if dialect == 'sqlite':
-            database_url = f'sqlite:///{url}'
-        self.engine = create_engine(database_url)
-        Base.metadata.create_all(self.engine)
+    def __new__(cls, dialect, *args, **kwargs):
+        if cls is Database and dialect == 'duckdb':
+            # Optional dependency, only imported when asked for
+            from adsb_track.database.columnar import DuckDBDatabase
+            cls = DuckDBDatabase
+        return super(Database, cls).__new__(cls)
+
+    def __init__(self,
+                 dialect,
+                 url,
+                 buffer=25,
+                 flush_interval=5.0,
+                 compact=None,
+                 metrics=NULL_METRICS,
+                 read_only=False):
+        if dialect != 'sqlite':
+            raise ValueError(f'Dialect {dialect} is not supported')
+        if url in ('', ':memory:'):
+            # Another connection would open another, empty database
+            self.engine = self.reader = sqlite_engine(url)
+        else:
+            # Replay and analysis read through their own read-only connections
+            self.reader = sqlite_reader(url)
+            self.engine = self.reader if read_only else sqlite_engine(url)
+
+        detected = detect_compact(self.engine)
+        if compact is None:
+            compact = bool(detected)
+        elif detected is not None and detected != compact:
+            raise ValueError(f'Database {url} does not use the '
+                             f'{"compact" if compact else "original"} schema')
+        self.compact = compact
+        metadata = (CompactBase if compact else Base).metadata
+        self.tables = self.COMPACT_TABLES if compact else self.TABLES
+        self.summary_table = CompactMinuteSummary if compact else MinuteSummary
+        if not read_only:
+            metadata.create_all(self.engine)
+            add_columns(self.engine, metadata)
+            create_indexes(self.engine, metadata)
         self.session = Session(self.engine)
+
+        self.buffer = buffer
+        self.flush_interval = flush_interval
+        self.pending = {x: [] for x in self.COLUMNS}
+        self.pending_rows = 0
+        self.last_flush = time.monotonic()
+
+        self.flush_count = 0
+        self.flush_rows = 0
+        self.flush_seconds = 0.0
+        self.flush_max_seconds = 0.0
+        self.metrics = metrics
@@ -0,0 +1,293 @@
+import argparse
+from datetime import datetime as dt, timedelta
+import time
+
+import pandas as pd
+from sqlalchemy import delete, func, insert, select, text
+
+from adsb_track.const import *
+from adsb_track.database.interface import Database
+from adsb_track.database import codec
+
+SUMMARY_COLUMNS = (TIMESTAMP, ICAO, LATITUDE, LONGITUDE, MIN_ALTITUDE,
+                   MAX_ALTITUDE, SPEED, CALLSIGN, MESSAGES)
+
+# SQLite auto_vacuum mode that frees pages on request
+INCREMENTAL = 2
+
+
+def _minute(ts):
+    return pd.Timestamp(ts).floor('min').to_pydatetime()
+
+
+def summarize(df_ident, df_velocity, df_position):
+    """Rolls messages up into one row per aircraft and minute.
+
+    Args:
+        df_ident (pandas.DataFrame): Identification messages
+        df_velocity (pandas.DataFrame): Velocity messages
+        df_position (pandas.DataFrame): Position messages
+
+    Returns:
+        pandas.DataFrame: The mean position, altitude range, mean speed, last
+            callsign and number of messages of each aircraft and minute, in
+            the columns of :data:`SUMMARY_COLUMNS`.
+    """
+    keys = [ICAO, TIMESTAMP]
+
+    def by_minute(df):
+        df = df.assign(
+            **{TIMESTAMP: pd.to_datetime(df[TIMESTAMP]).dt.floor('min')})
+        return df.groupby(keys, sort=False)
+
+    parts = [
+        by_minute(df_position).agg(
+            **{
+                LATITUDE: (LATITUDE, 'mean'),
+                LONGITUDE: (LONGITUDE, 'mean'),
+                MIN_ALTITUDE: (ALTITUDE, 'min'),
+                MAX_ALTITUDE: (ALTITUDE, 'max'),
+                POSITION: (ICAO, 'size'),
+            }),
+        by_minute(df_velocity).agg(**{
+            SPEED: (SPEED, 'mean'),
+            VELOCITY: (ICAO, 'size'),
+        }),
+        by_minute(df_ident.sort_values(TIMESTAMP, kind='stable')).agg(
+            **{
+                CALLSIGN: (CALLSIGN, 'last'),
+                IDENT: (ICAO, 'size'),
+            }),
+    ]
+    df = pd.concat(parts, axis=1, join='outer')
+    df[MESSAGES] = df[[POSITION, VELOCITY, IDENT]].fillna(0).sum(
+        axis=1).astype(int)
+    df = df.reset_index().sort_values([TIMESTAMP, ICAO])
+    return df[list(SUMMARY_COLUMNS)]
+
+
+def merge_summaries(*frames):
+    """Combines summaries of the same aircraft and minute into one row.
+
+    Means are weighted by the number of messages of each summary, the
+    altitude range and message count cover all of them, and the callsign is
+    the last known one in the order of the frames.
+
+    Args:
+        *frames (pandas.DataFrame): Summaries in the columns of
+            :data:`SUMMARY_COLUMNS`, oldest first.
+
+    Returns:
+        pandas.DataFrame: One summary per aircraft and minute.
+    """
+    df = pd.concat(frames, ignore_index=True)
+    weights = df[MESSAGES]
+    means = (LATITUDE, LONGITUDE, SPEED)
+    df = df.assign(
+        **{f'{x}_sum': df[x] * weights for x in means},
+        **{f'{x}_weight': weights.where(df[x].notna()) for x in means})
+    grouped = df.groupby([ICAO, TIMESTAMP], sort=False)
+    merged = grouped.agg(
+        **{
+            MIN_ALTITUDE: (MIN_ALTITUDE, 'min'),
+            MAX_ALTITUDE: (MAX_ALTITUDE, 'max'),
+            CALLSIGN: (CALLSIGN, 'last'),
+            MESSAGES: (MESSAGES, 'sum'),
+        })
+    for x in means:
+        merged[x] = (grouped[f'{x}_sum'].sum(min_count=1) /
+                     grouped[f'{x}_weight'].sum())
+    merged = merged.reset_index().sort_values([TIMESTAMP, ICAO])
+    return merged[list(SUMMARY_COLUMNS)]
+
+
+def _records(df):
+    return df.astype(object).where(df.notna(), None).itertuples(index=False,
+                                                                name=None)
+
+
+def _first_message(db, after=None):
+    """The time of the oldest message, at or after a time if given."""
+    first = []
+    for table in db.tables.values():
+        query = select(func.min(table.timestamp))
+        if after is not None:
+            query = query.where(table.timestamp >= db._encode_time(after))
+        first.append(db.session.execute(query).scalar())
+    db.session.rollback()
+    first = [x for x in first if x is not None]
+    if not first:
+        return None
+    if db.compact:
+        return codec.decode_timestamp(min(first))
+    return min(first)
+
+
+def rollup(db, before, step=timedelta(minutes=1), pause=0.1):
+    """Replaces the messages older than a time with per minute summaries.
+
+    Messages are processed a slice of ``step`` at a time, oldest first. The
+    summaries of a slice are written and its messages deleted in one short
+    transaction, followed by a ``pause``, so a recorder writing to the
+    database at the same time waits at most for one slice. An interrupted
+    run can be restarted, the slices done are gone from the message tables.
+    Only the messages read into the summaries are deleted, messages a
+    recorder commits into a slice meanwhile are left for the next run.
+    Messages recorded later into a minute already rolled up, for example by
+    decoding an old capture, are merged into its summaries with
+    :func:`merge_summaries`, so every aircraft and minute keeps one summary
+    however often the job runs.
+
+    Args:
+        db (adsb_track.database.Database): The database
+        before (datetime.datetime): Messages before the minute of this time
+            are rolled up.
+        step (datetime.timedelta): Length of the slices, whole minutes.
+        pause (float): Seconds to wait between slices.
+
+    Returns:
+        dict: The number of summaries added and of messages deleted by
+            message type.
+    """
+    db.flush()
+    before = _minute(before)
+    counts = {SUMMARY: 0, IDENT: 0, VELOCITY: 0, POSITION: 0}
+    start = _first_message(db)
+    while start is not None and start < before:
+        start = _minute(start)
+        stop = min(start + step, before)
+        bounds = db._encode_time(start), db._encode_time(stop)
+        frames = [
+            db._read_messages(
+                select(x).where(x.timestamp >= bounds[0],
+                                x.timestamp < bounds[1]))
+            for x in db.tables.values()
+        ]
+        summary = summarize(*frames)
+        table = db.summary_table
+        in_slice = (table.timestamp >= bounds[0], table.timestamp < bounds[1])
+        existing = db._read_messages(select(table).where(*in_slice))
+        if len(existing):
+            summary = merge_summaries(existing[list(SUMMARY_COLUMNS)],
+                                      summary)
+        rows = list(_records(summary))
+        if db.compact:
+            rows = codec.encode_rows(SUMMARY_COLUMNS, rows)
+        with db.engine.begin() as conn:
+            if len(existing):
+                conn.execute(delete(table.__table__).where(*in_slice))
+            if rows:
+                conn.execute(insert(table.__table__),
+                             [dict(zip(SUMMARY_COLUMNS, x)) for x in rows])
+            for (kind, table), df in zip(db.tables.items(), frames):
+                if not len(df):
+                    continue
+                # Only the rows summarized, not those recorded since
+                counts[kind] += conn.execute(
+                    delete(table.__table__).where(
+                        table.timestamp >= bounds[0],
+                        table.timestamp < bounds[1],
+                        table.id <= int(df.index.max()))).rowcount
+        counts[SUMMARY] += len(rows) - len(existing)
+        time.sleep(pause)
+        # Skip the time without messages
+        start = _first_message(db, stop)
+    return counts
+
+
+def enable_incremental_vacuum(engine):
+    """Switches a SQLite database to incremental vacuum.
+
+    Databases created by :class:`adsb_track.database.Database` already use
+    it. Older ones need a full ``VACUUM`` to switch, which rewrites the file
+    and blocks writers until done, so this is a one time step.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The database engine.
+    """
+    with engine.connect().execution_options(
+            isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text('PRAGMA auto_vacuum = INCREMENTAL'))
+        conn.execute(text('VACUUM'))
+
+
+def vacuum(engine, pages=1000, pause=0.1):
+    """Returns the free pages of a SQLite database to the file system.
+
+    Pages are freed ``pages`` at a time, each step in its own transaction,
+    with a ``pause`` in between.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The database engine.
+        pages (int): Pages freed per step.
+        pause (float): Seconds to wait between steps.
+
+    Returns:
+        int: The number of pages freed, or None if the database does not use
+            incremental vacuum, see :func:`enable_incremental_vacuum`.
+    """
+    with engine.connect() as conn:
+        if conn.execute(text('PRAGMA auto_vacuum')).scalar() != INCREMENTAL:
+            return None
+        free = conn.execute(text('PRAGMA freelist_count')).scalar()
+    freed = 0
+    while free:
+        with engine.connect() as conn:
+            # A plain execute runs one step of the pragma, freeing one page,
+            # a script runs it to completion in its own transaction
+            conn.connection.driver_connection.executescript(
+                f'PRAGMA incremental_vacuum({pages});')
+            remaining = conn.execute(text('PRAGMA freelist_count')).scalar()
+        freed += free - remaining
+        if remaining >= free:
+            break
+        free = remaining
+        time.sleep(pause)
+    return freed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Roll old messages up into per minute summaries and '
+        'reclaim their space.')
+    parser.add_argument('database',
+                        help='The SQLite database file to maintain.',
+                        metavar='DATABASE')
+    parser.add_argument('--days',
+                        type=float,
+                        help='Roll up messages older than this many days')
+    parser.add_argument('--step',
+                        default=1,
+                        type=int,
+                        help='Minutes of messages rolled up per transaction')
+    parser.add_argument('--pause',
+                        default=0.1,
+                        type=float,
+                        help='Seconds to wait between transactions')
+    parser.add_argument('--vacuum-pages',
+                        default=1000,
+                        type=int,
+                        help='Pages freed per transaction, 0 skips the vacuum')
+    parser.add_argument('--enable-incremental-vacuum',
+                        action='store_true',
+                        help='Switch an older database to incremental vacuum '
+                        'with a full VACUUM, which blocks writers until done')
+    args = parser.parse_args()
+
+    db = Database('sqlite', args.database)
+    if args.days is not None:
+        counts = rollup(db, dt.now() - timedelta(days=args.days),
+                        timedelta(minutes=args.step), args.pause)
+        print(f'Wrote {counts[SUMMARY]} summaries of '
+              f'{counts[IDENT]} ident, {counts[VELOCITY]} velocity and '
+              f'{counts[POSITION]} position messages')
+    db.close_session()
+    if args.enable_incremental_vacuum:
+        enable_incremental_vacuum(db.engine)
+    if args.vacuum_pages:
+        freed = vacuum(db.engine, args.vacuum_pages, args.pause)
+        if freed is None:
+            print('The database does not use incremental vacuum, see '
+                  '--enable-incremental-vacuum')
+        else:
+            print(f'Freed {freed} pages')
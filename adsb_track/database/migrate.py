@@ -0,0 +1,102 @@
+import argparse
+
+from sqlalchemy import create_engine, inspect, text, Integer
+
+from adsb_track.database.schema import Base, CompactBase
+
+
+def detect_compact(engine):
+    """Determines which schema an existing database uses.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The database engine.
+
+    Returns:
+        bool or None: True for the compact schema, False for the original
+            one, and None when the database has no message tables yet.
+    """
+    if 'position' not in inspect(engine).get_table_names():
+        return None
+    icao = [x for x in inspect(engine).get_columns('position')
+            if x['name'] == 'icao'][0]
+    return isinstance(icao['type'], Integer)
+
+
+def add_columns(engine, metadata=Base.metadata):
+    """Adds the schema columns missing from the tables of an existing database.
+
+    New columns are nullable, rows recorded before the column was added
+    read as null.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The database engine.
+        metadata (sqlalchemy.MetaData): The schema to bring the database to.
+
+    Returns:
+        list of str: The ``table.column`` names of the columns added.
+    """
+    added = []
+    existing_tables = inspect(engine).get_table_names()
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {
+                x['name'] for x in inspect(conn).get_columns(table.name)
+            }
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(engine.dialect)
+                conn.execute(
+                    text(f'ALTER TABLE {table.name} '
+                         f'ADD COLUMN {column.name} {column_type}'))
+                added.append(f'{table.name}.{column.name}')
+    return added
+
+
+def create_indexes(engine, metadata=Base.metadata):
+    """Creates the schema indexes missing from an existing database.
+
+    ``create_all`` skips tables that already exist, so databases recorded
+    before an index was added to the schema do not get it on their own.
+
+    Args:
+        engine (sqlalchemy.engine.Engine): The database engine.
+        metadata (sqlalchemy.MetaData): The schema to bring the database to.
+
+    Returns:
+        list of str: The names of the indexes created.
+    """
+    created = []
+    existing_tables = inspect(engine).get_table_names()
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {x['name'] for x in inspect(engine).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(engine)
+                created.append(index.name)
+    if created:
+        with engine.begin() as conn:
+            # Refresh the planner statistics for the new indexes
+            conn.execute(text('ANALYZE'))
+    return created
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Bring an ADS-B recording database up to date.')
+    parser.add_argument('database',
+                        help='The SQLite database file to migrate.',
+                        metavar='DATABASE')
+    args = parser.parse_args()
+
+    engine = create_engine(f'sqlite:///{args.database}')
+    metadata = (CompactBase if detect_compact(engine) else Base).metadata
+    metadata.create_all(engine)
+    for name in add_columns(engine, metadata):
+        print(f'Added column {name}')
+    for name in create_indexes(engine, metadata):
+        print(f'Created index {name}')
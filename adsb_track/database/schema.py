@@ -1,5 +1,6 @@
 from sqlalchemy.orm import registry
-from sqlalchemy import Column, Integer, String, DateTime, SmallInteger, Float
+from sqlalchemy import (Column, Integer, BigInteger, String, DateTime,
+                        SmallInteger, Float, Index, ForeignKey)
 
 mapper_registry = registry()
 Base = mapper_registry.generate_base()
@@ -9,7 +10,7 @@ class RecordingSession(Base):
     __tablename__ = 'session'
 
     id = Column(Integer, primary_key=True)
-    session_hash = Column(String(40), nullable=False)
+    session_hash = Column(String(40), nullable=False, index=True)
     host = Column(String, nullable=False)
     port = Column(Integer, nullable=False)
     start = Column(DateTime, nullable=False)
@@ -24,6 +25,10 @@ class RecordingSession(Base):
 
 class Ident(Base):
     __tablename__ = 'ident'
+    __table_args__ = (
+        Index('ix_ident_timestamp', 'timestamp'),
+        Index('ix_ident_icao_timestamp', 'icao', 'timestamp'),
+    )
 
     id = Column(Integer, primary_key=True)
     timestamp = Column(DateTime, nullable=False)
@@ -31,15 +36,21 @@ class Ident(Base):
     callsign = Column(String(8), nullable=False)
     typecode = Column(SmallInteger, nullable=False)
     category = Column(SmallInteger, nullable=False)
+    session_id = Column(Integer, ForeignKey('session.id'))
 
     def __repr__(self):
         return (f'Ident(id={self.id!r}, timestamp={self.id!r}, '
                 f'icao={self.icao!r}, callsign={self.callsign!r}, '
-                f'typecode={self.typecode!r}, category={self.category!r})')
+                f'typecode={self.typecode!r}, category={self.category!r}, '
+                f'session_id={self.session_id!r})')
 
 
 class Velocity(Base):
     __tablename__ = 'velocity'
+    __table_args__ = (
+        Index('ix_velocity_timestamp', 'timestamp'),
+        Index('ix_velocity_icao_timestamp', 'icao', 'timestamp'),
+    )
 
     id = Column(Integer, primary_key=True)
     timestamp = Column(DateTime, nullable=False)
@@ -50,6 +61,7 @@ class Velocity(Base):
     vertical_speed_src = Column(String)  #TODO make enum
     angle = Column(Float)
     angle_src = Column(String)  #TODO make enum
+    session_id = Column(Integer, ForeignKey('session.id'))
 
     def __repr__(self):
         return (f'Velocity(id={self.id!r}, timestamp={self.timestamp!r}, '
@@ -58,11 +70,16 @@ class Velocity(Base):
                 f'vertical_speed={self.vertical_speed!r}, '
                 f'angle={self.angle!r}, '
                 f'vertical_speed_src={self.vertical_speed_src!r}, '
-                f'angle_src={self.angle_src!r})')
+                f'angle_src={self.angle_src!r}, '
+                f'session_id={self.session_id!r})')
 
 
 class Position(Base):
     __tablename__ = 'position'
+    __table_args__ = (
+        Index('ix_position_timestamp', 'timestamp'),
+        Index('ix_position_icao_timestamp', 'icao', 'timestamp'),
+    )
 
     id = Column(Integer, primary_key=True)
     timestamp = Column(DateTime, nullable=False)
@@ -71,9 +88,118 @@ class Position(Base):
     longitude = Column(Float)
     altitude = Column(Integer)  #TODO determine if small int works
     altitude_src = Column(String)  #TODO make enum
+    session_id = Column(Integer, ForeignKey('session.id'))
 
     def __repr__(self):
         return (f'Position(id={self.id!r}, timestamp={self.timestamp!r}, '
                 f'icao={self.icao!r}, latitude={self.latitude!r}, '
                 f'longitude={self.longitude!r}, altitude={self.altitude!r}, '
-                f'altitude_src={self.altitude_src!r})')
+                f'altitude_src={self.altitude_src!r}, '
+                f'session_id={self.session_id!r})')
+
+
+
+class MinuteSummary(Base):
+    """The messages of an aircraft in one minute, rolled up by
+    :mod:`adsb_track.database.maintain` once the messages are deleted."""
+    __tablename__ = 'minute_summary'
+    __table_args__ = (
+        Index('ix_minute_summary_timestamp', 'timestamp'),
+        Index('ix_minute_summary_icao_timestamp', 'icao', 'timestamp'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(DateTime, nullable=False)
+    icao = Column(String(6), nullable=False)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    min_altitude = Column(Integer)
+    max_altitude = Column(Integer)
+    speed = Column(Float)
+    callsign = Column(String(8))
+    messages = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return (f'MinuteSummary(id={self.id!r}, '
+                f'timestamp={self.timestamp!r}, icao={self.icao!r}, '
+                f'latitude={self.latitude!r}, longitude={self.longitude!r}, '
+                f'min_altitude={self.min_altitude!r}, '
+                f'max_altitude={self.max_altitude!r}, speed={self.speed!r}, '
+                f'callsign={self.callsign!r}, messages={self.messages!r})')
+
+# Compact schema, storing ICAO24 codes as integers, timestamps as microseconds
+# and the source and type strings as codes. See adsb_track.database.codec
+compact_registry = registry()
+CompactBase = compact_registry.generate_base()
+RecordingSession.__table__.to_metadata(CompactBase.metadata)
+
+
+class CompactIdent(CompactBase):
+    __tablename__ = 'ident'
+    __table_args__ = (
+        Index('ix_ident_timestamp', 'timestamp'),
+        Index('ix_ident_icao_timestamp', 'icao', 'timestamp'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(BigInteger, nullable=False)
+    icao = Column(Integer, nullable=False)
+    callsign = Column(String(8), nullable=False)
+    typecode = Column(SmallInteger, nullable=False)
+    category = Column(SmallInteger, nullable=False)
+    session_id = Column(Integer, ForeignKey('session.id'))
+
+
+class CompactVelocity(CompactBase):
+    __tablename__ = 'velocity'
+    __table_args__ = (
+        Index('ix_velocity_timestamp', 'timestamp'),
+        Index('ix_velocity_icao_timestamp', 'icao', 'timestamp'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(BigInteger, nullable=False)
+    icao = Column(Integer, nullable=False)
+    speed = Column(SmallInteger)
+    speed_type = Column(SmallInteger)
+    vertical_speed = Column(SmallInteger)
+    vertical_speed_src = Column(SmallInteger)
+    angle = Column(Float)
+    angle_src = Column(SmallInteger)
+    session_id = Column(Integer, ForeignKey('session.id'))
+
+
+class CompactPosition(CompactBase):
+    __tablename__ = 'position'
+    __table_args__ = (
+        Index('ix_position_timestamp', 'timestamp'),
+        Index('ix_position_icao_timestamp', 'icao', 'timestamp'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(BigInteger, nullable=False)
+    icao = Column(Integer, nullable=False)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    altitude = Column(Integer)
+    altitude_src = Column(SmallInteger)
+    session_id = Column(Integer, ForeignKey('session.id'))
+
+
+class CompactMinuteSummary(CompactBase):
+    __tablename__ = 'minute_summary'
+    __table_args__ = (
+        Index('ix_minute_summary_timestamp', 'timestamp'),
+        Index('ix_minute_summary_icao_timestamp', 'icao', 'timestamp'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(BigInteger, nullable=False)
+    icao = Column(Integer, nullable=False)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    min_altitude = Column(Integer)
+    max_altitude = Column(Integer)
+    speed = Column(Float)
+    callsign = Column(String(8))
+    messages = Column(Integer, nullable=False)
@@ -0,0 +1,257 @@
+from datetime import datetime as dt
+import time
+
+import numpy as np
+import pyModeS as pms
+
+from adsb_track.metrics import NULL_METRICS
+from adsb_track.pipeline import RecordBatch
+
+# Mode S CRC-24 generator polynomial, including the leading bit
+CRC_GENERATOR = 0x1FFF409
+
+LONG_MSG_BYTES = 14
+LONG_MSG_HEX = 2 * LONG_MSG_BYTES
+
+TC_POS = tuple(range(9, 19)) + tuple(range(20, 23))
+TC_VELOCITY = (19,)
+TC_IDENT = tuple(range(1, 5))
+
+
+def _crc_table():
+    table = np.zeros(256, dtype=np.uint32)
+    for byte in range(256):
+        crc = byte << 16
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= CRC_GENERATOR
+        table[byte] = crc & 0xFFFFFF
+    return table
+
+
+CRC_TABLE = _crc_table()
+
+# Lookup of typecode to type class, 0 is not recorded
+_TYPE_CLASS = np.zeros(32, dtype=np.uint8)
+_TYPE_CLASS[list(TC_POS)] = 1
+_TYPE_CLASS[list(TC_VELOCITY)] = 2
+_TYPE_CLASS[list(TC_IDENT)] = 3
+
+
+def hex_to_frames(messages):
+    """Converts the long hexadecimal messages of a batch to a byte array.
+
+    Args:
+        messages (list): ``(msg, ts)`` pairs with hexadecimal messages.
+
+    Returns:
+        tuple: The ``(n, 14)`` uint8 array of the long messages and the index
+            of each row in the input batch.
+    """
+    index = [i for i, x in enumerate(messages) if len(x[0]) == LONG_MSG_HEX]
+    try:
+        raw = bytes.fromhex(''.join([messages[i][0] for i in index]))
+    except ValueError:
+        raw = b''
+    # fromhex skips whitespace, which would shift the following frames
+    if len(raw) != LONG_MSG_BYTES * len(index):
+        # A malformed message, fall back to converting them one at a time
+        valid, frames = [], []
+        for i in index:
+            try:
+                frame = bytes.fromhex(messages[i][0])
+            except ValueError:
+                continue
+            if len(frame) == LONG_MSG_BYTES:
+                valid.append(i)
+                frames.append(frame)
+        index = valid
+        raw = b''.join(frames)
+    frames = np.frombuffer(raw, dtype=np.uint8).reshape(-1, LONG_MSG_BYTES)
+    return frames, np.asarray(index, dtype=np.intp)
+
+
+def bytes_to_frames(payloads):
+    """Converts binary long messages to a byte array.
+
+    Args:
+        payloads (list of bytes): The messages, 14 bytes each.
+
+    Returns:
+        numpy.ndarray: The ``(n, 14)`` uint8 array of the messages.
+    """
+    return np.frombuffer(b''.join(payloads),
+                         dtype=np.uint8).reshape(-1, LONG_MSG_BYTES)
+
+
+def crc_remainder(frames):
+    """Computes the CRC-24 remainder of each message.
+
+    Args:
+        frames (numpy.ndarray): ``(n, 14)`` uint8 array of long messages.
+
+    Returns:
+        numpy.ndarray: The remainder of each message, zero when the parity
+            matches. Equal to ``pyModeS.crc`` of the message.
+    """
+    frames = frames.astype(np.uint32)
+    crc = np.zeros(len(frames), dtype=np.uint32)
+    for i in range(LONG_MSG_BYTES - 3):
+        crc = ((crc << 8) & 0xFFFFFF) ^ CRC_TABLE[((crc >> 16) ^ frames[:, i])
+                                                  & 0xFF]
+    parity = (frames[:, 11] << 16) | (frames[:, 12] << 8) | frames[:, 13]
+    return crc ^ parity
+
+
+def decode_fields(frames):
+    """Decodes the header fields of a batch of long messages.
+
+    Args:
+        frames (numpy.ndarray): ``(n, 14)`` uint8 array of long messages.
+
+    Returns:
+        dict: Arrays of the downlink format, CRC remainder, ICAO24 address as
+            an integer and typecode of each message.
+    """
+    icao = ((frames[:, 1].astype(np.uint32) << 16) |
+            (frames[:, 2].astype(np.uint32) << 8) | frames[:, 3])
+    return {
+        'df': frames[:, 0] >> 3,
+        'crc': crc_remainder(frames),
+        'icao': icao,
+        'tc': frames[:, 4] >> 3,
+    }
+
+
+def valid_adsb(fields):
+    """Mask of the messages that are DF17 with a matching CRC.
+
+    Args:
+        fields (dict): The output of :func:`decode_fields`.
+
+    Returns:
+        numpy.ndarray: Boolean mask of the valid ADS-B messages.
+    """
+    return (fields['df'] == 17) & (fields['crc'] == 0)
+
+
+def split_batch(messages, metrics=NULL_METRICS):
+    """Filters and sorts a batch of messages by type class.
+
+    Only DF17 messages with a valid CRC and a position, velocity, or
+    identification typecode are kept. The ICAO24 address and typecode match
+    ``pyModeS.adsb.icao`` and ``pyModeS.adsb.typecode``.
+
+    Args:
+        messages (list): ``(msg, ts)`` pairs. The messages are either all
+            hexadecimal strings or all 14 byte binary long messages, which are
+            converted to hexadecimal only once they pass the filter.
+        metrics (adsb_track.metrics.Metrics): Counts the messages by outcome.
+
+    Returns:
+        tuple: Lists of ``(msg, ts, icao, tc)`` for the position, velocity,
+            and identification messages, each in the order received, with
+            uppercase hexadecimal messages.
+    """
+    binary = bool(messages) and not isinstance(messages[0][0], str)
+    if binary:
+        frames = bytes_to_frames([x[0] for x in messages])
+        index = np.arange(len(messages))
+    else:
+        frames, index = hex_to_frames(messages)
+    fields = decode_fields(frames)
+    if metrics.enabled:
+        metrics.count_frames(fields)
+    type_class = np.where(valid_adsb(fields), _TYPE_CLASS[fields['tc']], 0)
+
+    groups = [], [], []
+    for kind, group in enumerate(groups, 1):
+        for i, tc in zip(index[type_class == kind].tolist(),
+                         fields['tc'][type_class == kind].tolist()):
+            msg, ts = messages[i][0], messages[i][1]
+            # Raw feeds may send lowercase, codes are recorded uppercase
+            msg = msg.hex().upper() if binary else msg.upper()
+            group.append((msg, ts, msg[2:8], tc))
+    return groups
+
+
+class MessageDecoder:
+    """Decodes ADS-B messages into the record calls of a writer.
+
+    The decoder expects the ``gs_lat`` and ``gs_lon`` of the receiver, used
+    as the reference for positions, the ``writer`` the decoded messages are
+    recorded to and the ``session_id`` they are tagged with.
+    """
+
+    metrics = NULL_METRICS
+
+    def process_msg(self, msg, ts, icao, tc, writer=None):
+        if tc in TC_POS:
+            self.process_position(msg, ts, icao, tc, writer)
+        elif tc in TC_VELOCITY:
+            self.process_velocity(msg, ts, icao, writer)
+        elif tc in TC_IDENT:
+            self.process_ident(msg, ts, icao, tc, writer)
+
+    def process_position(self, msg, ts, icao, tc, writer=None):
+        alt_src = 'BARO' if tc < 19 else 'GNSS'
+        alt = pms.adsb.altitude(msg)
+        lat, lon = pms.adsb.position_with_ref(msg, self.gs_lat, self.gs_lon)
+
+        writer = self.writer if writer is None else writer
+        writer.record_position(ts, icao, lat, lon, alt, alt_src,
+                               self.session_id)
+
+    def process_velocity(self, msg, ts, icao, writer=None):
+        velocity = pms.adsb.velocity(msg, True)
+
+        writer = self.writer if writer is None else writer
+        writer.record_velocity(ts, icao, *velocity, self.session_id)
+
+    def process_ident(self, msg, ts, icao, tc, writer=None):
+        callsign = pms.adsb.callsign(msg).strip('_')
+        category = pms.adsb.category(msg)
+
+        writer = self.writer if writer is None else writer
+        writer.record_ident(ts, icao, callsign, tc, category, self.session_id)
+
+    def decode_messages(self, messages, writer=None):
+        """Decodes messages and records them.
+
+        Args:
+            messages (list): ``(msg, ts)`` pairs.
+            writer: Receives the record calls instead of ``self.writer``.
+        """
+        writer = self.writer if writer is None else writer
+        metrics = self.metrics
+        timed = metrics.sampled()
+        if timed:
+            start = time.perf_counter()
+        positions, velocities, idents = split_batch(messages, metrics)
+        for msg, ts, icao, tc in positions:
+            self.process_position(msg, dt.fromtimestamp(ts), icao, tc, writer)
+        for msg, ts, icao, _ in velocities:
+            self.process_velocity(msg, dt.fromtimestamp(ts), icao, writer)
+        for msg, ts, icao, tc in idents:
+            self.process_ident(msg, dt.fromtimestamp(ts), icao, tc, writer)
+        if metrics.enabled:
+            metrics.decoded.inc(len(positions) + len(velocities) + len(idents))
+        if timed:
+            metrics.decode_seconds.observe(time.perf_counter() - start)
+
+    def decode_batch(self, messages):
+        """Decodes messages into record calls, run by the pipeline decoder.
+
+        The calls are collected in a new batch, ``self.writer`` is left as
+        is.
+
+        Args:
+            messages (list): ``(msg, ts)`` pairs from the receive loop.
+
+        Returns:
+            adsb_track.pipeline.RecordBatch: The record calls of the messages.
+        """
+        batch = RecordBatch()
+        self.decode_messages(messages, batch)
+        return batch
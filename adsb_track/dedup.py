@@ -0,0 +1,89 @@
+class Deduplicator:
+    """Drops copies of a message heard by more than one receiver.
+
+    A message is a duplicate when the same payload was accepted from another
+    receiver less than ``window`` seconds earlier. A receiver repeating its
+    own payload, such as the unchanged identification of a parked aircraft,
+    is not deduplicated. Accepted payloads are kept with their receiver in
+    two hash maps, the current and the previous window. When the current map
+    is older than the window it becomes the previous map and the oldest map
+    is discarded, so memory is bounded by the messages of two windows and a
+    payload is remembered for between one and two windows.
+
+    Hexadecimal and binary messages are compared by their bytes, so copies
+    from receivers with different output formats match.
+
+    Args:
+        window (float): Seconds within which a repeated payload is dropped.
+    """
+
+    def __init__(self, window=1.0):
+        self.window = window
+        self.current = {}
+        self.previous = {}
+        self.rotated = None
+        self.counts = {}
+
+    def _rotate(self, ts):
+        if self.rotated is None:
+            self.rotated = ts
+        elif ts - self.rotated >= self.window:
+            if ts - self.rotated >= 2 * self.window:
+                # Nothing heard for a whole window, both maps are stale
+                self.previous = {}
+            else:
+                self.previous = self.current
+            self.current = {}
+            self.rotated = ts
+
+    @staticmethod
+    def _key(msg):
+        if isinstance(msg, str):
+            try:
+                return bytes.fromhex(msg)
+            except ValueError:
+                return msg
+        return bytes(msg)
+
+    def filter(self, messages, source=None):
+        """Removes the duplicate messages of a batch.
+
+        Args:
+            messages (list): ``(msg, ts)`` pairs in the order received.
+            source (Hashable): The receiver of the batch.
+
+        Returns:
+            list: The ``(msg, ts)`` pairs not heard from another receiver
+                within the window.
+        """
+        kept = []
+        current, previous = self.current, self.previous
+        for x in messages:
+            if self.rotated is None or x[1] - self.rotated >= self.window:
+                self._rotate(x[1])
+                current, previous = self.current, self.previous
+            key = Deduplicator._key(x[0])
+            heard = current.get(key, previous.get(key, source))
+            if heard != source:
+                continue
+            current[key] = source
+            kept.append(x)
+        counts = self.counts.setdefault(source, [0, 0])
+        counts[0] += len(messages)
+        counts[1] += len(messages) - len(kept)
+        return kept
+
+    def stats(self):
+        """Counters of each receiver.
+
+        Returns:
+            dict: The number of messages, duplicates dropped, and the
+                fraction of messages dropped by receiver.
+        """
+        return {
+            source: {
+                'messages': messages,
+                'duplicates': duplicates,
+                'rate': duplicates / messages if messages else 0.0,
+            } for source, (messages, duplicates) in self.counts.items()
+        }
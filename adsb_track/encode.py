@@ -0,0 +1,153 @@
+import math
+
+from adsb_track.decode import CRC_TABLE, LONG_MSG_BYTES
+
+# Downlink format 17 with capability 5
+DF17_HEADER = 0x8D
+
+CALLSIGN_CHARSET = ('#ABCDEFGHIJKLMNOPQRSTUVWXYZ#####_###############'
+                    '0123456789######')
+_CALLSIGN_CODES = {x: i for i, x in enumerate(CALLSIGN_CHARSET) if x != '#'}
+_CALLSIGN_SPACE = _CALLSIGN_CODES['_']
+
+CPR_BITS = 17
+CPR_SCALE = 1 << CPR_BITS
+CPR_NZ = 15
+
+
+def parity(data):
+    """Computes the CRC-24 parity of a long message.
+
+    Args:
+        data (bytes): The first 11 bytes of the message.
+
+    Returns:
+        int: The parity, the last 3 bytes of the message.
+    """
+    crc = 0
+    for byte in data[:LONG_MSG_BYTES - 3]:
+        crc = ((crc << 8) & 0xFFFFFF) ^ int(CRC_TABLE[((crc >> 16) ^ byte)
+                                                      & 0xFF])
+    return crc
+
+
+def df17(icao, me):
+    """Builds an extended squitter.
+
+    Args:
+        icao (str): Aircraft ICAO24 code
+        me (int): The 56 bit message field.
+
+    Returns:
+        str: The uppercase hexadecimal message with a valid CRC.
+    """
+    data = bytes([DF17_HEADER]) + bytes.fromhex(icao) + me.to_bytes(7, 'big')
+    return (data + parity(data).to_bytes(3, 'big')).hex().upper()
+
+
+def encode_ident(icao, callsign, tc=4, category=0):
+    """Encodes an identification message.
+
+    Args:
+        icao (str): Aircraft ICAO24 code
+        callsign (str): Up to 8 letters, digits and spaces. Other
+            characters, such as the ``#`` pyModeS decodes unknown codes to,
+            are encoded as spaces.
+        tc (int): Typecode, 1 to 4
+        category (int): Aircraft category, 0 to 7
+
+    Returns:
+        str: The hexadecimal message.
+    """
+    me = tc << 51 | category << 48
+    for i, char in enumerate(callsign.upper().ljust(8)[:8].replace(' ', '_')):
+        me |= _CALLSIGN_CODES.get(char, _CALLSIGN_SPACE) << (42 - 6 * i)
+    return df17(icao, me)
+
+
+def encode_velocity(icao, speed, track, vertical_speed, baro=False):
+    """Encodes an airborne velocity message of ground speed, subtype 1.
+
+    Args:
+        icao (str): Aircraft ICAO24 code
+        speed (float): Ground speed in knots, up to 1021
+        track (float): Track angle in degrees from true north
+        vertical_speed (float): Vertical rate in feet per minute
+        baro (bool): Barometric instead of GNSS vertical rate
+
+    Returns:
+        str: The hexadecimal message.
+    """
+    v_ew = speed * math.sin(math.radians(track))
+    v_ns = speed * math.cos(math.radians(track))
+    vr = min(round(abs(vertical_speed) / 64) + 1, 511)
+    me = (19 << 51 | 1 << 48 | (v_ew < 0) << 42 |
+          min(round(abs(v_ew)) + 1, 1023) << 32 | (v_ns < 0) << 31 |
+          min(round(abs(v_ns)) + 1, 1023) << 21 | baro << 20 |
+          (vertical_speed < 0) << 19 | vr << 10)
+    return df17(icao, me)
+
+
+def cpr_nl(lat):
+    """Number of longitude zones at a latitude."""
+    if lat == 0:
+        return 59
+    if abs(lat) == 87:
+        return 2
+    if abs(lat) > 87:
+        return 1
+    a = 1 - math.cos(math.pi / (2 * CPR_NZ))
+    b = math.cos(math.radians(abs(lat)))**2
+    return math.floor(2 * math.pi / math.acos(1 - a / b))
+
+
+def encode_cpr(lat, lon, odd):
+    """Encodes an airborne position in compact position reporting.
+
+    Args:
+        lat (float): Latitude
+        lon (float): Longitude
+        odd (bool): Odd instead of even format
+
+    Returns:
+        tuple of int: The 17 bit encoded latitude and longitude.
+    """
+    dlat = 360 / (4 * CPR_NZ - odd)
+    yz = math.floor(CPR_SCALE * (lat % dlat) / dlat + 0.5)
+    rlat = dlat * (yz / CPR_SCALE + math.floor(lat / dlat))
+    dlon = 360 / max(cpr_nl(rlat) - odd, 1)
+    xz = math.floor(CPR_SCALE * (lon % dlon) / dlon + 0.5)
+    return yz % CPR_SCALE, xz % CPR_SCALE
+
+
+def encode_altitude(alt):
+    """Encodes a barometric altitude in 25 feet steps.
+
+    Args:
+        alt (float): Altitude in feet, -1000 to 50175
+
+    Returns:
+        int: The 12 bit altitude field.
+    """
+    n = max(0, min(round((alt + 1000) / 25), 2047))
+    return (n >> 4) << 5 | 1 << 4 | (n & 0xF)
+
+
+def encode_position(icao, lat, lon, alt, odd, tc=11):
+    """Encodes an airborne position message with barometric altitude.
+
+    Args:
+        icao (str): Aircraft ICAO24 code
+        lat (float): Latitude
+        lon (float): Longitude
+        alt (float): Altitude in feet
+        odd (bool): Odd instead of even CPR format
+        tc (int): Typecode, 9 to 18
+
+    Returns:
+        str: The hexadecimal message.
+    """
+    lat_cpr, lon_cpr = encode_cpr(lat, lon, odd)
+    me = (tc << 51 | encode_altitude(alt) << 36 | odd << 34 | lat_cpr << 17 |
+          lon_cpr)
+    return df17(icao, me)
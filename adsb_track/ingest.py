@@ -0,0 +1,387 @@
+import argparse
+import asyncio
+from collections import namedtuple
+from datetime import datetime as dt
+import time
+
+from adsb_track.beast import BeastReader, MODE_S_LONG
+from adsb_track.database import Database
+from adsb_track.decode import MessageDecoder, LONG_MSG_BYTES
+from adsb_track.dedup import Deduplicator
+from adsb_track.pipeline import Pipeline, POLICIES, BLOCK
+from adsb_track.stream import FlightRecorder
+
+RAWTYPES = 'raw', 'beast', 'skysense'
+
+SKYSENSE_LENGTH = 24
+SKYSENSE_START = 0x24
+
+Source = namedtuple('Source', ['host', 'port', 'rawtype', 'lat', 'lon'])
+Source.__doc__ = """A receiver to record from.
+
+Attributes:
+    host (str): Host of the receiver output.
+    port (int): Port of the receiver output.
+    rawtype (str): Output format, ``'raw'``, ``'beast'`` or ``'skysense'``.
+    lat (float): Receiver latitude, the reference for decoding positions.
+    lon (float): Receiver longitude.
+"""
+
+
+class RawReader:
+    """Incremental parser of the ``*<hex>;`` raw output format."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Parses the messages completed by received data.
+
+        Args:
+            data (bytes): Data received from the socket.
+
+        Returns:
+            list of str: The hexadecimal messages.
+        """
+        buf = self.buffer
+        buf += data
+        end = buf.rfind(b';')
+        if end < 0:
+            return []
+        messages = []
+        for part in bytes(buf[:end]).split(b';'):
+            start = part.rfind(b'*')
+            if start >= 0:
+                messages.append(part[start + 1:].decode('ascii', 'replace'))
+        del buf[:end + 1]
+        return messages
+
+
+class SkysenseReader:
+    """Incremental parser of the 24 byte Skysense output format.
+
+    Only long messages are kept, as binary messages.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Parses the long messages completed by received data.
+
+        Args:
+            data (bytes): Data received from the socket.
+
+        Returns:
+            list of bytes: The 14 byte messages.
+        """
+        buf = self.buffer
+        buf += data
+        messages = []
+        pos = 0
+        while len(buf) - pos > SKYSENSE_LENGTH:
+            if (buf[pos] == SKYSENSE_START and
+                    buf[pos + SKYSENSE_LENGTH] == SKYSENSE_START):
+                if buf[pos + 1] >> 7:
+                    messages.append(bytes(buf[pos + 1:pos + 1 +
+                                              LONG_MSG_BYTES]))
+                pos += SKYSENSE_LENGTH
+            else:
+                pos += 1
+        del buf[:pos]
+        return messages
+
+
+class BeastMessageReader(BeastReader):
+    """Parser of the Beast format keeping only the long Mode-S messages."""
+
+    def feed(self, data):
+        """Parses the long messages completed by received data.
+
+        Args:
+            data (bytes): Data received from the socket.
+
+        Returns:
+            list of bytes: The 14 byte messages.
+        """
+        return [
+            x.msg
+            for x in super(BeastMessageReader, self).feed(data)
+            if x.msgtype == MODE_S_LONG
+        ]
+
+
+READERS = {
+    'raw': RawReader,
+    'beast': BeastMessageReader,
+    'skysense': SkysenseReader,
+}
+
+
+class SourceBatch(list):
+    """A batch of ``(msg, ts)`` pairs received from one source.
+
+    Args:
+        decoder (SourceDecoder): The decoder of the source.
+        messages (list): The messages of the batch.
+    """
+
+    def __init__(self, decoder, messages):
+        super(SourceBatch, self).__init__(messages)
+        self.decoder = decoder
+
+
+class SourceDecoder(MessageDecoder):
+    """Decodes the messages of one source, tagged with its session.
+
+    Args:
+        source (Source): The receiver.
+        session_id (int): The recording session of the receiver.
+    """
+
+    def __init__(self, source, session_id):
+        self.source = source
+        self.gs_lat = source.lat
+        self.gs_lon = source.lon
+        self.session_id = session_id
+        self.writer = None
+
+        self.connects = 0
+        self.bytes = 0
+        self.messages = 0
+        self.error = None
+
+
+class Ingest:
+    """Records many receivers at once into one database.
+
+    Each receiver is read by a task on one asyncio event loop and has its own
+    recording session. Received messages are submitted to a single
+    :class:`adsb_track.pipeline.Pipeline`, which decodes them with the
+    position reference of their receiver and writes them with one database
+    writer. A receiver that disconnects or cannot be reached is retried with
+    an exponential backoff, without affecting the others.
+
+    Messages heard by more than one receiver are recorded once, from the
+    receiver that delivered them first, see
+    :class:`adsb_track.dedup.Deduplicator`.
+
+    Args:
+        sources (Iterable[Source]): The receivers.
+        db (str): The SQLite database file to record to.
+        buffer (int): Number of messages buffered per database write.
+        decode_depth (int): Maximum number of batches waiting to be decoded.
+        write_depth (int): Maximum number of decoded batches waiting to be
+            written.
+        policy (str): Handling of batches when the decode queue is full. With
+            ``'block'`` a receiver waits until its batch is queued.
+        backoff (float): Seconds before the first reconnect attempt.
+        max_backoff (float): Longest wait between reconnect attempts.
+        read_size (int): Maximum number of bytes read from a socket at once.
+        dedup_window (float): Seconds within which a message repeated by
+            another receiver is dropped, None records every copy.
+    """
+
+    def __init__(self,
+                 sources,
+                 db,
+                 buffer=25,
+                 decode_depth=64,
+                 write_depth=64,
+                 policy=BLOCK,
+                 backoff=1.0,
+                 max_backoff=60.0,
+                 read_size=65536,
+                 dedup_window=1.0):
+        for source in sources:
+            if source.rawtype not in RAWTYPES:
+                raise ValueError(f"Rawtype {source.rawtype} not one of "
+                                 f"{', '.join(RAWTYPES)}")
+        self.db = Database('sqlite', db, buffer=buffer)
+        self.pipeline = Pipeline(Ingest.decode_batch, self.db, decode_depth,
+                                 write_depth, policy)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.read_size = read_size
+        self.dedup = None
+        if dedup_window:
+            self.dedup = Deduplicator(dedup_window)
+
+        self.decoders = []
+        self.session_hashes = []
+        for source in sources:
+            now = dt.now()
+            session_hash = FlightRecorder.create_session_hash(
+                source.host, source.port, source.rawtype, now.timestamp())
+            session_id = self.db.record_session_start(session_hash,
+                                                      source.host,
+                                                      source.port, now)
+            self.session_hashes.append(session_hash)
+            self.decoders.append(SourceDecoder(source, session_id))
+
+    @staticmethod
+    def decode_batch(batch):
+        """Decodes a :class:`SourceBatch`, run by the pipeline decoder."""
+        return batch.decoder.decode_batch(batch)
+
+    async def read_source(self, decoder):
+        """Receives the messages of a source until cancelled.
+
+        Args:
+            decoder (SourceDecoder): The decoder of the source.
+        """
+        source = decoder.source
+        delay = self.backoff
+        while True:
+            reader = READERS[source.rawtype]()
+            try:
+                stream, writer = await asyncio.open_connection(
+                    source.host, source.port)
+            except OSError as e:
+                decoder.error = e
+            else:
+                decoder.connects += 1
+                decoder.error = None
+                try:
+                    while True:
+                        data = await stream.read(self.read_size)
+                        if not data:
+                            break
+                        # Data received, the connection is healthy again
+                        delay = self.backoff
+                        decoder.bytes += len(data)
+                        messages = reader.feed(data)
+                        if messages:
+                            ts = time.time()
+                            decoder.messages += len(messages)
+                            messages = [(x, ts) for x in messages]
+                            if self.dedup is not None:
+                                messages = self.dedup.filter(messages, decoder)
+                        if messages:
+                            await self.submit(SourceBatch(decoder, messages))
+                except OSError as e:
+                    decoder.error = e
+                finally:
+                    writer.close()
+            await asyncio.sleep(delay)
+            delay = min(2 * delay, self.max_backoff)
+
+    async def submit(self, batch):
+        """Queues a batch for decoding without blocking the event loop.
+
+        With the ``'block'`` policy and a full decode queue, the batch is
+        queued from an executor thread. Only the receiver of the batch waits,
+        the others keep reading.
+
+        Args:
+            batch (SourceBatch): The received messages.
+        """
+        pipeline = self.pipeline
+        if pipeline.policy == BLOCK and pipeline.decode_queue.full():
+            await asyncio.get_running_loop().run_in_executor(
+                None, pipeline.submit, batch)
+        else:
+            # Only the event loop queues batches, so this cannot block
+            pipeline.submit(batch)
+
+    async def run(self):
+        """Receives from every source until cancelled."""
+        await asyncio.gather(*[self.read_source(x) for x in self.decoders])
+
+    def stats(self):
+        """Counters of each source.
+
+        Returns:
+            list of dict: The connections made, bytes and messages received,
+                duplicate messages dropped, and last connection error of each
+                source.
+        """
+        dedup = {} if self.dedup is None else self.dedup.stats()
+        return [{
+            'host': x.source.host,
+            'port': x.source.port,
+            'connects': x.connects,
+            'bytes': x.bytes,
+            'messages': x.messages,
+            'duplicates': dedup.get(x, {}).get('duplicates', 0),
+            'duplicate_rate': dedup.get(x, {}).get('rate', 0.0),
+            'error': None if x.error is None else str(x.error),
+        } for x in self.decoders]
+
+    def record(self):
+        """Records every source until interrupted."""
+        self.pipeline.start()
+        try:
+            asyncio.run(self.run())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.pipeline.close()
+            now = dt.now()
+            for session_hash in self.session_hashes:
+                self.db.record_session_stop(session_hash, now)
+            self.db.close_session()
+
+
+def parse_source(values):
+    """Creates a :class:`Source` from ``HOST PORT RAWTYPE LAT LON`` values."""
+    host, port, rawtype, lat, lon = values
+    lat, lon = float(lat), float(lon)
+    if rawtype not in RAWTYPES:
+        raise ValueError(
+            f"Rawtype {rawtype} not one of {', '.join(RAWTYPES)}")
+    if abs(lat) > 90:
+        raise ValueError(f"Provided latitude {lat} is outside -90 to 90")
+    if abs(lon) > 180:
+        raise ValueError(f"Provided longitude {lon} is outside -180 to 180")
+    return Source(host, int(port), rawtype, lat, lon)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Record ADS-B data from many receivers.')
+    parser.add_argument('database',
+                        help='The SQLite database file to record data.',
+                        metavar='DATABASE')
+    parser.add_argument('--source',
+                        nargs=5,
+                        action='append',
+                        required=True,
+                        help='A receiver to record, repeated for each one',
+                        metavar=('HOST', 'PORT', 'RAWTYPE', 'LAT', 'LON'))
+    parser.add_argument('--buffer',
+                        default=25,
+                        type=int,
+                        help='Number of messages buffered per database write')
+    parser.add_argument('--decode-queue',
+                        default=64,
+                        type=int,
+                        help='Message batches waiting to be decoded')
+    parser.add_argument('--write-queue',
+                        default=64,
+                        type=int,
+                        help='Decoded batches waiting to be written')
+    parser.add_argument('--drop-policy',
+                        default=BLOCK,
+                        choices=POLICIES,
+                        help='Handling of batches when the decode queue is full')
+    parser.add_argument('--dedup-window',
+                        default=1.0,
+                        type=float,
+                        help='Seconds within which a message heard by another '
+                        'receiver is dropped, 0 keeps every copy')
+    parser.add_argument('--max-backoff',
+                        default=60.0,
+                        type=float,
+                        help='Longest wait in seconds between reconnects')
+    args = parser.parse_args()
+
+    ingest = Ingest([parse_source(x) for x in args.source],
+                    args.database,
+                    args.buffer,
+                    decode_depth=args.decode_queue,
+                    write_depth=args.write_queue,
+                    policy=args.drop_policy,
+                    max_backoff=args.max_backoff,
+                    dedup_window=args.dedup_window)
+    ingest.record()
@@ -0,0 +1,278 @@
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import threading
+
+import numpy as np
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+logger = logging.getLogger(__name__)
+
+
+class Counter:
+    """A monotonically increasing count."""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, value=1):
+        self.value += value
+
+
+class Histogram:
+    """Counts of observed values in fixed buckets, with their sum.
+
+    Args:
+        buckets (tuple of float): Increasing upper bounds of the buckets. A
+            last bucket holds the values above the largest bound.
+    """
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.bounds = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+
+class Metrics:
+    """Counters and latency histograms of the recorder.
+
+    Counters are plain integers updated once per batch of messages. Latency
+    observations can be sampled, timing only one batch in ``sample``, so the
+    clock is not read for every batch. Callers check ``enabled`` before
+    recording, so :class:`NullMetrics` leaves the hot path untouched.
+
+    The metrics render in the Prometheus text format, see :func:`serve`, and
+    as a one line summary, see :class:`MetricsLogger`.
+
+    Args:
+        sample (int): Time one batch in this many.
+    """
+
+    enabled = True
+
+    def __init__(self, sample=1):
+        self.sample = max(1, sample)
+        self._calls = 0
+        self.registry = {}
+
+        self.frames = self.counter('adsb_frames_received_total',
+                                   'Messages received from the receiver')
+        self.long_frames = self.counter('adsb_frames_long_total',
+                                        'Long Mode S messages received')
+        self.non_df17 = self.counter(
+            'adsb_frames_non_df17_total',
+            'Long messages with a downlink format other than 17')
+        self.crc_failures = self.counter(
+            'adsb_frames_crc_failures_total',
+            'DF17 messages failing the parity check')
+        self.typecodes = np.zeros(32, dtype=np.int64)
+        self.registry['adsb_frames_typecode_total'] = (
+            'counter', 'Valid DF17 messages by typecode', self.typecodes)
+        self.decode_seconds = self.histogram(
+            'adsb_decode_batch_seconds', 'Time to decode a batch of messages')
+        self.decoded = self.counter('adsb_messages_decoded_total',
+                                    'Messages decoded into records')
+        self.flush_seconds = self.histogram(
+            'adsb_db_flush_seconds', 'Time to write and commit a batch of rows')
+        self.rows_written = self.counter('adsb_db_rows_written_total',
+                                         'Message rows written to the database')
+
+    def counter(self, name, description):
+        """Registers a counter.
+
+        Args:
+            name (str): Metric name
+            description (str): Description of the metric
+
+        Returns:
+            Counter: The counter.
+        """
+        counter = Counter()
+        self.registry[name] = ('counter', description, counter)
+        return counter
+
+    def histogram(self, name, description, buckets=LATENCY_BUCKETS):
+        """Registers a histogram, see :meth:`counter`."""
+        histogram = Histogram(buckets)
+        self.registry[name] = ('histogram', description, histogram)
+        return histogram
+
+    def gauge(self, name, description, function):
+        """Registers a gauge read when the metrics are rendered.
+
+        Args:
+            name (str): Metric name
+            description (str): Description of the metric
+            function (Callable): Returns the current value.
+        """
+        self.registry[name] = ('gauge', description, function)
+
+    def sampled(self):
+        """Whether to time the current batch."""
+        self._calls += 1
+        return self._calls % self.sample == 0
+
+    def count_frames(self, fields):
+        """Counts the long messages of a batch by outcome.
+
+        Args:
+            fields (dict): The header fields of the batch, see
+                :func:`adsb_track.decode.decode_fields`.
+        """
+        df17 = fields['df'] == 17
+        valid = df17 & (fields['crc'] == 0)
+        self.long_frames.inc(len(df17))
+        self.non_df17.inc(len(df17) - int(np.count_nonzero(df17)))
+        self.crc_failures.inc(
+            int(np.count_nonzero(df17)) - int(np.count_nonzero(valid)))
+        self.typecodes += np.bincount(fields['tc'][valid], minlength=32)
+
+    def render(self):
+        """The metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: One sample per line.
+        """
+        lines = []
+        for name, (kind, description, metric) in self.registry.items():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'gauge':
+                lines.append(f'{name} {metric()}')
+            elif isinstance(metric, Counter):
+                lines.append(f'{name} {metric.value}')
+            elif isinstance(metric, Histogram):
+                cumulative = 0
+                for bound, count in zip(metric.bounds + ('+Inf',),
+                                        metric.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum {metric.sum}')
+                lines.append(f'{name}_count {metric.count}')
+            else:
+                for tc in np.flatnonzero(metric).tolist():
+                    lines.append(f'{name}{{typecode="{tc}"}} {metric[tc]}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """The main counters and mean latencies.
+
+        Returns:
+            dict: Metric values by short name.
+        """
+        return {
+            'frames': self.frames.value,
+            'long': self.long_frames.value,
+            'non_df17': self.non_df17.value,
+            'crc_failures': self.crc_failures.value,
+            'decoded': self.decoded.value,
+            'rows_written': self.rows_written.value,
+            'decode_batch_mean': self.decode_seconds.mean(),
+            'flush_mean': self.flush_seconds.mean(),
+        }
+
+
+class NullMetrics(Metrics):
+    """Metrics that are never recorded."""
+
+    enabled = False
+
+    def sampled(self):
+        return False
+
+
+NULL_METRICS = NullMetrics()
+
+
+def serve(metrics, port, host='127.0.0.1'):
+    """Serves the metrics over HTTP on a background thread.
+
+    Args:
+        metrics (Metrics): The metrics to expose.
+        port (int): Port to listen on.
+        host (str): Address to listen on, local only by default.
+
+    Returns:
+        http.server.ThreadingHTTPServer: The running server.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type',
+                             'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever,
+                     name='adsb-metrics',
+                     daemon=True).start()
+    return server
+
+
+class MetricsLogger:
+    """Logs a summary of the metrics at a fixed interval.
+
+    Each line has the counters and their rate per second since the
+    previous line, and the mean latencies so far.
+
+    Args:
+        metrics (Metrics): The metrics to log.
+        interval (float): Seconds between lines.
+    """
+
+    def __init__(self, metrics, interval=60.0):
+        self.metrics = metrics
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run,
+                                       name='adsb-metrics-log',
+                                       daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def _run(self):
+        previous = self.metrics.summary()
+        while not self.stopped.wait(self.interval):
+            current = self.metrics.summary()
+            parts = []
+            for key, value in current.items():
+                if value is None:
+                    continue
+                if key.endswith('_mean'):
+                    parts.append(f'{key}={value * 1000:.2f}ms')
+                else:
+                    rate = (value - previous[key]) / self.interval
+                    parts.append(f'{key}={value} ({rate:.1f}/s)')
+            logger.info(' '.join(parts))
+            previous = current
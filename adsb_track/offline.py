@@ -0,0 +1,272 @@
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime as dt
+import json
+import os
+
+import numpy as np
+
+from adsb_track.capture import (CaptureReader, SOURCE, capture_paths,
+                                open_session)
+from adsb_track.const import IDENT, VELOCITY, POSITION
+from adsb_track.database import Database
+from adsb_track.decode import LONG_MSG_BYTES, LONG_MSG_HEX, MessageDecoder
+from adsb_track.stream import FlightRecorder
+
+
+class ChunkDecoder(MessageDecoder):
+    """Decodes a chunk of messages in a worker process.
+
+    Args:
+        lat (float): Receiver latitude
+        lon (float): Receiver longitude
+        session_id (int): The recording session of the messages.
+    """
+
+    def __init__(self, lat, lon, session_id):
+        self.gs_lat = lat
+        self.gs_lon = lon
+        self.session_id = session_id
+        self.writer = None
+
+
+def decode_chunk(frames, times, lat, lon, session_id):
+    """Decodes a chunk of binary long messages into database rows.
+
+    Args:
+        frames (bytes): The 14 byte messages, concatenated.
+        times (numpy.ndarray): Receive time of each message, seconds since
+            UNIX epoch.
+        lat (float): Receiver latitude
+        lon (float): Receiver longitude
+        session_id (int): The recording session of the messages.
+
+    Returns:
+        dict: Rows of each message type, in the order of the matching
+            :class:`adsb_track.database.Database` ``record_*`` arguments.
+    """
+    messages = [(frames[i:i + LONG_MSG_BYTES], ts)
+                for i, ts in zip(range(0, len(frames), LONG_MSG_BYTES),
+                                 times.tolist())]
+    batch = ChunkDecoder(lat, lon, session_id).decode_batch(messages)
+    rows = {IDENT: [], VELOCITY: [], POSITION: []}
+    for method, args in batch.calls:
+        rows[method[len('record_'):]].append(args)
+    return rows
+
+
+def shard(payloads, times, shards):
+    """Splits a block of messages by ICAO24 address.
+
+    Args:
+        payloads (list of bytes): 14 byte messages.
+        times (list of float): Receive time of each message.
+        shards (int): Number of shards.
+
+    Yields:
+        tuple: The shard number, concatenated messages and receive times of
+            each non-empty shard, messages in the order received.
+    """
+    frames = np.frombuffer(b''.join(payloads),
+                           dtype=np.uint8).reshape(-1, LONG_MSG_BYTES)
+    icao = ((frames[:, 1].astype(np.uint32) << 16) |
+            (frames[:, 2].astype(np.uint32) << 8) | frames[:, 3])
+    times = np.asarray(times, dtype=np.float64)
+    assigned = icao % shards
+    for i in range(shards):
+        mask = assigned == i
+        if mask.any():
+            yield i, frames[mask].tobytes(), times[mask]
+
+
+def capture_blocks(paths, chunksize=50000):
+    """Reads capture files in blocks of messages from one receiver.
+
+    Args:
+        paths (Iterable[str]): Capture files, in the order recorded.
+        chunksize (int): Maximum number of messages per block.
+
+    Yields:
+        tuple: The receiver declared in the capture, and the messages and
+            receive times of a block.
+    """
+    for path in paths:
+        with CaptureReader(path) as reader:
+            sources = {}
+            pending = {}
+            for kind, index, ts, payload in reader.records():
+                if kind == SOURCE:
+                    sources[index] = json.loads(bytes(payload))
+                    pending[index] = [], []
+                    payload.release()
+                    continue
+                if len(payload) != LONG_MSG_BYTES:
+                    payload.release()
+                    continue
+                block = pending[index]
+                block[0].append(bytes(payload))
+                block[1].append(ts)
+                payload.release()
+                if len(block[0]) >= chunksize:
+                    pending[index] = [], []
+                    yield sources[index], block[0], block[1]
+            for index, block in pending.items():
+                if block[0]:
+                    yield sources[index], block[0], block[1]
+
+
+def text_blocks(paths, lat, lon, chunksize=50000):
+    """Reads text dumps of ``msg ts`` lines in blocks of messages.
+
+    Each file is taken as one receiver at the given position. Lines other
+    than a long hexadecimal message and its receive time in seconds since
+    UNIX epoch are skipped.
+
+    Args:
+        paths (Iterable[str]): Text files.
+        lat (float): Receiver latitude
+        lon (float): Receiver longitude
+        chunksize (int): Maximum number of messages per block.
+
+    Yields:
+        tuple: The receiver, and the messages and receive times of a block.
+    """
+    for path in paths:
+        source = None
+        payloads, times = [], []
+        with open(path) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) != 2 or len(fields[0]) != LONG_MSG_HEX:
+                    continue
+                try:
+                    payload, ts = bytes.fromhex(fields[0]), float(fields[1])
+                except ValueError:
+                    continue
+                if source is None:
+                    host = os.path.basename(path)
+                    source = {
+                        'session_hash':
+                            FlightRecorder.create_session_hash(
+                                host, 0, 'raw', ts),
+                        'host': host,
+                        'port': 0,
+                        'rawtype': 'raw',
+                        'lat': lat,
+                        'lon': lon,
+                        'start': ts,
+                    }
+                payloads.append(payload)
+                times.append(ts)
+                if len(payloads) >= chunksize:
+                    yield source, payloads, times
+                    payloads, times = [], []
+        if payloads:
+            yield source, payloads, times
+
+
+def decode_parallel(blocks, db, workers=None, buffer=100000):
+    """Decodes blocks of messages on worker processes into a database.
+
+    Each block is sharded by ICAO24 address and every shard is always sent
+    to the same worker process, so all messages of an aircraft are decoded
+    by one process. Decoded rows are bulk loaded with
+    :meth:`adsb_track.database.Database.record_rows` as workers finish, with
+    at most two chunks per worker in flight. Sessions already in the
+    database are resumed, see :func:`adsb_track.capture.open_session`.
+
+    Args:
+        blocks (Iterable[tuple]): Receiver, messages and receive times, as
+            from :func:`capture_blocks` or :func:`text_blocks`.
+        db (str): The SQLite database file to record to.
+        workers (int): Number of worker processes, by default the number of
+            CPUs.
+        buffer (int): Number of rows buffered per database write.
+
+    Returns:
+        dict: The number of long messages decoded per session hash.
+    """
+    workers = workers or os.cpu_count() or 1
+    database = Database('sqlite', db, buffer=buffer)
+    sessions = {}
+    decoded = {}
+    counts = {}
+    last = {}
+    pools = [ProcessPoolExecutor(1) for _ in range(workers)]
+    inflight = deque()
+
+    def load(future):
+        for kind, rows in future.result().items():
+            if rows:
+                database.record_rows(kind, rows)
+
+    try:
+        for source, payloads, times in blocks:
+            session_hash = source['session_hash']
+            if session_hash not in sessions:
+                sessions[session_hash], decoded[session_hash] = open_session(
+                    database, source)
+                counts[session_hash] = 0
+            if decoded[session_hash] is not None:
+                new = [i for i, ts in enumerate(times)
+                       if ts >= decoded[session_hash]]
+                if not new:
+                    continue
+                payloads = [payloads[i] for i in new]
+                times = [times[i] for i in new]
+            counts[session_hash] += len(payloads)
+            last[session_hash] = max(last.get(session_hash, times[-1]),
+                                     times[-1])
+            for i, frames, chunk_times in shard(payloads, times, workers):
+                inflight.append(pools[i].submit(decode_chunk, frames,
+                                                chunk_times, source['lat'],
+                                                source['lon'],
+                                                sessions[session_hash]))
+                while len(inflight) > 2 * workers:
+                    load(inflight.popleft())
+        while inflight:
+            load(inflight.popleft())
+    finally:
+        for future in inflight:
+            future.cancel()
+        for pool in pools:
+            pool.shutdown()
+    for session_hash, ts in last.items():
+        database.record_session_stop(session_hash, dt.fromtimestamp(ts))
+    database.close_session()
+    return counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Decode archived ADS-B messages on all CPUs.')
+    parser.add_argument('database',
+                        help='The SQLite database file to record data.',
+                        metavar='DATABASE')
+    parser.add_argument('inputs',
+                        nargs='+',
+                        help='Capture files or directories of them, or text '
+                        'files of "msg ts" lines with --latlon',
+                        metavar='INPUT')
+    parser.add_argument('--latlon',
+                        nargs=2,
+                        type=float,
+                        help='Receiver latitude and longitude of text input',
+                        metavar=('LAT', 'LON'))
+    parser.add_argument('--workers',
+                        type=int,
+                        help='Number of worker processes, defaults to CPUs')
+    parser.add_argument('--chunksize',
+                        default=50000,
+                        type=int,
+                        help='Messages read per block')
+    args = parser.parse_args()
+
+    if args.latlon is None:
+        blocks = capture_blocks(capture_paths(args.inputs), args.chunksize)
+    else:
+        blocks = text_blocks(args.inputs, *args.latlon, args.chunksize)
+    for session_hash, messages in decode_parallel(blocks, args.database,
+                                                  args.workers).items():
+        print(f'Decoded {messages} messages of session {session_hash}')
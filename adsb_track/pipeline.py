@@ -0,0 +1,180 @@
+import queue
+import threading
+
+BLOCK = 'block'
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+POLICIES = BLOCK, DROP_NEWEST, DROP_OLDEST
+
+_STOP = object()
+
+
+class RecordBatch:
+    """Collects the database record calls of a decoded batch of messages.
+
+    The batch offers the same ``record_*`` methods as
+    :class:`adsb_track.database.Database`, so it can stand in for the database
+    while decoding on one thread and be replayed against it on another.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def record_ident(self, *args):
+        self.calls.append(('record_ident', args))
+
+    def record_velocity(self, *args):
+        self.calls.append(('record_velocity', args))
+
+    def record_position(self, *args):
+        self.calls.append(('record_position', args))
+
+    def __len__(self):
+        return len(self.calls)
+
+
+class Pipeline:
+    """Decodes and writes message batches on background threads.
+
+    Batches of ``(msg, ts)`` are submitted by the receive loop to a bounded
+    decode queue. A decode thread turns each batch into record calls, which
+    are passed through a bounded write queue to a writer thread that applies
+    them to the database.
+
+    Args:
+        decode (Callable): Decodes a list of ``(msg, ts)`` pairs into a
+            :class:`RecordBatch`.
+        db (adsb_track.database.Database): The database the writer thread
+            records to.
+        decode_depth (int): Maximum number of batches waiting to be decoded.
+        write_depth (int): Maximum number of decoded batches waiting to be
+            written.
+        policy (str): What happens when the decode queue is full. ``'block'``
+            waits for room, applying backpressure to the receive loop.
+            ``'drop_newest'`` discards the submitted batch and
+            ``'drop_oldest'`` discards the oldest waiting batch.
+    """
+
+    def __init__(self,
+                 decode,
+                 db,
+                 decode_depth=64,
+                 write_depth=64,
+                 policy=BLOCK):
+        if policy not in POLICIES:
+            raise ValueError(
+                f"Policy {policy} not one of {', '.join(POLICIES)}")
+        self.decode = decode
+        self.db = db
+        self.policy = policy
+        self.decode_queue = queue.Queue(decode_depth)
+        self.write_queue = queue.Queue(write_depth)
+        self.error = None
+
+        self.submitted_batches = 0
+        self.dropped_batches = 0
+        self.dropped_messages = 0
+        self.decode_queue_max = 0
+        self.write_queue_max = 0
+
+        self.decode_thread = threading.Thread(target=self._decode_worker,
+                                              name='adsb-decode',
+                                              daemon=True)
+        self.write_thread = threading.Thread(target=self._write_worker,
+                                             name='adsb-write',
+                                             daemon=True)
+
+    def start(self):
+        """Starts the decode and writer threads."""
+        self.decode_thread.start()
+        self.write_thread.start()
+
+    def submit(self, messages):
+        """Queues a batch of messages for decoding.
+
+        Args:
+            messages (list): ``(msg, ts)`` pairs from the receive loop.
+
+        Returns:
+            bool: True if the batch was queued, False if it was dropped.
+        """
+        if self.error is not None:
+            raise self.error
+        self.submitted_batches += 1
+        if self.policy == BLOCK:
+            self.decode_queue.put(messages)
+        else:
+            try:
+                self.decode_queue.put_nowait(messages)
+            except queue.Full:
+                if self.policy == DROP_NEWEST:
+                    self._count_drop(messages)
+                    return False
+                try:
+                    self._count_drop(self.decode_queue.get_nowait())
+                except queue.Empty:
+                    pass
+                self.decode_queue.put_nowait(messages)
+        self.decode_queue_max = max(self.decode_queue_max,
+                                    self.decode_queue.qsize())
+        return True
+
+    def _count_drop(self, messages):
+        self.dropped_batches += 1
+        self.dropped_messages += len(messages)
+
+    def _decode_worker(self):
+        while True:
+            messages = self.decode_queue.get()
+            if messages is _STOP:
+                self.write_queue.put(_STOP)
+                return
+            try:
+                batch = self.decode(messages)
+            except Exception as e:
+                self.error = e
+                continue
+            if batch:
+                self.write_queue.put(batch)
+                self.write_queue_max = max(self.write_queue_max,
+                                           self.write_queue.qsize())
+
+    def _write_worker(self):
+        while True:
+            try:
+                batch = self.write_queue.get(timeout=self.db.flush_interval)
+            except queue.Empty:
+                # Idle receiver, still honor the database flush interval
+                if self.db.pending_rows:
+                    self.db.flush()
+                continue
+            if batch is _STOP:
+                return
+            try:
+                for method, args in batch.calls:
+                    getattr(self.db, method)(*args)
+            except Exception as e:
+                self.error = e
+
+    def close(self):
+        """Drains the queues and stops the worker threads."""
+        self.decode_queue.put(_STOP)
+        self.decode_thread.join()
+        self.write_thread.join()
+
+    def stats(self):
+        """Counters of the pipeline queues.
+
+        Returns:
+            dict: Current and maximum depth of the decode and write queues,
+                and the number of submitted and dropped batches.
+        """
+        return {
+            'decode_queue': self.decode_queue.qsize(),
+            'decode_queue_max': self.decode_queue_max,
+            'write_queue': self.write_queue.qsize(),
+            'write_queue_max': self.write_queue_max,
+            'submitted_batches': self.submitted_batches,
+            'dropped_batches': self.dropped_batches,
+            'dropped_messages': self.dropped_messages,
+        }
@@ -1,11 +1,16 @@
 import argparse
+import logging
+
 from adsb_track.stream import FlightRecorder
+from adsb_track.pipeline import POLICIES, BLOCK
+from adsb_track.metrics import Metrics, MetricsLogger, NULL_METRICS, serve
 
 supported_rawtypes = 'raw', 'beast', 'skysense'
 
 parser = argparse.ArgumentParser(description='Capture and record ADS-B data.')
 parser.add_argument('database',
-                    help='The SQLite database file to record data.',
+                    help='The SQLite database file to record data, or the '
+                    'capture directory with --capture.',
                     metavar='DATABASE')
 parser.add_argument('--host',
                     default='localhost',
@@ -24,6 +29,81 @@ parser.add_argument('--latlon',
                     required=True,
                     help='Receiver latitude and longitude',
                     metavar=('LAT', 'LON'))
+parser.add_argument('--buffer',
+                    default=25,
+                    type=int,
+                    help='Number of messages buffered per database write')
+parser.add_argument('--pipeline',
+                    action='store_true',
+                    help='Decode and write messages on background threads')
+parser.add_argument('--decode-queue',
+                    default=64,
+                    type=int,
+                    help='Message batches waiting to be decoded (pipeline)')
+parser.add_argument('--write-queue',
+                    default=64,
+                    type=int,
+                    help='Decoded batches waiting to be written (pipeline)')
+parser.add_argument('--drop-policy',
+                    default=BLOCK,
+                    choices=POLICIES,
+                    help='Handling of batches when the decode queue is full')
+
+parser.add_argument('--capture',
+                    action='store_true',
+                    help='Write undecoded messages to capture files, decoded '
+                    'later with adsb_track.capture')
+parser.add_argument('--changes-only',
+                    action='store_true',
+                    help='Write identification and velocity messages only '
+                    'when they change')
+parser.add_argument('--speed-deadband',
+                    default=2.0,
+                    type=float,
+                    help='Speed change in knots written (changes only)')
+parser.add_argument('--angle-deadband',
+                    default=1.0,
+                    type=float,
+                    help='Heading change in degrees written (changes only)')
+parser.add_argument('--vs-deadband',
+                    default=128.0,
+                    type=float,
+                    help='Vertical speed change in ft/min written (changes '
+                    'only)')
+parser.add_argument('--heartbeat',
+                    default=60.0,
+                    type=float,
+                    help='Seconds after which an unchanged message is written '
+                    '(changes only)')
+parser.add_argument('--compress',
+                    action='store_true',
+                    help='Write only the positions needed to redraw each track '
+                    'within a tolerance')
+parser.add_argument('--horizontal-tolerance',
+                    default=30.0,
+                    type=float,
+                    help='Horizontal track tolerance in metres (compress)')
+parser.add_argument('--vertical-tolerance',
+                    default=50.0,
+                    type=float,
+                    help='Altitude track tolerance in feet (compress)')
+parser.add_argument('--max-interval',
+                    default=60.0,
+                    type=float,
+                    help='Longest time in seconds between written positions '
+                    '(compress)')
+parser.add_argument('--metrics-port',
+                    type=int,
+                    help='Serve Prometheus metrics on this local port')
+parser.add_argument('--metrics-log',
+                    type=float,
+                    help='Log a metrics summary every this many seconds',
+                    metavar='SECONDS')
+parser.add_argument('--metrics-sample',
+                    default=1,
+                    type=int,
+                    help='Time one batch of messages in this many',
+                    metavar='N')
 
 args = parser.parse_args()
 if args.rawtype not in supported_rawtypes:
@@ -35,7 +115,46 @@ if abs(args.latlon[1]) > 180:
     raise ValueError(
         f"Provided longitude {args.latlon[1]} is outside -180 to 180")
 
-flights = FlightRecorder(args.host, args.database, args.latlon[0],
-                         args.latlon[1], args.port, args.rawtype)
+metrics = NULL_METRICS
+if args.metrics_port is not None or args.metrics_log:
+    metrics = Metrics(args.metrics_sample)
+if args.metrics_port is not None:
+    serve(metrics, args.metrics_port)
+if args.metrics_log:
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(name)s %(message)s')
+    MetricsLogger(metrics, args.metrics_log).start()
+
+changes = None
+if args.changes_only:
+    changes = {
+        'speed': args.speed_deadband,
+        'angle': args.angle_deadband,
+        'vertical_speed': args.vs_deadband,
+        'heartbeat': args.heartbeat,
+    }
+compress = None
+if args.compress:
+    compress = {
+        'horizontal': args.horizontal_tolerance,
+        'vertical': args.vertical_tolerance,
+        'max_interval': args.max_interval,
+    }
+
+flights = FlightRecorder(args.host,
+                         args.database,
+                         args.latlon[0],
+                         args.latlon[1],
+                         args.port,
+                         args.rawtype,
+                         args.buffer,
+                         pipeline=args.pipeline,
+                         decode_depth=args.decode_queue,
+                         write_depth=args.write_queue,
+                         policy=args.drop_policy,
+                         capture=args.capture,
+                         metrics=metrics,
+                         changes=changes,
+                         compress=compress)
 
 flights.record()
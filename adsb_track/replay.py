@@ -1,6 +1,5 @@
-from datetime import datetime as dt
+from datetime import datetime as dt, timedelta
 from adsb_track.const import *
-from adsb_track.database import DBSQL
 from adsb_track.aircraft import Airspace
 
 
@@ -8,32 +7,23 @@ def recreate_airspace_from_messages(messages):
     """Recreates airspace from messages
 
     Args:
-        messages (list of tuples): The messages to use
+        messages (Iterable[tuple]): The message type and message pairs in time
+            order, as streamed by
+            :meth:`adsb_track.database.Database.iter_messages`.
 
     Returns:
         adsb_track.Airspace: The airspace from the reconstructed messages.
     """
     airspace = Airspace()
-    for msg in messages:
-        type_ = msg[0]
-        msg = msg[1:]
-        ts = msg[DBSQL.TIMESTAMP_INDEX]
-        icao = msg[DBSQL.ICAO_INDEX]
+    for type_, msg in messages:
         if type_ == IDENT:
-            callsign = msg[DBSQL.IDENT_INDICES[CALLSIGN]]
-            airspace.update_callsign(icao, ts, callsign)
+            airspace.update_callsign(msg.icao, msg.timestamp, msg.callsign)
         elif type_ == VELOCITY:
-            heading, speed, vs = [
-                msg[DBSQL.VELOCITY_INDICES[x]]
-                for x in (ANGLE, SPEED, VERTICAL_SPEED)
-            ]
-            airspace.update_velocity(icao, ts, heading, speed, vs)
+            airspace.update_velocity(msg.icao, msg.timestamp, msg.angle,
+                                     msg.speed, msg.vertical_speed)
         elif type_ == POSITION:
-            lat, lon, alt = [
-                msg[DBSQL.POSITION_INDICES[x]]
-                for x in (LATITUDE, LONGITUDE, ALTITUDE)
-            ]
-            airspace.update_position(icao, ts, lat, lon, alt)
+            airspace.update_position(msg.icao, msg.timestamp, msg.latitude,
+                                     msg.longitude, msg.altitude)
     return airspace
 
 
@@ -41,39 +31,105 @@ def recreate_airspace_from_session(db, session_uuid):
     """Recreates airspace from session messages
 
     Args:
-        db (str): Path to database
+        db (adsb_track.database.Database): The database
         session_uuid (str): Session to replay
 
     Returns:
         adsb_track.Airspace: The airspace from the reconstructed messages.
     """
-    return recreate_airspace_from_messages(db.replay_session(session_uuid))
+    return recreate_airspace_from_messages(db.iter_session(session_uuid))
+
+
+def _time_window(db, datetime, previous):
+    if datetime is None:
+        stop = dt.now()
+    elif isinstance(datetime, (int, float)):
+        stop = dt.fromtimestamp(datetime)
+    elif isinstance(datetime, str):
+        if datetime.lower() == 'last':
+            stop = db.last_message()
+        else:
+            stop = dt.fromisoformat(datetime)
+    else:
+        stop = datetime
+    return stop - timedelta(seconds=previous), stop
 
 
 def recreate_airspace_from_timestamp(db, datetime=None, previous=60):
     """Recreates airspace around a given time.
 
     Args:
-        db (str): Path to database
-        datetime (datetime.datetime or float): Ending time
+        db (adsb_track.database.Database): The database
+        datetime (datetime.datetime or float or str): Ending time. A float is
+            seconds since UNIX epoch, a string either an ISO format time or
+            'last' for the most recent message. Defaults to now.
         previous (int): The number of seconds to look back.
 
     Returns:
         adsb_track.Airspace: The airspace from the reconstructed messages.
     """
-    stop = datetime if isinstance(datetime, (int, float)) else None
-    if datetime is None:
-        stop = dt.now().timestamp()
-    elif isinstance(datetime, str):
-        if datetime.lower() == 'last':
-            stop = db.last_message()
-        else:
-            stop = dt.fromisoformat(datetime).timestamp()
-    start = stop - previous
-    return recreate_airspace_from_messages(db.replay_messages(start, stop))
+    start, stop = _time_window(db, datetime, previous)
+    return recreate_airspace_from_messages(db.iter_messages(start, stop))
+
+
+def _latest(df):
+    """The most recent message of each aircraft."""
+    df = df.sort_values(TIMESTAMP, kind='stable')
+    return df.drop_duplicates(ICAO, keep='last')
+
+
+def recreate_airspace_from_frames(df_ident, df_velocity, df_position):
+    """Recreates the latest state of the airspace from message dataframes.
+
+    Only the most recent callsign, velocity, and position of each aircraft is
+    applied, selected with vectorized operations, so the aircraft have no
+    history beyond their current state.
+
+    Args:
+        df_ident (pandas.DataFrame): Identification messages
+        df_velocity (pandas.DataFrame): Velocity messages
+        df_position (pandas.DataFrame): Position messages
+
+    Returns:
+        adsb_track.Airspace: The airspace at the time of the last messages.
+    """
+    airspace = Airspace()
+    ident = _latest(df_ident)[[ICAO, TIMESTAMP, CALLSIGN]]
+    for icao, ts, callsign in ident.itertuples(index=False, name=None):
+        airspace.update_callsign(icao, ts, callsign)
+    velocity = _latest(df_velocity)[[
+        ICAO, TIMESTAMP, ANGLE, SPEED, VERTICAL_SPEED
+    ]]
+    for icao, ts, heading, speed, vs in velocity.itertuples(index=False,
+                                                            name=None):
+        airspace.update_velocity(icao, ts, heading, speed, vs)
+    position = _latest(df_position)[[
+        ICAO, TIMESTAMP, LATITUDE, LONGITUDE, ALTITUDE
+    ]]
+    for icao, ts, lat, lon, alt in position.itertuples(index=False,
+                                                       name=None):
+        airspace.update_position(icao, ts, lat, lon, alt)
+    return airspace
+
+
+def snapshot_airspace(db, datetime=None, previous=60):
+    """The aircraft in the sky at a given time.
+
+    Args:
+        db (adsb_track.database.Database): The database
+        datetime (datetime.datetime or float or str): The snapshot time, as
+            for :func:`recreate_airspace_from_timestamp`.
+        previous (int): The number of seconds to look back.
+
+    Returns:
+        adsb_track.Airspace: The latest state of the aircraft heard in the
+            window.
+    """
+    return recreate_airspace_from_frames(
+        *db.replay_messages(*_time_window(db, datetime, previous)))
 
 
 if __name__ == '__main__':
-    from adsb_track.database import DBSQLite
-    db = DBSQLite('test.sqlite3')
-    ac = recreate_airspace(db, 'last')
\ No newline at end of file
+    from adsb_track.database import Database
+    db = Database('sqlite', 'test.sqlite3', read_only=True)
+    ac = recreate_airspace_from_timestamp(db, 'last')
@@ -0,0 +1,226 @@
+import argparse
+import asyncio
+import logging
+import math
+import time
+
+import pandas as pd
+
+from adsb_track.beast import ESC, MODE_S_SHORT, MODE_S_LONG
+from adsb_track.capture import CaptureReader, MESSAGE, capture_paths
+from adsb_track.const import IDENT, VELOCITY, POSITION
+from adsb_track.database import Database
+from adsb_track.decode import LONG_MSG_BYTES
+from adsb_track.encode import (encode_ident, encode_position,
+                               encode_velocity)
+
+logger = logging.getLogger(__name__)
+
+FORMATS = 'raw', 'beast'
+
+# Beast MLAT timestamps count a 12 MHz clock
+MLAT_HZ = 12e6
+MLAT_MASK = (1 << 48) - 1
+SIGNAL = 0x80
+
+_ESC_BYTE = bytes([ESC])
+_ESC_PAIR = bytes([ESC, ESC])
+
+
+def _known(*values):
+    return all(x is not None and not (isinstance(x, float) and math.isnan(x))
+               for x in values)
+
+
+def session_messages(db, session_hash):
+    """Re-encodes the decoded messages of a recorded session.
+
+    Positions are encoded alternately as even and odd airborne positions with
+    barometric altitude, and velocities as ground speed. Rows missing a value
+    the message needs are skipped.
+
+    Args:
+        db (adsb_track.database.Database): The database
+        session_hash (str): Session SHA-1 hash or a unique prefix of it
+
+    Yields:
+        tuple: The binary message and its time in seconds, in time order.
+    """
+    odd = {}
+    for kind, msg in db.iter_session(session_hash):
+        if kind == IDENT:
+            if not _known(msg.callsign, msg.typecode, msg.category):
+                continue
+            encoded = encode_ident(msg.icao, msg.callsign, int(msg.typecode),
+                                   int(msg.category))
+        elif kind == VELOCITY:
+            if not _known(msg.speed, msg.angle, msg.vertical_speed):
+                continue
+            encoded = encode_velocity(msg.icao, msg.speed, msg.angle,
+                                      msg.vertical_speed,
+                                      msg.vertical_speed_src == 'BARO')
+        elif kind == POSITION:
+            if not _known(msg.latitude, msg.longitude, msg.altitude):
+                continue
+            odd[msg.icao] = not odd.get(msg.icao, True)
+            encoded = encode_position(msg.icao, msg.latitude, msg.longitude,
+                                      msg.altitude, odd[msg.icao])
+        else:
+            continue
+        yield bytes.fromhex(encoded), pd.Timestamp(msg.timestamp).value / 1e9
+
+
+def capture_messages(paths):
+    """Reads the messages of capture files.
+
+    Args:
+        paths (Iterable[str]): Capture files, in the order recorded.
+
+    Yields:
+        tuple: The binary message and its receive time in seconds.
+    """
+    for path in paths:
+        with CaptureReader(path) as reader:
+            for kind, _, ts, payload in reader.records():
+                if kind == MESSAGE:
+                    yield bytes(payload), ts
+                payload.release()
+
+
+def frame_raw(msg, ts):
+    """A message in the ``*<hex>;`` raw format."""
+    return b'*' + msg.hex().upper().encode() + b';\n'
+
+
+def frame_beast(msg, ts):
+    """A message in the Beast binary format, MLAT time from its time."""
+    msgtype = MODE_S_LONG if len(msg) == LONG_MSG_BYTES else MODE_S_SHORT
+    body = (int(ts * MLAT_HZ) & MLAT_MASK).to_bytes(6, 'big') + bytes(
+        [SIGNAL]) + msg
+    return bytes([ESC, msgtype]) + body.replace(_ESC_BYTE, _ESC_PAIR)
+
+
+FRAMERS = {'raw': frame_raw, 'beast': frame_beast}
+
+
+class ReplayServer:
+    """Serves recorded messages over TCP like a receiver.
+
+    Every client that connects gets the whole recording from the start,
+    paced by the message times divided by ``speed``. A speed of 0 sends as
+    fast as the client reads. Like a receiver with no traffic, the
+    connection then stays open until the client closes it.
+
+    Args:
+        messages (Callable): Returns a new iterable of ``(msg, ts)`` pairs
+            of binary messages in time order for each client.
+        rawtype (str): Output format, ``'raw'`` or ``'beast'``.
+        speed (float): Playback speed, 1 is real time, 0 is maximum speed.
+        chunk (int): Bytes buffered before writing to the socket.
+    """
+
+    def __init__(self, messages, rawtype='raw', speed=1.0, chunk=65536):
+        if rawtype not in FORMATS:
+            raise ValueError(
+                f"Rawtype {rawtype} not one of {', '.join(FORMATS)}")
+        self.messages = messages
+        self.frame = FRAMERS[rawtype]
+        self.speed = speed
+        self.chunk = chunk
+        self.sent = []
+
+    async def handle(self, reader, writer):
+        """Sends the recording to a connected client."""
+        frame = self.frame
+        buffer = bytearray()
+        count = 0
+        start = time.monotonic()
+        first = None
+        try:
+            for msg, ts in self.messages():
+                if self.speed:
+                    if first is None:
+                        first = ts
+                    delay = (start + (ts - first) / self.speed -
+                             time.monotonic())
+                    if delay > 0:
+                        if buffer:
+                            writer.write(buffer)
+                            buffer = bytearray()
+                            await writer.drain()
+                        await asyncio.sleep(delay)
+                buffer += frame(msg, ts)
+                count += 1
+                if len(buffer) >= self.chunk:
+                    writer.write(buffer)
+                    buffer = bytearray()
+                    await writer.drain()
+            writer.write(buffer)
+            await writer.drain()
+            elapsed = time.monotonic() - start
+            self.sent.append((count, elapsed))
+            logger.info('Sent %d messages in %.2f s (%.0f msg/s)', count,
+                        elapsed, count / max(elapsed, 1e-9))
+            while await reader.read(4096):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, port, host='127.0.0.1'):
+        """Accepts clients until cancelled.
+
+        Args:
+            port (int): Port to listen on.
+            host (str): Address to listen on.
+        """
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Serve a recorded session or capture like a receiver.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--session',
+                        nargs=2,
+                        help='A session of a recording database',
+                        metavar=('DATABASE', 'SESSION_HASH'))
+    source.add_argument('--capture',
+                        nargs='+',
+                        help='Capture files or directories of them',
+                        metavar='CAPTURE')
+    parser.add_argument('--host',
+                        default='127.0.0.1',
+                        help='The address to listen on')
+    parser.add_argument('--port',
+                        default=30002,
+                        type=int,
+                        help='The port to listen on')
+    parser.add_argument('--rawtype',
+                        default='raw',
+                        choices=FORMATS,
+                        help='The output data format')
+    parser.add_argument('--speed',
+                        default=1.0,
+                        type=float,
+                        help='Playback speed, 1 is real time, 0 is as fast '
+                        'as possible')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(name)s %(message)s')
+    if args.session is not None:
+        db = Database('sqlite', args.session[0], read_only=True)
+        messages = lambda: session_messages(db, args.session[1])
+    else:
+        paths = capture_paths(args.capture)
+        messages = lambda: capture_messages(paths)
+    try:
+        asyncio.run(
+            ReplayServer(messages, args.rawtype,
+                         args.speed).serve(args.port, args.host))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,197 @@
+import math
+
+EARTH_RADIUS_NM = 3440.065
+# Half the circumference, no two points are further apart
+MAX_DISTANCE_NM = math.pi * EARTH_RADIUS_NM
+
+
+def distance_nm(lat1, lon1, lat2, lon2):
+    """Great circle distance with the haversine formula.
+
+    Args:
+        lat1 (float): Latitude of the first point
+        lon1 (float): Longitude of the first point
+        lat2 (float): Latitude of the second point
+        lon2 (float): Longitude of the second point
+
+    Returns:
+        float: The distance in nautical miles.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2)**2 + math.cos(phi1) * math.cos(phi2) *
+         math.sin(math.radians(lon2 - lon1) / 2)**2)
+    return 2 * EARTH_RADIUS_NM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _in_band(alt, min_alt, max_alt):
+    if min_alt is None and max_alt is None:
+        return True
+    if alt is None or alt != alt:  # Unknown altitude, NaN included
+        return False
+    return ((min_alt is None or alt >= min_alt) and
+            (max_alt is None or alt <= max_alt))
+
+
+class GridIndex:
+    """A uniform latitude and longitude grid of moving points.
+
+    Each point is filed under the cell containing it, and moving a point only
+    touches its old and new cell. Queries visit the cells overlapping the
+    search area and test the points in them.
+
+    Args:
+        cell_size (float): Width and height of a cell in degrees.
+    """
+
+    def __init__(self, cell_size=0.5):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.points = {}
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_size),
+                math.floor(lon / self.cell_size))
+
+    def update(self, key, lat, lon, alt=None):
+        """Adds or moves a point.
+
+        Args:
+            key (Hashable): The point identifier
+            lat (float): Latitude, None removes the point
+            lon (float): Longitude, None removes the point
+            alt (float): Altitude
+        """
+        if lat is None or lon is None or lat != lat or lon != lon:
+            self.remove(key)
+            return
+        cell = self._cell(lat, lon)
+        previous = self.points.get(key)
+        if previous is not None and previous[3] != cell:
+            self._leave(key, previous[3])
+        if previous is None or previous[3] != cell:
+            self.cells.setdefault(cell, set()).add(key)
+        self.points[key] = (lat, lon, alt, cell)
+
+    def _leave(self, key, cell):
+        members = self.cells[cell]
+        members.discard(key)
+        if not members:
+            del self.cells[cell]
+
+    def remove(self, key):
+        """Removes a point, if present.
+
+        Args:
+            key (Hashable): The point identifier
+        """
+        previous = self.points.pop(key, None)
+        if previous is not None:
+            self._leave(key, previous[3])
+
+    def _candidates(self, south, west, north, east):
+        """The points in the cells overlapping a box, west to east."""
+        row_min, col_min = self._cell(south, west)
+        row_max, col_max = self._cell(north, east)
+        if (row_max - row_min + 1) * (col_max - col_min + 1) > len(self.cells):
+            # Fewer occupied cells than cells in the box
+            for (row, col), members in self.cells.items():
+                if row_min <= row <= row_max and col_min <= col <= col_max:
+                    yield from members
+            return
+        for row in range(row_min, row_max + 1):
+            for col in range(col_min, col_max + 1):
+                yield from self.cells.get((row, col), ())
+
+    def _boxes(self, south, west, north, east):
+        """Splits a box crossing the antimeridian in two."""
+        if west <= east:
+            return [(south, west, north, east)]
+        return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+    def bbox(self, south, west, north, east, min_alt=None, max_alt=None):
+        """Finds the points inside a box.
+
+        Args:
+            south (float): Southern latitude
+            west (float): Western longitude, greater than east for a box that
+                crosses the antimeridian
+            north (float): Northern latitude
+            east (float): Eastern longitude
+            min_alt (float): Optional lowest altitude
+            max_alt (float): Optional highest altitude
+
+        Returns:
+            list: The keys of the points inside the box.
+        """
+        found = []
+        for box in self._boxes(south, west, north, east):
+            for key in self._candidates(*box):
+                lat, lon, alt, _ = self.points[key]
+                if (box[0] <= lat <= box[2] and box[1] <= lon <= box[3] and
+                        _in_band(alt, min_alt, max_alt)):
+                    found.append(key)
+        return found
+
+    def radius(self, lat, lon, nm, min_alt=None, max_alt=None):
+        """Finds the points within a distance.
+
+        Args:
+            lat (float): Latitude of the center
+            lon (float): Longitude of the center
+            nm (float): Radius in nautical miles
+            min_alt (float): Optional lowest altitude
+            max_alt (float): Optional highest altitude
+
+        Returns:
+            list of tuple: The key and distance of the points within the
+                radius, closest first.
+        """
+        dlat = math.degrees(nm / EARTH_RADIUS_NM)
+        south, north = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+        cos_lat = min(math.cos(math.radians(south)),
+                      math.cos(math.radians(north)))
+        if south <= -90.0 or north >= 90.0 or dlat >= 90.0 * cos_lat:
+            west, east = -180.0, 180.0
+        else:
+            dlon = dlat / cos_lat
+            west = (lon - dlon + 180.0) % 360.0 - 180.0
+            east = (lon + dlon + 180.0) % 360.0 - 180.0
+
+        found = []
+        for box in self._boxes(south, west, north, east):
+            for key in self._candidates(*box):
+                p_lat, p_lon, alt, _ = self.points[key]
+                if not _in_band(alt, min_alt, max_alt):
+                    continue
+                distance = distance_nm(lat, lon, p_lat, p_lon)
+                if distance <= nm:
+                    found.append((key, distance))
+        found.sort(key=lambda x: x[1])
+        return found
+
+    def nearest(self, lat, lon, k=1, min_alt=None, max_alt=None):
+        """Finds the closest points.
+
+        The search radius starts at one cell and doubles until it holds k
+        points.
+
+        Args:
+            lat (float): Latitude of the center
+            lon (float): Longitude of the center
+            k (int): Number of points
+            min_alt (float): Optional lowest altitude
+            max_alt (float): Optional highest altitude
+
+        Returns:
+            list of tuple: The key and distance of up to k points, closest
+                first.
+        """
+        nm = self.cell_size * 60.0
+        while True:
+            found = self.radius(lat, lon, nm, min_alt, max_alt)
+            if len(found) >= k or nm >= MAX_DISTANCE_NM:
+                return found[:k]
+            nm *= 2
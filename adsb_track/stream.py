@@ -1,17 +1,28 @@
 from datetime import datetime as dt
 import hashlib
 import struct
+import time
+import traceback
 
-import pyModeS as pms
 from pyModeS.extra.tcpclient import TcpClient
+import zmq
 
+from adsb_track.beast import BeastReader, MODE_S_LONG
+
+from adsb_track.capture import CaptureWriter
+from adsb_track.changes import ChangeFilter
+from adsb_track.compress import TrajectoryCompressor
 from adsb_track.database import Database
+from adsb_track.decode import MessageDecoder
+import adsb_track.decode as decode
+from adsb_track.metrics import NULL_METRICS
+from adsb_track.pipeline import Pipeline, BLOCK
 
 
-class FlightRecorder(TcpClient):
+class FlightRecorder(MessageDecoder, TcpClient):
 
-    self.TC_POS = tuple(range(9, 19)) + tuple(range(20, 23))
-    self.TC_IDENT = tuple(range(1, 5))
+    TC_POS = decode.TC_POS
+    TC_IDENT = decode.TC_IDENT
 
     @staticmethod
     def create_session_hash(host: str, port: int, rawtype: str, start: float):
@@ -39,52 +50,149 @@ class FlightRecorder(TcpClient):
                  gs_lon,
                  port=30002,
                  rawtype='raw',
-                 buffer=25):
+                 buffer=25,
+                 pipeline=False,
+                 decode_depth=64,
+                 write_depth=64,
+                 policy=BLOCK,
+                 capture=False,
+                 metrics=NULL_METRICS,
+                 changes=None,
+                 compress=None):
         super(FlightRecorder, self).__init__(host, port, rawtype)
         now = dt.now()
         self.session_hash = self.create_session_hash(host, port, rawtype,
                                                      now.timestamp())
         self.gs_lat = gs_lat
         self.gs_lon = gs_lon
-        self.db = Database('sqlite', db)
-        self.db.record_session_start(self.session_hash, host, port, now)
-
-    def process_msg(self, msg, ts, icao, tc):
-        if tc in self.TC_POS:
-            self.process_position(msg, ts, icao, tc)
-        elif tc == 19:
-            self.process_velocity(msg, ts, icao)
-        elif tc in self.TC_IDENT:
-            self.process_ident(msg, ts, icao, tc)
+        self.metrics = metrics
+        self.pipeline = None
+        self.capture = None
+        self.changes = None
+        self.compress = None
+        if capture:
+            # Messages are kept undecoded, db is the capture directory
+            self.db = None
+            self.capture = CaptureWriter(db)
+            self.capture.add_source(session_hash=self.session_hash,
+                                    host=host,
+                                    port=port,
+                                    rawtype=rawtype,
+                                    lat=gs_lat,
+                                    lon=gs_lon,
+                                    start=now.timestamp())
+            self.beast = BeastReader() if rawtype == 'beast' else None
+            return
+        self.db = Database('sqlite', db, buffer=buffer, metrics=metrics)
+        self.session_id = self.db.record_session_start(self.session_hash, host,
+                                                       port, now)
+        self.writer = self.db
+        if changes is not None:
+            self.changes = ChangeFilter(self.db, **changes)
+            self.writer = self.changes
+            if metrics.enabled:
+                metrics.gauge('adsb_rows_suppressed',
+                              'Unchanged messages not written',
+                              lambda: self.changes.suppressed)
+        if compress is not None:
+            self.compress = TrajectoryCompressor(self.writer, **compress)
+            self.writer = self.compress
+            if metrics.enabled:
+                metrics.gauge('adsb_positions_suppressed',
+                              'Positions dropped by trajectory compression',
+                              lambda: self.compress.suppressed)
+        if pipeline:
+            self.pipeline = Pipeline(self.decode_batch, self.writer,
+                                     decode_depth, write_depth, policy)
+            if metrics.enabled:
+                self._pipeline_metrics()
+        self.beast = BeastReader() if rawtype == 'beast' else None
+
+    def _pipeline_metrics(self):
+        pipeline = self.pipeline
+        self.metrics.gauge('adsb_pipeline_decode_queue',
+                           'Batches waiting to be decoded',
+                           pipeline.decode_queue.qsize)
+        self.metrics.gauge('adsb_pipeline_write_queue',
+                           'Decoded batches waiting to be written',
+                           pipeline.write_queue.qsize)
+        self.metrics.gauge('adsb_pipeline_dropped_messages',
+                           'Messages dropped by a full decode queue',
+                           lambda: pipeline.dropped_messages)
 
-    def process_position(self, msg, ts, icao, tc):
-        alt_src = 'BARO' if tc < 19 else 'GNSS'
-        alt = pms.adsb.altitude(msg)
-        lat, lon = pms.adsb.position_with_ref(msg, self.gs_lat, self.gs_lon)
+    def handle_messages(self, messages):
+        if self.metrics.enabled:
+            self.metrics.frames.inc(len(messages))
+        if self.capture is not None:
+            self.capture.write(messages)
+        elif self.pipeline is None:
+            self.decode_messages(messages)
+        else:
+            self.pipeline.submit(messages)
 
-        self.db.record_position(ts, icao, lat, lon, alt, alt_src)
+    def handle_frames(self, frames, ts):
+        """Handles the Beast frames of a received chunk of data.
 
-    def process_velocity(self, msg, ts, icao):
-        velocity = pms.adsb.velocity(msg, True)
+        The long messages are handed on as ``(msg, ts, mlat, signal)``
+        tuples, keeping the MLAT counter and signal level of the frame.
 
-        self.db.record_velocity(ts, icao, *velocity)
+        Args:
+            frames (list of adsb_track.beast.BeastFrame): The parsed frames.
+            ts (float): Receive time, seconds since UNIX epoch.
+        """
+        messages = [(x.msg, ts, x.mlat, x.signal)
+                    for x in frames
+                    if x.msgtype == MODE_S_LONG]
+        if messages:
+            self.handle_messages(messages)
 
-    def process_ident(self, msg, ts, icao, tc):
-        callsign = pms.adsb.callsign(msg).strip('_')
-        category = pms.adsb.category(msg)
+    def run(self, raw_pipe_in=None, stop_flag=None, exception_queue=None):
+        """Receives and handles messages until interrupted or stopped.
 
-        self.db.record_ident(ts, icao, callsign, tc, category)
+        Beast data is parsed directly from the received bytes and handed to
+        the decoder as binary messages. Other formats use the pyModeS reader.
 
-    def handle_messages(self, messages):
-        for msg, ts in messages:
-            if len(msg) == 28 and pms.df(msg) == 17 and pms.crc(msg) == 0:
-                icao = pms.adsb.icao(msg)
-                tc = pms.adsb.typecode(msg)
-                self.process_msg(msg, dt.fromtimestamp(ts), icao, tc)
+        Args:
+            raw_pipe_in: Unused, kept for the pyModeS signature.
+            stop_flag (multiprocessing.Value): Stops receiving once true,
+                checked at least every receive timeout.
+            exception_queue (multiprocessing.Queue): Receives the traceback
+                of an exception before it is raised.
+        """
+        if self.beast is None:
+            return super(FlightRecorder, self).run(raw_pipe_in, stop_flag,
+                                                   exception_queue)
+        self.raw_pipe_in = raw_pipe_in
+        self.stop_flag = stop_flag
+        self.exception_queue = exception_queue
+        self.connect()
+        while stop_flag is None or not stop_flag.value:
+            try:
+                # STREAM socket messages are the peer identity then the data
+                data = self.socket.recv_multipart()[-1]
+                frames = self.beast.feed(data)
+                if frames:
+                    self.handle_frames(frames, time.time())
+            except zmq.error.Again:
+                continue
+            except Exception:
+                if exception_queue is not None:
+                    exception_queue.put(traceback.format_exc())
+                raise
+        self.stop()
 
     def record(self):
+        if self.pipeline is not None:
+            self.pipeline.start()
         try:
             self.run()
         except KeyboardInterrupt:
+            if self.capture is not None:
+                self.capture.close()
+                return
+            if self.pipeline is not None:
+                self.pipeline.close()
+            if self.compress is not None:
+                self.compress.close()
             self.db.record_session_stop(self.session_hash, dt.now())
             self.db.close_session()
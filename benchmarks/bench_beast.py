@@ -0,0 +1,67 @@
+"""Frames/sec of the pyModeS Beast reader against the binary fast path.
+
+Usage: python benchmarks/bench_beast.py [--frames N] [--chunk BYTES]
+"""
+import argparse
+import random
+import time
+
+from pyModeS.extra.tcpclient import TcpClient
+
+from adsb_track.beast import BeastReader, MODE_S_LONG
+from adsb_track.decode import split_batch
+
+from bench_prefilter import random_frame
+
+
+def beast_stream(rng, count):
+    frames = []
+    for _ in range(count):
+        msg = bytes.fromhex(random_frame(rng))
+        msgtype = MODE_S_LONG if len(msg) == 14 else MODE_S_LONG - 1
+        body = (rng.getrandbits(48).to_bytes(6, 'big') +
+                bytes([rng.getrandbits(8)]) + msg)
+        frames.append(b'\x1a' + bytes([msgtype]) +
+                      body.replace(b'\x1a', b'\x1a\x1a'))
+    return b''.join(frames)
+
+
+def pymodes_reader(chunks):
+    client = TcpClient('localhost', 30005, 'beast')
+    start = time.perf_counter()
+    for chunk in chunks:
+        client.buffer.extend([i for i in chunk])
+        split_batch(client.read_beast_buffer())
+    return time.perf_counter() - start
+
+
+def fast_reader(chunks):
+    reader = BeastReader()
+    start = time.perf_counter()
+    for chunk in chunks:
+        ts = time.time()
+        split_batch([(x.msg, ts)
+                     for x in reader.feed(chunk)
+                     if x.msgtype == MODE_S_LONG])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=100000)
+    parser.add_argument('--chunk', type=int, default=4096)
+    args = parser.parse_args()
+
+    stream = beast_stream(random.Random(0), args.frames)
+    chunks = [
+        stream[i:i + args.chunk] for i in range(0, len(stream), args.chunk)
+    ]
+    before = args.frames / pymodes_reader(chunks)
+    after = args.frames / fast_reader(chunks)
+    print(f'pyModeS beast reader  {before:12,.0f} frames/sec')
+    print(f'binary fast path      {after:12,.0f} frames/sec')
+    print(f'speedup               {after / before:12.1f}x')
+
+
+if __name__ == '__main__':
+    main()
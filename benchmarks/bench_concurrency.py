@@ -0,0 +1,139 @@
+"""Write and replay throughput while recording and replaying concurrently.
+
+A writer process records synthetic traffic as fast as it can while reader
+processes replay random 60 second windows of the database. Run it once as
+is and once with --baseline, which opens the database without the engine
+pragmas, in the rollback journal mode used before.
+
+Usage: python benchmarks/bench_concurrency.py [--seconds N] [--readers N]
+           [--baseline]
+"""
+import argparse
+from datetime import datetime, timedelta
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from synthetic import SyntheticTraffic
+
+from adsb_track.database import Database
+import adsb_track.database.engine as engine
+
+START = 1.6e9
+PREFILL = 600
+
+
+def configure(baseline):
+    if baseline:
+        engine.WRITE_PRAGMAS = {}
+        engine.READ_PRAGMAS = {}
+
+
+def writer(path, baseline, seconds, ready, results):
+    configure(baseline)
+    db = Database('sqlite', path, buffer=500)
+    rows = SyntheticTraffic(150, seed=25).rows(120, START + PREFILL)
+    calls = [(kind, x) for kind, x in rows.items() for x in x]
+    random.Random(0).shuffle(calls)
+    ready.wait()
+    written = errors = 0
+    latencies = []
+    stop = time.monotonic() + seconds
+    while time.monotonic() < stop:
+        i = written % (len(calls) - 500)
+        for kind, row in calls[i:i + 500]:
+            db.pending[kind].append(row)
+        db.pending_rows += 500
+        start = time.perf_counter()
+        try:
+            db.flush()
+        except Exception:
+            errors += 1
+            db.session.rollback()
+            db.pending = {x: [] for x in db.COLUMNS}
+            db.pending_rows = 0
+            continue
+        latencies.append(time.perf_counter() - start)
+        written += 500
+    results.put(('writer', written, errors, latencies))
+
+
+def reader(path, baseline, seconds, seed, ready, results):
+    configure(baseline)
+    db = Database('sqlite', path, read_only=True)
+    rng = random.Random(seed)
+    ready.wait()
+    queries = errors = 0
+    latencies = []
+    stop = time.monotonic() + seconds
+    while time.monotonic() < stop:
+        begin = datetime.fromtimestamp(START + rng.uniform(0, PREFILL - 60))
+        start = time.perf_counter()
+        try:
+            db.replay_messages(begin, begin + timedelta(seconds=60))
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+        queries += 1
+    results.put(('reader', queries, errors, latencies))
+
+
+def percentile(values, q):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--baseline', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'concurrency.sqlite3')
+        configure(args.baseline)
+        db = Database('sqlite', path, buffer=100000)
+        for kind, rows in SyntheticTraffic(150, seed=25).rows(
+                PREFILL, START).items():
+            db.record_rows(kind, rows)
+        db.close_session()
+
+        ready = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=writer,
+                                    args=(path, args.baseline, args.seconds,
+                                          ready, results))
+        ] + [
+            multiprocessing.Process(target=reader,
+                                    args=(path, args.baseline, args.seconds, i,
+                                          ready, results))
+            for i in range(args.readers)
+        ]
+        for x in processes:
+            x.start()
+        time.sleep(1)
+        ready.set()
+        collected = [results.get() for _ in processes]
+        for x in processes:
+            x.join()
+
+    mode = 'baseline' if args.baseline else 'tuned'
+    print(f'{mode}, 1 writer and {args.readers} readers for '
+          f'{args.seconds:.0f} s')
+    collected.sort(key=lambda x: x[0] != 'writer')
+    for kind, count, errors, latencies in collected:
+        unit = 'rows' if kind == 'writer' else 'replays'
+        print(f'{kind:<8} {count / args.seconds:>10.1f} {unit}/s  '
+              f'errors {errors:<4} p50 {percentile(latencies, 0.5):.3f} s  '
+              f'max {max(latencies, default=float("nan")):.3f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Messages/sec of the offline decoder against the number of worker processes.
+
+Usage: python benchmarks/bench_offline.py [--messages N] [--workers N [N ...]]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import pyModeS as pms
+
+from adsb_track.capture import CaptureWriter
+from adsb_track.offline import capture_blocks, decode_parallel
+
+# Identification, velocity and an even and odd airborne position
+TEMPLATES = [
+    '8D4840D6202CC371C32CE0576098', '8D485020994409940838175B284F',
+    '8D40621D58C382D690C8AC2863A7', '8D40621D58C386435CC412692AD6'
+]
+
+
+def synthetic_message(rng, icao):
+    """A template message from the given aircraft with a valid CRC."""
+    body = rng.choice(TEMPLATES)[:22]
+    body = body[:2] + icao + body[8:]
+    return body + '%06X' % pms.crc(body + '000000')
+
+
+def write_capture(directory, messages, rng):
+    icaos = ['%06X' % rng.getrandbits(24) for _ in range(300)]
+    writer = CaptureWriter(directory)
+    writer.add_source(session_hash='%040x' % rng.getrandbits(160),
+                      host='localhost',
+                      port=30002,
+                      rawtype='raw',
+                      lat=52.0,
+                      lon=4.0,
+                      start=1.6e9)
+    batch = []
+    for i in range(messages):
+        msg = synthetic_message(rng, rng.choice(icaos))
+        batch.append((msg, 1.6e9 + i / 500))
+        if len(batch) == 1000:
+            writer.write(batch)
+            batch = []
+    writer.write(batch)
+    writer.close()
+    return writer.paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200000)
+    parser.add_argument('--workers',
+                        type=int,
+                        nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    rng = random.Random(17)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_capture(os.path.join(tmp, 'capture'), args.messages, rng)
+        print(f'{os.cpu_count()} CPUs, {args.messages} messages')
+        baseline = None
+        for workers in args.workers:
+            db = os.path.join(tmp, f'workers{workers}.sqlite3')
+            start = time.perf_counter()
+            decode_parallel(capture_blocks(paths), db, workers)
+            rate = args.messages / (time.perf_counter() - start)
+            baseline = baseline or rate
+            print(f'{workers:>3} workers: {rate:>10.0f} msg/s '
+                  f'({rate / baseline:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Frames/sec of the per-message pyModeS filter against the batch prefilter.
+
+Usage: python benchmarks/bench_prefilter.py [--frames N] [--batch N]
+"""
+import argparse
+import random
+import time
+
+import pyModeS as pms
+
+from adsb_track.decode import split_batch
+
+TC_MIX = [11] * 45 + [19] * 35 + [4] * 10 + [5] * 3 + [28] * 2 + [31] * 5
+
+
+def random_frame(rng):
+    """A random long message, mostly DF17 with a valid CRC."""
+    roll = rng.random()
+    if roll < 0.15:
+        # Short Mode S reply
+        return '%014X' % rng.getrandbits(56)
+    df = 17 if roll < 0.85 else rng.choice((11, 20, 21))
+    tc = rng.choice(TC_MIX)
+    body = '%02X%06X%02X%012X' % (df << 3 | 5, rng.getrandbits(24),
+                                  tc << 3 | rng.getrandbits(3),
+                                  rng.getrandbits(48))
+    parity = pms.crc(body + '000000')
+    if rng.random() < 0.05:
+        parity ^= 1 << rng.randrange(24)  # Corrupted in transmission
+    return body + '%06X' % parity
+
+
+def legacy_split(messages):
+    groups = [], [], []
+    for msg, ts in messages:
+        if len(msg) == 28 and pms.df(msg) == 17 and pms.crc(msg) == 0:
+            icao = pms.adsb.icao(msg)
+            tc = pms.adsb.typecode(msg)
+            if tc in range(9, 19) or tc in range(20, 23):
+                groups[0].append((msg, ts, icao, tc))
+            elif tc == 19:
+                groups[1].append((msg, ts, icao, tc))
+            elif tc in range(1, 5):
+                groups[2].append((msg, ts, icao, tc))
+    return groups
+
+
+def rate(split, batches, frames):
+    start = time.perf_counter()
+    for batch in batches:
+        split(batch)
+    return frames / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=200000)
+    parser.add_argument('--batch', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    messages = [(random_frame(rng), float(i)) for i in range(args.frames)]
+    batches = [
+        messages[i:i + args.batch]
+        for i in range(0, len(messages), args.batch)
+    ]
+    assert all(legacy_split(x) == split_batch(x) for x in batches)
+
+    before = rate(legacy_split, batches, len(messages))
+    after = rate(split_batch, batches, len(messages))
+    print(f'batch size {args.batch}')
+    print(f'per-message pyModeS  {before:12,.0f} frames/sec')
+    print(f'batch prefilter      {after:12,.0f} frames/sec')
+    print(f'speedup              {after / before:12.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""End-to-end recorder throughput against a replayed feed.
+
+A synthetic capture is served by the replay server and recorded by a
+FlightRecorder in pipeline mode. Reports the rate the feed was sent at, the
+rate rows were written at, and how long the recorder took to catch up after
+the feed ended.
+
+Usage: python benchmarks/bench_recorder.py [--seconds N] [--aircraft N]
+           [--rawtype {raw,beast}] [--speed X]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+from synthetic import SyntheticTraffic
+
+from adsb_track.capture import CaptureWriter
+from adsb_track.decode import split_batch
+from adsb_track.replay_server import ReplayServer, capture_messages
+from adsb_track.stream import FlightRecorder
+
+PORT = 30402
+
+
+def serve(server, port):
+    asyncio.run(server.serve(port))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=60)
+    parser.add_argument('--aircraft', type=int, default=150)
+    parser.add_argument('--rawtype', default='beast', choices=('raw', 'beast'))
+    parser.add_argument('--speed',
+                        type=float,
+                        default=0,
+                        help='Playback speed, 0 is as fast as possible')
+    parser.add_argument('--timeout', type=float, default=300)
+    args = parser.parse_args()
+
+    traffic = SyntheticTraffic(args.aircraft, seed=20)
+    frames = traffic.frames(args.seconds)
+    expected = sum(len(x) for x in split_batch(frames))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        capture = CaptureWriter(os.path.join(tmp, 'capture'))
+        capture.add_source(lat=traffic.lat, lon=traffic.lon)
+        capture.write(frames)
+        capture.close()
+
+        server = ReplayServer(lambda: capture_messages(capture.paths),
+                              args.rawtype, args.speed)
+        threading.Thread(target=serve, args=(server, PORT),
+                         daemon=True).start()
+        time.sleep(0.5)
+
+        flights = FlightRecorder('127.0.0.1',
+                                 os.path.join(tmp, 'record.sqlite3'),
+                                 traffic.lat,
+                                 traffic.lon,
+                                 PORT,
+                                 args.rawtype,
+                                 buffer=1000,
+                                 pipeline=True)
+        flights.pipeline.start()
+        start = time.monotonic()
+        threading.Thread(target=flights.run, daemon=True).start()
+
+        # The raw client keeps the last frames of the feed buffered, so the
+        # count can stop short of expected. Once the feed is sent, stop when
+        # it has not changed for a flush interval.
+        db = flights.db
+        recorded, changed = 0, start
+        while recorded < expected and time.monotonic() - start < args.timeout:
+            time.sleep(0.05)
+            now = time.monotonic()
+            count = db.flush_rows + db.pending_rows
+            if count != recorded:
+                recorded, changed = count, now
+            elif server.sent and now - changed >= db.flush_interval:
+                break
+        elapsed = changed - start
+
+    sent, send_seconds = server.sent[0] if server.sent else (0, float('nan'))
+    print(f'{len(frames)} messages, {expected} decodable, '
+          f'{args.rawtype} at speed {args.speed or "max"}')
+    print(f'feed sent      {sent / send_seconds:>10.0f} msg/s')
+    print(f'recorded       {recorded / elapsed:>10.0f} rows/s '
+          f'({recorded}/{expected} rows in {elapsed:.2f} s)')
+    print(f'catch-up lag   {elapsed - send_seconds:>10.2f} s')
+    print(f'pipeline       {flights.pipeline.stats()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Replay latency against database size, with and without indexes.
+
+Usage: python benchmarks/bench_replay.py [--sizes N [N ...]] [--dir DIR]
+"""
+import argparse
+from datetime import datetime, timedelta
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import inspect, text
+
+from adsb_track.database import Database
+from adsb_track.database.migrate import create_indexes
+
+START = datetime(2021, 10, 1)
+MESSAGES_PER_SECOND = 200
+
+
+def populate(path, rows, rng):
+    """Records a synthetic session of roughly the given number of rows."""
+    db = Database('sqlite', path, buffer=50000)
+    seconds = rows // MESSAGES_PER_SECOND
+    icaos = ['%06X' % rng.getrandbits(24) for _ in range(500)]
+    db.record_session_start('%040x' % rng.getrandbits(160), 'localhost', 30002,
+                            START)
+    for i in range(rows):
+        ts = START + timedelta(seconds=i / MESSAGES_PER_SECOND)
+        icao = rng.choice(icaos)
+        kind = rng.random()
+        if kind < 0.5:
+            db.record_position(ts, icao, 33.9, -118.4, 35000, 'BARO')
+        elif kind < 0.9:
+            db.record_velocity(ts, icao, 450, 90.0, 0, 'GS', 'TRUE_NORTH',
+                               'GNSS')
+        else:
+            db.record_ident(ts, icao, 'TEST123', 4, 3)
+    db.record_session_stop(db.list_sessions().session_hash.iloc[0],
+                           START + timedelta(seconds=seconds))
+    db.close_session()
+    return icaos, seconds
+
+
+def drop_indexes(db):
+    with db.engine.begin() as conn:
+        for table in ('ident', 'velocity', 'position', 'session'):
+            for index in inspect(db.engine).get_indexes(table):
+                conn.execute(text(f'DROP INDEX {index["name"]}'))
+
+
+def timed(function, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(db, icaos, seconds, rng):
+    mid = START + timedelta(seconds=seconds / 2)
+    session_hash = db.list_sessions().session_hash.iloc[0]
+    return {
+        'window_60s': timed(
+            lambda: db.replay_messages(mid, mid + timedelta(seconds=60))),
+        'aircraft': timed(lambda: db.replay_aircraft(rng.choice(icaos))),
+        'session_lookup': timed(lambda: db.session.execute(
+            text('SELECT start, stop FROM session WHERE session_hash >= :h '
+                 'AND session_hash < :u'), {
+                     'h': session_hash[:8],
+                     'u': session_hash[:7] + 'g'
+                 }).all()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes',
+                        type=int,
+                        nargs='+',
+                        default=[10000, 100000, 1000000])
+    parser.add_argument('--dir', default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f'{"rows":>10} {"indexes":>8} {"60s window":>12} {"aircraft":>12}'
+          f' {"session":>12}')
+    for size in args.sizes:
+        path = os.path.join(args.dir, f'bench_replay_{size}.sqlite3')
+        if os.path.exists(path):
+            os.remove(path)
+        icaos, seconds = populate(path, size, rng)
+        db = Database('sqlite', path)
+        for indexed in (False, True):
+            if indexed:
+                create_indexes(db.engine)
+            else:
+                drop_indexes(db)
+            result = measure(db, icaos, seconds, rng)
+            print(f'{size:>10} {str(indexed):>8}' + ''.join(
+                f' {result[x] * 1000:>10.2f}ms'
+                for x in ('window_60s', 'aircraft', 'session_lookup')))
+        db.close_session()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Spatial index queries against a linear scan of the airspace.
+
+Usage: python benchmarks/bench_spatial.py [--aircraft N [N ...]]
+"""
+import argparse
+import random
+import time
+
+from adsb_track.aircraft import Airspace
+from adsb_track.spatial import distance_nm
+
+# Continental United States
+SOUTH, WEST, NORTH, EAST = 25.0, -125.0, 49.0, -67.0
+
+
+def populate(count, rng):
+    airspace = Airspace()
+    for i in range(count):
+        airspace.update_position('%06X' % i, 0.0, rng.uniform(SOUTH, NORTH),
+                                 rng.uniform(WEST, EAST),
+                                 rng.randrange(0, 45000, 25))
+    return airspace
+
+
+def scan_bbox(airspace, south, west, north, east, min_alt, max_alt):
+    return [
+        x for x in airspace.flights.values()
+        if south <= x.latitude <= north and west <= x.longitude <= east and
+        min_alt <= x.altitude <= max_alt
+    ]
+
+
+def scan_radius(airspace, lat, lon, nm):
+    found = [(x, distance_nm(lat, lon, x.latitude, x.longitude))
+             for x in airspace.flights.values()]
+    return sorted([x for x in found if x[1] <= nm], key=lambda x: x[1])
+
+
+def scan_nearest(airspace, lat, lon, k):
+    return sorted(((x, distance_nm(lat, lon, x.latitude, x.longitude))
+                   for x in airspace.flights.values()),
+                  key=lambda x: x[1])[:k]
+
+
+def rate(function, queries):
+    start = time.perf_counter()
+    for query in queries:
+        function(*query)
+    return len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--aircraft',
+                        type=int,
+                        nargs='+',
+                        default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f'{"aircraft":>9} {"query":>8} {"scan q/s":>12} {"index q/s":>12}'
+          f' {"speedup":>8}')
+    for count in args.aircraft:
+        airspace = populate(count, rng)
+        centers = [(rng.uniform(SOUTH, NORTH), rng.uniform(WEST, EAST))
+                   for _ in range(args.queries)]
+        viewports = [(lat, lon, lat + 2.0, lon + 3.0, 10000, 40000)
+                     for lat, lon in centers]
+        circles = [(lat, lon, 20.0) for lat, lon in centers]
+        nearest = [(lat, lon, 10) for lat, lon in centers]
+
+        for query in viewports[:10]:
+            assert {x.icao for x in airspace.aircraft_in_bbox(*query)
+                   } == {x.icao for x in scan_bbox(airspace, *query)}
+        for query in circles[:10]:
+            assert [x.icao for x, _ in airspace.aircraft_within(*query)
+                   ] == [x.icao for x, _ in scan_radius(airspace, *query)]
+        for query in nearest[:10]:
+            assert [x.icao for x, _ in airspace.nearest_aircraft(*query)
+                   ] == [x.icao for x, _ in scan_nearest(airspace, *query)]
+
+        for name, scan, index, queries in (
+            ('bbox', scan_bbox, airspace.aircraft_in_bbox, viewports),
+            ('20nm', scan_radius, airspace.aircraft_within, circles),
+            ('nearest', scan_nearest, airspace.nearest_aircraft, nearest),
+        ):
+            before = rate(lambda *x: scan(airspace, *x), queries)
+            after = rate(index, queries)
+            print(f'{count:>9} {name:>8} {before:>12,.0f} {after:>12,.0f}'
+                  f' {after / before:>7.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""File size and replay time of the original and compact schemas.
+
+Usage: python benchmarks/bench_storage.py [--rows N] [--dir DIR]
+"""
+import argparse
+from datetime import timedelta
+import os
+import random
+import tempfile
+
+from adsb_track.database import Database
+from adsb_track.database.convert import convert
+
+from bench_replay import populate, timed, START
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--dir', default=tempfile.gettempdir())
+    args = parser.parse_args()
+
+    original = os.path.join(args.dir, 'bench_storage_original.sqlite3')
+    compact = os.path.join(args.dir, 'bench_storage_compact.sqlite3')
+    for path in (original, compact):
+        if os.path.exists(path):
+            os.remove(path)
+    _, seconds = populate(original, args.rows, random.Random(0))
+    convert(original, compact)
+
+    mid = START + timedelta(seconds=seconds / 2)
+    print(f'{args.rows} rows')
+    print(f'{"schema":>10} {"size":>12} {"60s window":>12} {"full":>12}')
+    for name, path in (('original', original), ('compact', compact)):
+        db = Database('sqlite', path, read_only=True)
+        window = timed(
+            lambda: db.replay_messages(mid, mid + timedelta(seconds=60)))
+        full = timed(lambda: db.replay_messages(
+            START, START + timedelta(seconds=seconds)),
+                     repeat=2)
+        print(f'{name:>10} {os.path.getsize(path) / 2**20:>10.1f}MB'
+              f' {window * 1000:>10.1f}ms {full * 1000:>10.1f}ms')
+        db.close_session()
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
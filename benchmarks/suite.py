@@ -0,0 +1,245 @@
+"""Benchmarks of the decode, storage and replay hot paths.
+
+Results are written as JSON, and a previous result file can be given to
+print the change of every measurement.
+
+Usage: python benchmarks/suite.py [--output FILE] [--compare FILE]
+           [--aircraft N] [--seconds N] [--sizes N [N ...]]
+"""
+import argparse
+from datetime import datetime, timedelta
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from synthetic import SyntheticTraffic
+
+from adsb_track import SessionData
+from adsb_track.database import Database
+from adsb_track.decode import MessageDecoder, split_batch
+from adsb_track.replay import (recreate_airspace_from_timestamp,
+                               snapshot_airspace)
+
+BATCH = 200
+START = 1.6e9
+
+
+class Decoder(MessageDecoder):
+
+    def __init__(self, lat, lon):
+        self.gs_lat = lat
+        self.gs_lon = lon
+        self.session_id = None
+        self.writer = None
+
+
+def best_time(function, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(function):
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class Suite:
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def measure(self, name, function, count=None, unit='s', **params):
+        """Times a function, then measures its peak memory on another run.
+
+        With a count the result is count per second, otherwise the latency.
+        """
+        seconds = best_time(function, self.repeat)
+        value = count / seconds if count is not None else seconds
+        result = {
+            'benchmark': name,
+            'value': value,
+            'unit': unit,
+            'peak_memory_bytes': peak_memory(function),
+            'params': params,
+        }
+        self.results.append(result)
+        print(f'{name:<28} {value:>14.4g} {unit:<10} '
+              f'{result["peak_memory_bytes"] / 2**20:>8.1f} MiB {params}')
+        return result
+
+
+def bench_decode(suite, traffic, frames):
+    batches = [frames[i:i + BATCH] for i in range(0, len(frames), BATCH)]
+    suite.measure('prefilter',
+                  lambda: [split_batch(x) for x in batches],
+                  len(frames),
+                  'frames/s',
+                  frames=len(frames))
+    decoder = Decoder(traffic.lat, traffic.lon)
+    suite.measure('decode',
+                  lambda: [decoder.decode_batch(x) for x in batches],
+                  len(frames),
+                  'frames/s',
+                  frames=len(frames))
+    return [decoder.decode_batch(x) for x in batches]
+
+
+def bench_record(suite, tmp, batches):
+    rows = sum(len(x) for x in batches)
+    for compact in (False, True):
+        paths = iter(os.path.join(tmp, f'record-{compact}-{i}.sqlite3')
+                     for i in range(suite.repeat + 1))
+
+        def record():
+            db = Database('sqlite', next(paths), buffer=1000, compact=compact)
+            for batch in batches:
+                for method, args in batch.calls:
+                    getattr(db, method)(*args)
+            db.close_session()
+
+        suite.measure('record',
+                      record,
+                      rows,
+                      'rows/s',
+                      rows=rows,
+                      compact=compact)
+
+
+def bench_replay(suite, tmp, traffic, sizes):
+    messages_per_second = sum(
+        len(x) for x in traffic.rows(10, START).values()) / 10
+    for size in sizes:
+        seconds = max(120, round(size / messages_per_second))
+        path = os.path.join(tmp, f'replay-{size}.sqlite3')
+        db = Database('sqlite', path, buffer=100000)
+        rows = traffic.rows(seconds, START)
+        for kind, x in rows.items():
+            db.record_rows(kind, x)
+        db.flush()
+        total = sum(len(x) for x in rows.values())
+
+        mid = datetime.fromtimestamp(START + seconds / 2)
+        window = mid - timedelta(seconds=60), mid
+        icao = traffic.aircraft[0].icao
+        suite.measure('replay_messages_60s',
+                      lambda: db.replay_messages(*window),
+                      rows=total)
+        suite.measure('iter_messages_60s',
+                      lambda: sum(1 for _ in db.iter_messages(*window)),
+                      rows=total)
+        suite.measure('replay_aircraft',
+                      lambda: db.replay_aircraft(icao),
+                      rows=total)
+        suite.measure('recreate_airspace_60s',
+                      lambda: recreate_airspace_from_timestamp(db, mid, 60),
+                      rows=total)
+        suite.measure('snapshot_airspace_60s',
+                      lambda: snapshot_airspace(db, mid, 60),
+                      rows=total)
+
+        frames = db.replay_messages(
+            datetime.fromtimestamp(START),
+            datetime.fromtimestamp(START + min(seconds, 600)))
+        suite.measure('session_data_index',
+                      lambda: SessionData(*frames),
+                      rows=sum(len(x) for x in frames))
+        session = SessionData(*frames)
+        suite.measure('build_track',
+                      lambda: SessionData(*frames).build_track(icao),
+                      rows=sum(len(x) for x in frames))
+        suite.measure('build_all_tracks',
+                      session.build_all_tracks,
+                      rows=sum(len(x) for x in frames))
+        db.close_session()
+
+
+def metadata(args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'],
+                                capture_output=True,
+                                text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'time': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'aircraft': args.aircraft,
+        'seconds': args.seconds,
+        'repeat': args.repeat,
+    }
+
+
+def compare(results, path):
+    with open(path) as f:
+        previous = {(x['benchmark'], json.dumps(x['params'], sort_keys=True)):
+                    x for x in json.load(f)['results']}
+    print(f'\nChange against {path}')
+    for x in results:
+        old = previous.get(
+            (x['benchmark'], json.dumps(x['params'], sort_keys=True)))
+        if old is None:
+            continue
+        ratio = x['value'] / old['value']
+        # Higher is better for rates, lower for latencies
+        better = ratio if x['unit'] != 's' else 1 / ratio
+        print(f'{x["benchmark"]:<28} {better:>6.2f}x {x["params"]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--compare', help='Previous result file')
+    parser.add_argument('--aircraft', type=int, default=150)
+    parser.add_argument('--seconds',
+                        type=float,
+                        default=30,
+                        help='Duration of the decoded traffic')
+    parser.add_argument('--sizes',
+                        type=int,
+                        nargs='+',
+                        default=[100000, 400000],
+                        help='Rows of the replay databases')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    suite = Suite(args.repeat)
+    traffic = SyntheticTraffic(args.aircraft, seed=18)
+    frames = traffic.frames(args.seconds, START)
+    with tempfile.TemporaryDirectory() as tmp:
+        batches = bench_decode(suite, traffic, frames)
+        bench_record(suite, tmp, batches)
+        bench_replay(suite, tmp, SyntheticTraffic(args.aircraft, seed=18),
+                     args.sizes)
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'metadata': metadata(args),
+            'results': suite.results
+        },
+                  f,
+                  indent=2)
+    print(f'Wrote {args.output}')
+    if args.compare:
+        compare(suite.results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
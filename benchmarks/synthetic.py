@@ -0,0 +1,157 @@
+"""Synthetic receiver traffic for the benchmarks.
+
+Aircraft fly straight lines around a receiver. Each emits the message mix
+of a typical 1090 MHz receiver: airborne positions and velocities twice a
+second, identification every five seconds, operational status, and the
+short and long Mode S replies that are not ADS-B. A few extended squitters
+arrive with a bit error.
+"""
+from datetime import datetime
+import math
+import random
+
+from adsb_track.const import IDENT, VELOCITY, POSITION
+from adsb_track.encode import (encode_ident, encode_position,
+                               encode_velocity, df17)
+
+TICK = 0.1
+
+# Messages per second of each aircraft
+RATES = {
+    'position': 2.0,
+    'velocity': 2.0,
+    'ident': 0.2,
+    'status': 0.1,
+    'short_reply': 3.0,
+    'long_reply': 0.5,
+}
+BIT_ERROR_RATE = 0.02
+
+LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+NM_PER_DEGREE = 60.0
+
+
+class Aircraft:
+
+    def __init__(self, rng, lat, lon, radius):
+        self.icao = '%06X' % rng.getrandbits(24)
+        self.callsign = (''.join(rng.choice(LETTERS) for _ in range(3)) +
+                         str(rng.randrange(1, 9999)))
+        self.category = rng.randrange(8)
+        self.lat = lat + rng.uniform(-radius, radius)
+        self.lon = lon + rng.uniform(-radius, radius)
+        self.alt = rng.uniform(1000, 41000)
+        self.track = rng.uniform(0, 360)
+        self.speed = rng.uniform(120, 520)
+        self.vertical_speed = rng.choice((0, 0, 0, 1, -1)) * rng.uniform(
+            500, 2500)
+        self.odd = False
+
+    def move(self, seconds):
+        nm = self.speed * seconds / 3600
+        self.lat += nm * math.cos(math.radians(self.track)) / NM_PER_DEGREE
+        self.lon += (nm * math.sin(math.radians(self.track)) /
+                     (NM_PER_DEGREE * math.cos(math.radians(self.lat))))
+        self.alt = min(max(self.alt + self.vertical_speed * seconds / 60, 0),
+                       45000)
+
+
+class SyntheticTraffic:
+    """Traffic of a number of aircraft around a receiver.
+
+    Args:
+        aircraft (int): Number of aircraft in range.
+        lat (float): Receiver latitude
+        lon (float): Receiver longitude
+        radius (float): Half width in degrees of the area the aircraft start
+            in.
+        seed (int): Seed of the random generator.
+    """
+
+    def __init__(self, aircraft=150, lat=33.9, lon=-118.4, radius=2.0, seed=0):
+        self.rng = random.Random(seed)
+        self.lat = lat
+        self.lon = lon
+        self.aircraft = [
+            Aircraft(self.rng, lat, lon, radius) for _ in range(aircraft)
+        ]
+
+    def _events(self, seconds, start):
+        """Yields the time, aircraft and kind of each message in order."""
+        rng = self.rng
+        for tick in range(round(seconds / TICK)):
+            ts = start + tick * TICK
+            for plane in self.aircraft:
+                plane.move(TICK)
+                for kind, rate in RATES.items():
+                    if rng.random() < rate * TICK:
+                        yield ts + rng.uniform(0, TICK), plane, kind
+
+    def frames(self, seconds, start=1.6e9):
+        """Generates the messages heard by the receiver.
+
+        Args:
+            seconds (float): Duration of the traffic.
+            start (float): Start time, seconds since UNIX epoch.
+
+        Returns:
+            list: ``(msg, ts)`` pairs with hexadecimal messages.
+        """
+        rng = self.rng
+        frames = []
+        for ts, plane, kind in self._events(seconds, start):
+            if kind == 'position':
+                plane.odd = not plane.odd
+                msg = encode_position(plane.icao, plane.lat, plane.lon,
+                                      plane.alt, plane.odd)
+            elif kind == 'velocity':
+                msg = encode_velocity(plane.icao, plane.speed, plane.track,
+                                      plane.vertical_speed)
+            elif kind == 'ident':
+                msg = encode_ident(plane.icao, plane.callsign, 4,
+                                   plane.category)
+            elif kind == 'status':
+                msg = df17(plane.icao, 31 << 51 | rng.getrandbits(48))
+            elif kind == 'short_reply':
+                msg = '%02X%012X' % (rng.choice((4, 5, 11)) << 3,
+                                     rng.getrandbits(48))
+            else:
+                msg = '%02X%026X' % (rng.choice((20, 21)) << 3,
+                                     rng.getrandbits(104))
+            if kind in ('position', 'velocity', 'ident', 'status') and \
+                    rng.random() < BIT_ERROR_RATE:
+                bit = rng.randrange(len(msg) * 4)
+                msg = '%0*X' % (len(msg), int(msg, 16) ^ (1 << bit))
+            frames.append((msg, ts))
+        frames.sort(key=lambda x: x[1])
+        return frames
+
+    def rows(self, seconds, start=1.6e9):
+        """Generates decoded message rows without encoding them.
+
+        Args:
+            seconds (float): Duration of the traffic.
+            start (float): Start time, seconds since UNIX epoch.
+
+        Returns:
+            dict: Rows of each message type, in the order of the matching
+                ``Database.record_*`` arguments.
+        """
+        rows = {IDENT: [], VELOCITY: [], POSITION: []}
+        for ts, plane, kind in self._events(seconds, start):
+            ts = datetime.fromtimestamp(ts)
+            if kind == 'position':
+                rows[POSITION].append(
+                    (ts, plane.icao, plane.lat, plane.lon, round(plane.alt),
+                     'BARO', None))
+            elif kind == 'velocity':
+                rows[VELOCITY].append(
+                    (ts, plane.icao, round(plane.speed), plane.track,
+                     round(plane.vertical_speed), 'GS', 'TRUE_NORTH', 'GNSS',
+                     None))
+            elif kind == 'ident':
+                rows[IDENT].append(
+                    (ts, plane.icao, plane.callsign, 4, plane.category, None))
+        for x in rows.values():
+            x.sort(key=lambda row: row[0])
+        return rows
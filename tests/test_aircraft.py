@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from adsb_track.aircraft import Aircraft, Airspace
+
+
+def test_evicted_counts_removed_aircraft():
+    airspace = Airspace(ttl=10)
+    airspace.update_position('A1B2C3', 0.0, 52.25, 3.91, 38000)
+    airspace.update_position('D4E5F6', 0.0, 52.26, 3.92, 36000)
+    # Refreshed, its queued entry is stale when it reaches the top
+    for ts in range(1, 20):
+        airspace.update_position('A1B2C3', float(ts), 52.25, 3.91, 38000)
+    assert list(airspace.flights) == ['A1B2C3']
+    assert airspace.evicted == 1
+
+    airspace.remove('A1B2C3')
+    assert airspace.evicted == 1
+    assert airspace.expire(100.0) == 0
+    assert airspace.evicted == 1
+
+
+def test_evicted_counts_capacity_removals():
+    airspace = Airspace(max_aircraft=2)
+    for i, icao in enumerate(['A1B2C3', 'D4E5F6', '123456']):
+        airspace.update_position(icao, float(i), 52.25, 3.91, 38000)
+    assert len(airspace) == 2
+    assert airspace.evicted == 1
+
+
+@pytest.mark.parametrize('ts', [
+    1_700_000_000, 1_700_000_000.0,
+    np.int64(1_700_000_000),
+    np.float64(1_700_000_000),
+    pd.Timestamp(1_700_000_000, unit='s'),
+])
+def test_process_timestamp_seconds(ts):
+    assert Aircraft.process_timestamp(ts) == 1_700_000_000.0
+
+
+def test_capacity_with_only_stale_entries():
+    airspace = Airspace(max_aircraft=2)
+    for icao in ['A1B2C3', 'D4E5F6']:
+        airspace.update_position(icao, 0.0, 52.25, 3.91, 38000)
+        airspace.remove(icao)
+    # Every queued entry is stale, the held aircraft were never reported
+    for icao in ['123456', '654321', 'ABCDEF']:
+        airspace.check_aircraft(icao)
+        assert len(airspace) <= 2
+    assert list(airspace.flights) == ['654321', 'ABCDEF']
+    assert airspace.evicted == 1
@@ -0,0 +1,73 @@
+import sqlite3
+
+from adsb_track.capture import CaptureWriter, decode_capture
+from adsb_track.database import Database
+
+START = 1.6e9
+
+# Identification, velocity and an even/odd pair of airborne positions
+MESSAGES = [
+    '8D4840D6202CC371C32CE0576098',
+    '8D485020994409940838175B284F',
+    '8D40621D58C382D690C8AC2863A7',
+    '8D40621D58C386435CC412692AD6',
+]
+
+
+def write_capture(directory, offset=0):
+    writer = CaptureWriter(str(directory))
+    writer.add_source(session_hash='3f2a' * 10,
+                      host='127.0.0.1',
+                      port=30002,
+                      rawtype='raw',
+                      lat=52.258,
+                      lon=3.918,
+                      start=START)
+    writer.write([(msg, START + offset + i) for i, msg in enumerate(MESSAGES)])
+    writer.close()
+    return writer.path
+
+
+def message_counts(path):
+    db = Database('sqlite', path)
+    counts = [len(df) for df in db.replay_messages(*db.session_window('3f2a'))]
+    sessions = len(db.list_sessions())
+    db.close_session()
+    return sessions, counts
+
+
+def test_decode_twice(tmp_path):
+    capture = write_capture(tmp_path / 'capture')
+    db = str(tmp_path / 'record.sqlite3')
+
+    decode_capture([capture], db)
+    first = message_counts(db)
+    assert first == (1, [1, 1, 2])
+
+    assert decode_capture([capture], db) == {'3f2a' * 10: 0}
+    assert message_counts(db) == first
+
+
+def test_decode_continues_session(tmp_path):
+    first = write_capture(tmp_path / 'first')
+    later = write_capture(tmp_path / 'later', offset=60)
+    db = str(tmp_path / 'record.sqlite3')
+
+    decode_capture([first], db)
+    decode_capture([first, later], db)
+    assert message_counts(db) == (1, [2, 2, 4])
+
+
+def test_decode_resumes_interrupted_session(tmp_path):
+    first = write_capture(tmp_path / 'first')
+    later = write_capture(tmp_path / 'later', offset=60)
+    db = str(tmp_path / 'record.sqlite3')
+
+    decode_capture([first], db)
+    # Interrupted before the session end time was recorded
+    with sqlite3.connect(db) as conn:
+        conn.execute('UPDATE session SET stop = NULL')
+    conn.close()
+
+    decode_capture([first, later], db)
+    assert message_counts(db) == (1, [2, 2, 4])
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta, timezone
+import time
+
+import pandas as pd
+import pytest
+
+from adsb_track.database import Database
+from adsb_track.database.codec import (decode_frame, decode_timestamp,
+                                       encode_timestamp)
+
+INSTANT = 1600000000.25
+
+
+@pytest.fixture(params=['UTC', 'America/Los_Angeles', 'Asia/Kolkata'])
+def local_zone(request, monkeypatch):
+    monkeypatch.setenv('TZ', request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_encode_timestamp_aware_and_naive(local_zone):
+    naive = datetime.fromtimestamp(INSTANT)
+    expected = encode_timestamp(naive)
+    assert expected == round(INSTANT * 1e6)
+    assert decode_timestamp(expected) == naive
+
+    utc = datetime.fromtimestamp(INSTANT, timezone.utc)
+    offset = datetime.fromtimestamp(INSTANT,
+                                    timezone(timedelta(hours=-3, minutes=-30)))
+    assert encode_timestamp(utc) == expected
+    assert encode_timestamp(offset) == expected
+    assert encode_timestamp(pd.Timestamp(utc)) == expected
+    assert encode_timestamp(pd.Timestamp(naive)) == expected
+    assert encode_timestamp(INSTANT) == expected
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_replay_aware_window(tmp_path, local_zone, compact):
+    naive = datetime.fromtimestamp(INSTANT)
+    db = Database('sqlite', str(tmp_path / 'record.sqlite3'), compact=compact)
+    db.record_position(naive, 'A1B2C3', 52.25, 3.91, 38000, 'BARO')
+    db.flush()
+
+    utc = datetime.fromtimestamp(INSTANT, timezone.utc)
+    window = utc - timedelta(seconds=1), utc + timedelta(seconds=1)
+    assert len(db.replay_messages(*window)[2]) == 1
+    db.close_session()
+
+
+def test_encode_timestamp_fall_back(monkeypatch):
+    monkeypatch.setenv('TZ', 'America/Los_Angeles')
+    time.tzset()
+    try:
+        # 01:30 local time occurs twice, an hour apart
+        first, second = 1604219400.0, 1604223000.0
+        naive = [datetime.fromtimestamp(x) for x in (first, second)]
+        assert naive[0].replace(fold=0) == naive[1].replace(fold=0)
+
+        encoded = [encode_timestamp(x) for x in naive]
+        assert encoded == [round(first * 1e6), round(second * 1e6)]
+        assert [decode_timestamp(x) for x in encoded] == naive
+        df = decode_frame(pd.DataFrame({'timestamp': encoded}))
+        assert df['timestamp'].tolist() == [pd.Timestamp(naive[0])] * 2
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_duckdb_aware_window(tmp_path, local_zone):
+    pytest.importorskip('duckdb')
+    naive = datetime.fromtimestamp(INSTANT)
+    db = Database('duckdb', str(tmp_path / 'record.duckdb'))
+    db.record_position(naive, 'A1B2C3', 52.25, 3.91, 38000, 'BARO')
+    db.flush()
+
+    utc = datetime.fromtimestamp(INSTANT, timezone.utc)
+    window = utc - timedelta(seconds=1), utc + timedelta(seconds=1)
+    assert len(db.replay_messages(*window)[2]) == 1
+    assert len(db.replay_aircraft('a1b2c3', *window)[2]) == 1
+    assert len(list(db.iter_messages(*window))) == 1
+    db.close_session()
@@ -0,0 +1,75 @@
+from datetime import datetime
+import os
+import sqlite3
+import time
+
+import pytest
+
+from adsb_track.database import Database
+
+TS = datetime(2020, 9, 13, 12, 26, 40)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_replay_aircraft_lowercase(tmp_path, compact):
+    db = Database('sqlite', str(tmp_path / 'record.sqlite3'), compact=compact)
+    db.record_ident(TS, 'A1B2C3', 'TEST123', 4, 3)
+    db.record_position(TS, 'A1B2C3', 52.25, 3.91, 38000, 'BARO')
+    db.record_position(TS, 'D4E5F6', 52.26, 3.92, 36000, 'BARO')
+    db.flush()
+
+    ident, velocity, position = db.replay_aircraft('a1b2c3')
+    assert len(ident) == 1
+    assert len(velocity) == 0
+    assert len(position) == 1
+    assert position['icao'].tolist() == ['A1B2C3']
+    db.close_session()
+
+
+@pytest.mark.parametrize('name', ['record.sqlite3', 'a?b#c%41 d.sqlite3'])
+def test_reader_path(tmp_path, name):
+    path = str(tmp_path / name)
+    db = Database('sqlite', path)
+    db.record_position(TS, 'A1B2C3', 52.25, 3.91, 38000, 'BARO')
+    db.close_session()
+    files = {x for x in os.listdir(tmp_path)
+             if not x.endswith(('-wal', '-shm'))}
+    assert files == {name}
+
+    db = Database('sqlite', path, read_only=True)
+    assert len(db.replay_messages(TS, TS)[2]) == 1
+    db.close_session()
+
+
+def test_read_only_skips_migration(tmp_path):
+    path = str(tmp_path / 'record.sqlite3')
+    db = Database('sqlite', path)
+    db.record_position(TS, 'A1B2C3', 52.25, 3.91, 38000, 'BARO')
+    db.close_session()
+
+    # A recorder in the middle of a write transaction
+    writer = sqlite3.connect(path)
+    writer.execute('BEGIN IMMEDIATE')
+    try:
+        start = time.monotonic()
+        db = Database('sqlite', path, read_only=True)
+        assert len(db.replay_messages(TS, TS)[2]) == 1
+        assert time.monotonic() - start < 1
+        db.close_session()
+    finally:
+        writer.rollback()
+        writer.close()
+
+
+def test_in_memory():
+    db = Database('sqlite', ':memory:')
+    db.record_session_start('3f2a' * 10, '127.0.0.1', 30002, TS)
+    db.record_position(TS, 'A1B2C3', 52.25, 3.91, 38000, 'BARO')
+    db.flush()
+
+    assert len(db.list_sessions()) == 1
+    assert db.session_window('3f2a')[0] == TS
+    assert len(db.replay_messages(TS, TS)[2]) == 1
+    assert len(db.replay_aircraft('A1B2C3')[2]) == 1
+    assert len(list(db.iter_session('3f2a'))) == 1
+    db.close_session()
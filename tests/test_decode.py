@@ -0,0 +1,87 @@
+import string
+
+import pyModeS as pms
+
+from adsb_track.database import Database
+from adsb_track.decode import MessageDecoder, split_batch
+from adsb_track.pipeline import RecordBatch
+
+from test_capture import MESSAGES, START
+
+
+class Decoder(MessageDecoder):
+
+    def __init__(self, writer):
+        self.gs_lat = 52.258
+        self.gs_lon = 3.918
+        self.session_id = 1
+        self.writer = writer
+
+
+def test_decode_batch_keeps_writer():
+    writer = RecordBatch()
+    decoder = Decoder(writer)
+    messages = [(msg, START + i) for i, msg in enumerate(MESSAGES)]
+
+    batch = decoder.decode_batch(messages)
+    assert len(batch) == 4
+    assert decoder.writer is writer
+    assert len(writer) == 0
+
+    decoder.decode_messages(messages)
+    assert len(writer) == 4
+
+
+def test_lowercase_frames_recorded_uppercase(tmp_path):
+    db = Database('sqlite', str(tmp_path / 'record.sqlite3'))
+    decoder = Decoder(db)
+    decoder.decode_messages([(msg.lower(), START + i)
+                             for i, msg in enumerate(MESSAGES)])
+    db.flush()
+
+    ident = db.replay_aircraft('4840d6')[0]
+    assert ident['icao'].tolist() == ['4840D6']
+    assert len(db.replay_aircraft('40621D')[2]) == 2
+    db.close_session()
+
+
+def pymodes_split(messages):
+    groups = [], [], []
+    for msg, ts in messages:
+        if len(msg) != 28 or not all(x in string.hexdigits for x in msg):
+            continue
+        if pms.df(msg) == 17 and pms.crc(msg) == 0:
+            tc = pms.adsb.typecode(msg)
+            if tc in range(9, 19) or tc in range(20, 23):
+                kind = 0
+            elif tc == 19:
+                kind = 1
+            elif tc in range(1, 5):
+                kind = 2
+            else:
+                continue
+            groups[kind].append((msg.upper(), ts, pms.adsb.icao(msg).upper(),
+                                 tc))
+    return groups
+
+
+def test_split_batch_matches_pymodes():
+    ident, velocity, even, odd = MESSAGES
+    batch = [
+        ident.lower(),
+        velocity[:14].lower() + velocity[14:],
+        # Whitespace is skipped by bytes.fromhex, shifting later frames
+        even[:8] + ' ' + even[9:],
+        ' ' + odd[:27],
+        even[:26] + '\n\n',
+        odd[:27] + 'Z',
+        odd[:20],
+        even + '00',
+        odd[:-1] + '0',
+        even,
+        odd.lower(),
+    ]
+    messages = [(msg, START + i) for i, msg in enumerate(batch)]
+    expected = pymodes_split(messages)
+    assert split_batch(messages) == expected
+    assert [len(x) for x in expected] == [2, 1, 1]
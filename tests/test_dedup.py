@@ -0,0 +1,19 @@
+from adsb_track.dedup import Deduplicator
+
+MSG = '8D4840D6202CC371C32CE0576098'
+
+
+def test_drops_copies_from_other_receivers():
+    dedup = Deduplicator(window=1.0)
+    assert dedup.filter([(MSG, 0.0)], 'a') == [(MSG, 0.0)]
+    assert dedup.filter([(bytes.fromhex(MSG), 0.1)], 'b') == []
+    assert dedup.filter([(MSG, 2.5)], 'b') == [(MSG, 2.5)]
+    assert dedup.stats()['b']['duplicates'] == 1
+
+
+def test_keeps_repeats_from_the_same_receiver():
+    dedup = Deduplicator(window=1.0)
+    messages = [(MSG, 0.0), (MSG, 0.5), (MSG, 0.9)]
+    assert dedup.filter(messages, 'a') == messages
+    assert dedup.filter([(MSG, 1.2)], 'b') == []
+    assert dedup.stats()['a']['duplicates'] == 0
@@ -0,0 +1,13 @@
+import pyModeS as pms
+
+from adsb_track.encode import encode_ident
+
+
+def test_encode_ident_round_trip():
+    msg = encode_ident('A1B2C3', 'TEST123')
+    assert pms.adsb.callsign(msg).strip('_') == 'TEST123'
+
+
+def test_encode_ident_unknown_characters():
+    msg = encode_ident('A1B2C3', 'AB#C?')
+    assert pms.adsb.callsign(msg) == 'AB_C____'
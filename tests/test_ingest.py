@@ -0,0 +1,24 @@
+import asyncio
+
+from adsb_track.ingest import Ingest
+from adsb_track.pipeline import Pipeline, BLOCK
+
+
+def test_blocked_submit_keeps_loop_running(tmp_path):
+    ingest = Ingest([], str(tmp_path / 'record.sqlite3'))
+    # Not started, so nothing drains the decode queue
+    ingest.pipeline = pipeline = Pipeline(None, ingest.db, 1, 1, BLOCK)
+
+    async def run():
+        await ingest.submit(['first'])
+        submit = asyncio.create_task(ingest.submit(['second']))
+        await asyncio.sleep(0.05)
+        # The loop still runs while the second batch waits for room
+        assert not submit.done()
+        assert pipeline.decode_queue.get_nowait() == ['first']
+        await asyncio.wait_for(submit, 5)
+
+    asyncio.run(run())
+    assert pipeline.decode_queue.get_nowait() == ['second']
+    assert pipeline.submitted_batches == 2
+    ingest.db.close_session()
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from adsb_track.database import Database
+from adsb_track.const import SUMMARY
+from adsb_track.database import maintain
+from adsb_track.database.maintain import rollup
+
+MINUTE = datetime(2020, 9, 13, 12, 26)
+
+
+def record(db, seconds, altitude, speed):
+    for i in seconds:
+        ts = MINUTE + timedelta(seconds=i)
+        db.record_position(ts, 'A1B2C3', 52.25, 3.91, altitude, 'BARO')
+        db.record_velocity(ts, 'A1B2C3', speed, 90.0, 0, 'GS', 'TRUE_NORTH',
+                           'BARO')
+    db.flush()
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_rollup_twice(tmp_path, compact):
+    db = Database('sqlite', str(tmp_path / 'record.sqlite3'), compact=compact)
+    record(db, range(0, 20), 38000, 400)
+    before = MINUTE + timedelta(minutes=5)
+    stop = MINUTE + timedelta(minutes=1)
+
+    assert rollup(db, before, pause=0)[SUMMARY] == 1
+    first = db.replay_summaries(MINUTE, stop)
+    assert rollup(db, before, pause=0)[SUMMARY] == 0
+    assert db.replay_summaries(MINUTE, stop).equals(first)
+
+    # Messages of the same minute arriving after it was rolled up
+    record(db, range(40, 50), 36000, 460)
+    assert rollup(db, before, pause=0)[SUMMARY] == 0
+    summary = db.replay_summaries(MINUTE, stop)
+    assert len(summary) == 1
+    row = summary.iloc[0]
+    assert row['messages'] == 60
+    assert row['min_altitude'] == 36000
+    assert row['max_altitude'] == 38000
+    assert row['speed'] == pytest.approx((20 * 400 + 10 * 460) / 30)
+    db.close_session()
+
+
+def test_rollup_keeps_rows_recorded_meanwhile(tmp_path, monkeypatch):
+    path = str(tmp_path / 'record.sqlite3')
+    db = Database('sqlite', path)
+    record(db, range(0, 20), 38000, 400)
+    recorder = Database('sqlite', path)
+    summarize = maintain.summarize
+
+    def summarize_then_record(*frames):
+        # A recorder commits into the slice after it was read
+        record(recorder, [30], 37000, 420)
+        return summarize(*frames)
+
+    monkeypatch.setattr(maintain, 'summarize', summarize_then_record)
+    before = MINUTE + timedelta(minutes=5)
+    rollup(db, before, pause=0)
+    stop = MINUTE + timedelta(minutes=1)
+    assert [len(x) for x in db.replay_messages(MINUTE, stop)] == [0, 1, 1]
+
+    monkeypatch.setattr(maintain, 'summarize', summarize)
+    rollup(db, before, pause=0)
+    assert db.replay_summaries(MINUTE, stop)['messages'].tolist() == [42]
+    recorder.close_session()
+    db.close_session()
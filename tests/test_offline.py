@@ -0,0 +1,16 @@
+from adsb_track.offline import capture_blocks, decode_parallel
+
+from test_capture import write_capture, message_counts
+
+
+def test_decode_parallel_twice(tmp_path):
+    capture = write_capture(tmp_path / 'capture')
+    db = str(tmp_path / 'record.sqlite3')
+
+    decode_parallel(capture_blocks([capture]), db, workers=2)
+    first = message_counts(db)
+    assert first == (1, [1, 1, 2])
+
+    assert decode_parallel(capture_blocks([capture]), db,
+                           workers=2) == {'3f2a' * 10: 0}
+    assert message_counts(db) == first
@@ -0,0 +1,48 @@
+import socket
+import threading
+from types import SimpleNamespace
+
+from adsb_track.stream import FlightRecorder
+
+from test_capture import MESSAGES
+
+MLAT = 0x1A0000000001
+SIGNAL = 0x1A
+
+
+def beast_frame(msg, mlat, signal):
+    body = mlat.to_bytes(6, 'big') + bytes([signal]) + bytes.fromhex(msg)
+    return b'\x1a\x33' + body.replace(b'\x1a', b'\x1a\x1a')
+
+
+class Recorder(FlightRecorder):
+
+    def handle_messages(self, messages):
+        self.received.extend(messages)
+        self.stop_flag.value = True
+
+
+def test_beast_run_stops_and_keeps_mlat(tmp_path):
+    server = socket.create_server(('127.0.0.1', 0))
+    port = server.getsockname()[1]
+
+    def serve():
+        conn, _ = server.accept()
+        conn.sendall(beast_frame(MESSAGES[0], MLAT, SIGNAL))
+        conn.recv(1)
+        conn.close()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    recorder = Recorder('127.0.0.1', str(tmp_path / 'record.sqlite3'),
+                        52.258, 3.918, port=port, rawtype='beast')
+    recorder.received = []
+    recorder.run(stop_flag=SimpleNamespace(value=False))
+
+    assert len(recorder.received) == 1
+    msg, _, mlat, signal = recorder.received[0]
+    assert msg.hex().upper() == MESSAGES[0]
+    assert (mlat, signal) == (MLAT, SIGNAL)
+    recorder.db.close_session()
+    server.close()
+    thread.join(5)